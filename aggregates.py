@@ -0,0 +1,440 @@
+import hashlib
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Cột danh mục ảnh hưởng tới số liệu tổng hợp, danh mục đổi thì xây lại từ đầu
+CATALOG_COLUMNS = ['food_id', 'cuisine', 'category', 'flavors']
+
+
+def _frame_key(frame):
+    """Khóa cache của một DataFrame: số dòng và giá trị băm các dòng theo đúng thứ tự"""
+    row_hashes = pd.util.hash_pandas_object(frame, index=False).to_numpy()
+    return len(frame), hashlib.sha1(row_hashes.tobytes()).hexdigest()
+
+
+# Bảng món ăn -> hương vị đã tách, dùng lại khi danh mục món không đổi
+_flavor_table_cache = {'key': None, 'table': None}
+
+
+def build_food_flavor_table(foods_df):
+    """
+    Tạo bảng dạng dài (food_id, flavor), mỗi dòng là một hương vị của một món
+
+    Bảng chỉ được tách và explode lại khi danh mục món ăn thay đổi.
+    """
+    catalog = foods_df[['food_id', 'flavors']].drop_duplicates('food_id')
+    key = _frame_key(catalog)
+    if _flavor_table_cache['key'] == key:
+        return _flavor_table_cache['table']
+
+    table = catalog.dropna(subset=['flavors']).assign(flavor=lambda df: df['flavors'].str.split(','))
+    table = table.explode('flavor')[['food_id', 'flavor']]
+    table['flavor'] = table['flavor'].str.strip()
+    table = table.reset_index(drop=True)
+
+    _flavor_table_cache['key'] = key
+    _flavor_table_cache['table'] = table
+    return table
+
+
+# Giá trung bình theo ẩm thực, chỉ phụ thuộc danh mục món
+_price_table_cache = {'key': None, 'table': None}
+
+
+def cuisine_price_table(foods_df):
+    """
+    Giá trung bình của các món theo ẩm thực, chỉ tính lại khi danh mục món thay đổi
+
+    Returns:
+        DataFrame: cuisine, price (trung bình), count (số món), sắp theo tên ẩm thực
+    """
+    catalog = foods_df[['cuisine', 'price']]
+    key = _frame_key(catalog)
+    if _price_table_cache['key'] == key:
+        return _price_table_cache['table']
+
+    codes, cuisines = pd.factorize(catalog['cuisine'], sort=True)
+    prices = catalog['price'].to_numpy(dtype=float)
+    valid = (codes >= 0) & ~np.isnan(prices)
+    table = _stats_frame('cuisine', cuisines, np.bincount(codes[valid], weights=prices[valid], minlength=len(cuisines)),
+                         np.bincount(codes[valid], minlength=len(cuisines)), mean_name='price')
+
+    _price_table_cache['key'] = key
+    _price_table_cache['table'] = table
+    return table
+
+
+def _ratings_watermark(ratings_df):
+    """(id, thời gian) đánh giá mới nhất, None nếu dữ liệu rỗng hoặc không có các cột này"""
+    if ratings_df.empty or not {'id', 'timestamp'}.issubset(ratings_df.columns):
+        return None
+    return ratings_df['id'].max(), ratings_df['timestamp'].max()
+
+
+def _ratings_hash(ratings_df):
+    columns = [column for column in ('customer_id', 'food_id', 'rating') if column in ratings_df.columns]
+    return int(pd.util.hash_pandas_object(ratings_df[columns], index=False).sum())
+
+
+def _month_codes(timestamps):
+    """Mã tháng (năm * 12 + tháng - 1) của từng thời điểm, -1 nếu không đọc được"""
+    timestamps = pd.to_datetime(timestamps, errors='coerce')
+    codes = (timestamps.dt.year * 12 + timestamps.dt.month - 1).fillna(-1)
+    return codes.to_numpy(dtype=np.int64)
+
+
+def _current_month_code():
+    now = pd.Timestamp.now()
+    return now.year * 12 + now.month - 1
+
+
+def _stats_frame(column, labels, sums, counts, min_count=0, mean_name='avg_rating'):
+    """DataFrame (nhãn, trung bình, số lượng) cho các nhóm có ít nhất min_count đánh giá, sắp theo nhãn"""
+    keep = (counts > 0) & (counts >= min_count)
+    frame = pd.DataFrame({
+        column: np.asarray(labels, dtype=object)[keep],
+        mean_name: sums[keep] / counts[keep],
+        'count': counts[keep].astype(np.int64),
+    })
+    return frame.sort_values(column, kind='stable').reset_index(drop=True)
+
+
+class RatingAggregates:
+    """
+    Tổng và số lượng đánh giá theo món, ẩm thực, loại món, hương vị, (ẩm thực, loại món), tháng và điểm
+
+    Xây một lần từ toàn bộ ratings (các phép bincount vector hóa), sau đó mỗi đánh giá mới từ add_rating
+    chỉ cập nhật vài ô (O(số hương vị của món)). Các biểu đồ và hàm thống kê đọc số liệu đã gom sẵn nên
+    thời gian vẽ không phụ thuộc số lượng đánh giá.
+
+    Args:
+        ratings_df (DataFrame): Dữ liệu đánh giá (customer_id, food_id, rating, timestamp nếu có)
+        foods_df (DataFrame): Danh mục món ăn, vị trí món theo thứ tự của foods_df
+    """
+
+    def __init__(self, ratings_df, foods_df):
+        self._lock = threading.Lock()
+        self.n_ratings = len(ratings_df)
+        # Dữ liệu đã gom: watermark (id, thời gian) mới nhất, hoặc băm nội dung nếu không có các cột này
+        self.watermark = _ratings_watermark(ratings_df)
+        self.content_hash = _ratings_hash(ratings_df) if self.watermark is None else None
+        # Số đánh giá đã cập nhật tại chỗ qua apply_rating kể từ khi xây
+        self.n_applied = 0
+
+        # Mã món ăn = vị trí trong foods_df (lần xuất hiện đầu tiên nếu trùng food_id)
+        food_positions = pd.Series(np.arange(len(foods_df)), index=foods_df['food_id'])
+        food_positions = food_positions[~food_positions.index.duplicated()]
+        self.food_codes = food_positions.to_dict()
+        self.food_ids = foods_df['food_id'].to_numpy()
+        n_foods = len(foods_df)
+
+        # Mã ẩm thực / loại món của từng món, -1 nếu thiếu
+        self.labels = {}
+        self.food_groups = {}
+        for attribute in ('cuisine', 'category'):
+            codes, uniques = pd.factorize(foods_df[attribute], sort=True)
+            self.food_groups[attribute] = codes
+            self.labels[attribute] = list(uniques)
+
+        # Hương vị của từng món dạng CSR: món i có các hương vị flavor_indices[flavor_indptr[i]:flavor_indptr[i + 1]]
+        flavor_table = build_food_flavor_table(foods_df)
+        flavor_positions = flavor_table['food_id'].map(food_positions).to_numpy(dtype=np.int64)
+        flavor_codes, flavor_labels = pd.factorize(flavor_table['flavor'], sort=True)
+        order = np.argsort(flavor_positions, kind='stable')
+        self.flavor_indices = flavor_codes[order]
+        self.flavor_indptr = np.zeros(n_foods + 1, dtype=np.int64)
+        np.cumsum(np.bincount(flavor_positions, minlength=n_foods), out=self.flavor_indptr[1:])
+        self.labels['flavor'] = list(flavor_labels)
+
+        # Theo món
+        positions = ratings_df['food_id'].map(self.food_codes).to_numpy()
+        ratings = ratings_df['rating'].to_numpy(dtype=float)
+        known = ~pd.isna(positions)
+        known_positions = positions[known].astype(np.int64)
+        self.food_sum = np.bincount(known_positions, weights=ratings[known], minlength=n_foods)
+        self.food_count = np.bincount(known_positions, minlength=n_foods).astype(np.int64)
+
+        # Theo ẩm thực, loại món và hương vị: gom lại từ số liệu theo món
+        self.group_sum = {}
+        self.group_count = {}
+        for attribute in ('cuisine', 'category'):
+            codes = self.food_groups[attribute]
+            valid = codes >= 0
+            size = len(self.labels[attribute])
+            self.group_sum[attribute] = np.bincount(codes[valid], weights=self.food_sum[valid], minlength=size)
+            self.group_count[attribute] = np.bincount(codes[valid], weights=self.food_count[valid],
+                                                      minlength=size).astype(np.int64)
+        flavor_foods = np.repeat(np.arange(n_foods), np.diff(self.flavor_indptr))
+        size = len(self.labels['flavor'])
+        self.group_sum['flavor'] = np.bincount(self.flavor_indices, weights=self.food_sum[flavor_foods],
+                                               minlength=size)
+        self.group_count['flavor'] = np.bincount(self.flavor_indices, weights=self.food_count[flavor_foods],
+                                                 minlength=size).astype(np.int64)
+
+        # Theo (ẩm thực, loại món), dùng cho heatmap
+        n_categories = max(len(self.labels['category']), 1)
+        cuisine_codes, category_codes = self.food_groups['cuisine'], self.food_groups['category']
+        valid = (cuisine_codes >= 0) & (category_codes >= 0)
+        self.pair_codes = np.where(valid, cuisine_codes * n_categories + category_codes, -1)
+        size = len(self.labels['cuisine']) * n_categories
+        self.pair_sum = np.bincount(self.pair_codes[valid], weights=self.food_sum[valid], minlength=size)
+        self.pair_count = np.bincount(self.pair_codes[valid], weights=self.food_count[valid],
+                                      minlength=size).astype(np.int64)
+
+        # Theo điểm đánh giá: điểm -> số lượng
+        self.rating_counts = {float(value): int(count)
+                              for value, count in ratings_df['rating'].value_counts().items()}
+
+        # Theo tháng: mã tháng -> [tổng điểm, số lượng]
+        self.months = {}
+        self._pair_keys = None
+        if 'timestamp' in ratings_df.columns:
+            self._build_months(ratings_df, ratings)
+
+    def matches(self, ratings_df):
+        """
+        Số liệu có phản ánh đúng ratings_df hay không
+
+        Các dòng mới hơn watermark phải đúng là các đánh giá đã cập nhật qua apply_rating; đánh giá bị
+        sửa hoặc xóa bên ngoài ứng dụng làm lệch số dòng mới hoặc tổng số dòng.
+        """
+        with self._lock:
+            n_ratings, n_applied = self.n_ratings, self.n_applied
+        if len(ratings_df) != n_ratings:
+            return False
+        if self.watermark is None:
+            return _ratings_watermark(ratings_df) is None and _ratings_hash(ratings_df) == self.content_hash
+
+        max_id, max_timestamp = self.watermark
+        newer = (ratings_df['id'] > max_id) | (ratings_df['timestamp'] > max_timestamp)
+        return int(newer.sum()) == n_applied
+
+    def _build_months(self, ratings_df, ratings):
+        month_codes = _month_codes(ratings_df['timestamp'])
+        valid = month_codes >= 0
+        if valid.any():
+            offset = month_codes[valid].min()
+            shifted = month_codes[valid] - offset
+            sums = np.bincount(shifted, weights=ratings[valid])
+            counts = np.bincount(shifted)
+            self.months = {int(code + offset): [float(sums[code]), int(counts[code])]
+                           for code in np.flatnonzero(counts)}
+
+        # Tháng của từng cặp (khách hàng, món) để chuyển đánh giá được cập nhật sang tháng hiện tại.
+        # Mảng khóa đã sắp xếp (12 byte mỗi đánh giá) thay cho dict Python; dữ liệu sắp mới nhất trước
+        # nên mỗi cặp giữ lần xuất hiện đầu tiên
+        pairs = pd.DataFrame({'customer_id': ratings_df['customer_id'].to_numpy(),
+                              'food_id': ratings_df['food_id'].to_numpy(), 'month': month_codes})
+        pairs = pairs.drop_duplicates(['customer_id', 'food_id'])
+        customer_codes, customers = pd.factorize(pairs['customer_id'])
+        food_codes, foods = pd.factorize(pairs['food_id'])
+        self._pair_customers = {customer_id: code for code, customer_id in enumerate(customers)}
+        self._pair_foods = {food_id: code for code, food_id in enumerate(foods)}
+        self._pair_width = max(len(foods), 1)
+        keys = customer_codes.astype(np.int64) * self._pair_width + food_codes
+        order = np.argsort(keys)
+        self._pair_keys = keys[order]
+        self._pair_months = pairs['month'].to_numpy()[order]
+        # Cặp mới sau khi xây: (customer_id, food_id) -> mã tháng
+        self._extra_months = {}
+
+    def _swap_month(self, customer_id, food_id, month):
+        """Ghi tháng mới cho một cặp (khách hàng, món), trả về tháng cũ hoặc None nếu chưa có"""
+        customer_code = self._pair_customers.get(customer_id)
+        food_code = self._pair_foods.get(food_id)
+        if customer_code is not None and food_code is not None:
+            key = customer_code * self._pair_width + food_code
+            i = np.searchsorted(self._pair_keys, key)
+            if i < len(self._pair_keys) and self._pair_keys[i] == key:
+                previous = int(self._pair_months[i])
+                self._pair_months[i] = month
+                return previous if previous >= 0 else None
+        previous = self._extra_months.get((customer_id, food_id))
+        self._extra_months[(customer_id, food_id)] = month
+        return previous
+
+    def _add(self, sums, counts, index, rating_delta, count_delta):
+        sums[index] += rating_delta
+        counts[index] += count_delta
+
+    def apply_rating(self, customer_id, food_id, rating, previous_rating=None):
+        """
+        Cập nhật số liệu sau một đánh giá mới hoặc đánh giá được sửa (listener của add_rating)
+
+        Args:
+            previous_rating (float, optional): Điểm cũ nếu khách hàng đã đánh giá món này, None nếu là đánh giá mới
+        """
+        rating = float(rating)
+        is_new = previous_rating is None
+        rating_delta = rating if is_new else rating - float(previous_rating)
+        count_delta = 1 if is_new else 0
+
+        with self._lock:
+            self.n_ratings += count_delta
+            self.n_applied += 1
+            if not is_new:
+                previous_key = float(previous_rating)
+                self.rating_counts[previous_key] = self.rating_counts.get(previous_key, 0) - 1
+                if self.rating_counts[previous_key] <= 0:
+                    del self.rating_counts[previous_key]
+            self.rating_counts[rating] = self.rating_counts.get(rating, 0) + 1
+
+            position = self.food_codes.get(food_id)
+            if position is not None:
+                self._add(self.food_sum, self.food_count, position, rating_delta, count_delta)
+                for attribute in ('cuisine', 'category'):
+                    code = self.food_groups[attribute][position]
+                    if code >= 0:
+                        self._add(self.group_sum[attribute], self.group_count[attribute], code,
+                                  rating_delta, count_delta)
+                if self.pair_codes[position] >= 0:
+                    self._add(self.pair_sum, self.pair_count, self.pair_codes[position], rating_delta, count_delta)
+                for code in self.flavor_indices[self.flavor_indptr[position]:self.flavor_indptr[position + 1]]:
+                    self._add(self.group_sum['flavor'], self.group_count['flavor'], code, rating_delta, count_delta)
+
+            if self._pair_keys is not None:
+                # add_rating đặt timestamp = CURRENT_TIMESTAMP: đánh giá (mới hoặc sửa) chuyển sang tháng hiện tại
+                month = _current_month_code()
+                previous_month = self._swap_month(customer_id, food_id, month)
+                if not is_new and previous_month is not None and previous_month in self.months:
+                    bucket = self.months[previous_month]
+                    bucket[0] -= float(previous_rating)
+                    bucket[1] -= 1
+                    if bucket[1] <= 0:
+                        del self.months[previous_month]
+                if is_new or previous_month is not None:
+                    bucket = self.months.setdefault(month, [0.0, 0])
+                    bucket[0] += rating
+                    bucket[1] += 1
+
+    def food_stats(self, min_count=0, mask=None):
+        """
+        Số lượng và điểm trung bình theo món
+
+        Args:
+            min_count (int): Chỉ giữ các món có ít nhất min_count đánh giá
+            mask (ndarray, optional): Mảng bool theo vị trí trong foods_df, chỉ giữ các món được chọn
+
+        Returns:
+            DataFrame: food_id, count, avg_rating, sắp theo food_id
+        """
+        with self._lock:
+            counts = self.food_count.copy()
+            sums = self.food_sum.copy()
+        positions = np.fromiter(self.food_codes.values(), dtype=np.int64, count=len(self.food_codes))
+        keep = np.zeros(len(counts), dtype=bool)
+        keep[positions] = True
+        keep &= (counts > 0) & (counts >= min_count)
+        if mask is not None:
+            keep &= mask
+        frame = pd.DataFrame({
+            'food_id': self.food_ids[keep],
+            'count': counts[keep],
+            'avg_rating': sums[keep] / counts[keep],
+        })
+        return frame.sort_values('food_id', kind='stable').reset_index(drop=True)
+
+    def group_stats(self, attribute, min_count=0):
+        """
+        Điểm trung bình và số lượng đánh giá theo ẩm thực, loại món hoặc hương vị
+
+        Args:
+            attribute (str): 'cuisine', 'category' hoặc 'flavor'
+            min_count (int): Chỉ giữ các nhóm có ít nhất min_count đánh giá
+
+        Returns:
+            DataFrame: <attribute>, avg_rating, count, sắp theo tên nhóm
+        """
+        with self._lock:
+            sums = self.group_sum[attribute].copy()
+            counts = self.group_count[attribute].copy()
+        return _stats_frame(attribute, self.labels[attribute], sums, counts, min_count)
+
+    def cuisine_category_stats(self):
+        """
+        Điểm trung bình theo từng cặp (ẩm thực, loại món)
+
+        Returns:
+            DataFrame: cuisine, category, rating (trung bình), count
+        """
+        with self._lock:
+            sums = self.pair_sum.copy()
+            counts = self.pair_count.copy()
+        keep = np.flatnonzero(counts)
+        n_categories = max(len(self.labels['category']), 1)
+        return pd.DataFrame({
+            'cuisine': np.asarray(self.labels['cuisine'], dtype=object)[keep // n_categories],
+            'category': np.asarray(self.labels['category'], dtype=object)[keep % n_categories],
+            'rating': sums[keep] / counts[keep],
+            'count': counts[keep],
+        })
+
+    def monthly_stats(self):
+        """
+        Điểm trung bình theo tháng
+
+        Returns:
+            DataFrame: month (ngày đầu tháng), rating (trung bình), count, sắp theo thời gian;
+                rỗng nếu dữ liệu không có timestamp
+        """
+        with self._lock:
+            months = sorted((code, total, count) for code, (total, count) in self.months.items())
+        codes = np.array([code for code, _, _ in months], dtype=np.int64)
+        return pd.DataFrame({
+            'month': pd.to_datetime({'year': codes // 12, 'month': codes % 12 + 1, 'day': 1}) if len(codes)
+            else pd.Series(dtype='datetime64[ns]'),
+            'rating': np.array([total / count for _, total, count in months], dtype=float),
+            'count': np.array([count for _, _, count in months], dtype=np.int64),
+        })
+
+    def rating_distribution(self):
+        """
+        Số lượng đánh giá theo từng mức điểm
+
+        Returns:
+            Series: điểm -> số lượng, sắp theo điểm
+        """
+        with self._lock:
+            counts = dict(self.rating_counts)
+        return pd.Series(counts, dtype=np.int64).sort_index()
+
+
+# Số liệu tổng hợp của dữ liệu gần nhất, chỉ xây lại khi danh mục hoặc dữ liệu đánh giá thay đổi
+_aggregates_cache = {'key': None, 'aggregates': None}
+_aggregates_lock = threading.Lock()
+
+
+def get_rating_aggregates(ratings_df, foods_df):
+    """
+    Lấy số liệu tổng hợp cho ratings_df, dùng lại bản đã có nếu danh mục món không đổi và dữ liệu khớp
+
+    Đánh giá thêm qua add_rating được cập nhật tại chỗ (apply_rating) nên lần tải ratings sau vẫn khớp.
+    Đánh giá thêm, sửa hoặc xóa bên ngoài ứng dụng (xem RatingAggregates.matches) làm số liệu được xây lại.
+
+    Args:
+        ratings_df (DataFrame): Toàn bộ dữ liệu đánh giá
+        foods_df (DataFrame): Danh mục món ăn
+
+    Returns:
+        RatingAggregates: Số liệu tổng hợp
+    """
+    columns = [column for column in CATALOG_COLUMNS if column in foods_df.columns]
+    # Số liệu theo món được lưu theo vị trí trong foods_df nên khóa phụ thuộc thứ tự dòng
+    key = _frame_key(foods_df[columns])
+
+    with _aggregates_lock:
+        aggregates = _aggregates_cache['aggregates']
+        if aggregates is None or _aggregates_cache['key'] != key or not aggregates.matches(ratings_df):
+            aggregates = RatingAggregates(ratings_df, foods_df)
+            _aggregates_cache['aggregates'] = aggregates
+            _aggregates_cache['key'] = key
+        return aggregates
+
+
+def apply_rating(customer_id, food_id, rating, previous_rating=None):
+    """Listener cho data_loader.register_rating_listener: cập nhật số liệu tổng hợp đang dùng"""
+    aggregates = _aggregates_cache['aggregates']
+    if aggregates is not None:
+        aggregates.apply_rating(customer_id, food_id, rating, previous_rating)
@@ -1,19 +1,14 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 import random
-import plotly.express as px
-import plotly.graph_objects as go
-from PIL import Image
-import time
-import base64
-from io import BytesIO
+from functools import partial
 
 # Import modules
-from data_generator import create_food_items, create_customers, create_ratings
-from recommenders import ContentBasedRecommender, CollaborativeRecommender, HybridRecommender
+from aggregates import cuisine_price_table
+from chart_data import RATING_BIN_EDGES, histogram_counts
+from attribute_index import get_attribute_index
+from search_index import get_search_index
 from utils import (format_price, generate_food_card, get_popular_foods, get_customer_history,
                    get_cuisine_popularity, get_flavor_popularity, plot_ratings_distribution,
                    plot_cuisine_popularity)
@@ -24,60 +19,84 @@ np.random.seed(42)
 random.seed(42)
 
 
+def get_rated_foods(customer_id, ratings_df, rated_index=None):
+    """Lấy (food_id, rating) các món khách hàng đã đánh giá, tra chỉ mục nếu có thay vì quét ratings_df"""
+    if rated_index is not None:
+        return rated_index.ratings_frame(customer_id)
+    return ratings_df[ratings_df['customer_id'] == customer_id]
+
+
+def get_filtered_popular_foods(ratings_df, foods_df, filters, top_n, attribute_index=None):
+    """Món phổ biến trong số các món thỏa bộ lọc (dùng khi mô hình không có gợi ý)"""
+    if attribute_index is None:
+        attribute_index = get_attribute_index(foods_df)
+    # Lọc theo món trên số liệu tổng hợp thay vì cắt ratings_df (tránh xây lại số liệu cho tập con)
+    return get_popular_foods(ratings_df, foods_df, top_n=top_n, mask=attribute_index.filter_mask(filters))
+
+
 def show_recommendation_tab(sidebar_options, foods_df, ratings_df, content_rec, collab_rec, hybrid_rec):
     """Display content for the Recommendation tab"""
     if sidebar_options["recommend_button"]:
+        # Bộ lọc được áp dụng ngay trong mô hình trước khi chọn top-N
+        filters = {
+            'cuisines': sidebar_options["cuisine_filter"],
+            'price_range': sidebar_options["price_range"],
+            'flavors': sidebar_options["flavors_filter"],
+        }
+        num_recommendations = sidebar_options["num_recommendations"]
+        customer_id = sidebar_options["selected_customer"]
+        attribute_index = getattr(content_rec, 'attribute_index', None)
+
         st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
         st.markdown(
-            f'<h2 class="sub-header">Món ăn được gợi ý cho khách hàng #{sidebar_options["selected_customer"]}</h2>',
+            f'<h2 class="sub-header">Món ăn được gợi ý cho khách hàng #{customer_id}</h2>',
             unsafe_allow_html=True)
 
         with st.spinner("Đang tạo gợi ý món ăn cho bạn..."):
             # Lấy gợi ý dựa trên phương pháp được chọn
             if sidebar_options["rec_type"] == "Content-Based (Dựa trên nội dung)":
                 # Lấy món ăn khách hàng đã đánh giá cao nhất
-                user_ratings = ratings_df[ratings_df['customer_id'] == sidebar_options["selected_customer"]]
+                user_ratings = get_rated_foods(customer_id, ratings_df,
+                                               getattr(collab_rec, 'rated_index', None))
                 if len(user_ratings) > 0:
                     top_rated = user_ratings.sort_values('rating', ascending=False).head(1)
                     top_food_id = top_rated['food_id'].values[0]
-                    recommendations = content_rec.recommend(top_food_id,
-                                                            top_n=sidebar_options["num_recommendations"] * 3)
+                    recommendations = cached_recommendation(
+                        'content',
+                        lambda: content_rec.recommend(top_food_id, top_n=num_recommendations, filters=filters),
+                        food_id=top_food_id, top_n=num_recommendations, filters=filters, source='generated')
                 else:
                     # Nếu khách hàng chưa có đánh giá nào
-                    popular_foods = get_popular_foods(ratings_df, foods_df,
-                                                      top_n=sidebar_options["num_recommendations"])
-                    recommendations = popular_foods
+                    recommendations = get_filtered_popular_foods(ratings_df, foods_df, filters,
+                                                                 num_recommendations, attribute_index)
 
             elif sidebar_options["rec_type"] == "Collaborative (Dựa trên cộng đồng)":
                 if collab_rec is None:
                     # Nếu recommender chưa được khởi tạo
                     st.warning("Chưa khởi tạo collaborative recommender. Đang hiển thị món ăn phổ biến thay thế.")
-                    recommendations = get_popular_foods(ratings_df, foods_df,
-                                                        top_n=sidebar_options["num_recommendations"])
+                    recommendations = get_filtered_popular_foods(ratings_df, foods_df, filters,
+                                                                 num_recommendations, attribute_index)
                 else:
-                    if collab_rec is None:
-                        # Nếu recommender chưa được khởi tạo
-                        st.warning("Chưa khởi tạo collaborative recommender. Đang hiển thị món ăn phổ biến thay thế.")
-                        recommendations = get_popular_foods(ratings_df, foods_df,
-                                                            top_n=sidebar_options["num_recommendations"])
-                    else:
-                        recommendations = collab_rec.recommend_for_customer(sidebar_options["selected_customer"],
-                                                                            top_n=sidebar_options[
-                                                                                      "num_recommendations"] * 3)
-                        if recommendations.empty:
-                            # Nếu không có đủ dữ liệu
-                            popular_foods = get_popular_foods(ratings_df, foods_df,
-                                                              top_n=sidebar_options["num_recommendations"])
-                            recommendations = popular_foods
+                    recommendations = cached_recommendation(
+                        'collab',
+                        lambda: collab_rec.recommend_for_customer(customer_id, top_n=num_recommendations,
+                                                                  filters=filters),
+                        customer_id=customer_id, top_n=num_recommendations, filters=filters,
+                        source='generated')
+                    if recommendations.empty:
+                        # Nếu không có đủ dữ liệu
+                        recommendations = get_filtered_popular_foods(ratings_df, foods_df, filters,
+                                                                     num_recommendations, attribute_index)
 
             else:  # Hybrid
                 # Lấy món ăn khách hàng đã đánh giá cao nhất
-                user_ratings = ratings_df[ratings_df['customer_id'] == sidebar_options["selected_customer"]]
+                user_ratings = get_rated_foods(customer_id, ratings_df,
+                                               getattr(collab_rec, 'rated_index', None))
                 if hybrid_rec is None:
                     # Nếu recommender chưa được khởi tạo
                     st.warning("Chưa khởi tạo hybrid recommender. Đang hiển thị món ăn phổ biến thay thế.")
-                    recommendations = get_popular_foods(ratings_df, foods_df,
-                                                        top_n=sidebar_options["num_recommendations"])
+                    recommendations = get_filtered_popular_foods(ratings_df, foods_df, filters,
+                                                                 num_recommendations, attribute_index)
                 else:
                     # Sử dụng món ăn được đánh giá cao nhất (nếu có) như một gợi ý nội dung
                     food_id = None
@@ -85,36 +104,27 @@ def show_recommendation_tab(sidebar_options, foods_df, ratings_df, content_rec,
                         top_rated = user_ratings.sort_values('rating', ascending=False).head(1)
                         food_id = top_rated['food_id'].values[0]
 
-                    recommendations = hybrid_rec.recommend(
-                        customer_id=sidebar_options["selected_customer"],
-                        food_id=food_id,
-                        top_n=sidebar_options["num_recommendations"] * 3
-                    )
+                    recommendations = cached_recommendation(
+                        'hybrid',
+                        lambda: hybrid_rec.recommend(
+                            customer_id=customer_id,
+                            food_id=food_id,
+                            top_n=num_recommendations,
+                            filters=filters
+                        ),
+                        customer_id=customer_id, food_id=food_id, top_n=num_recommendations, filters=filters,
+                        source='generated')
 
                     if recommendations.empty:
                         # Nếu không có đủ dữ liệu
-                        popular_foods = get_popular_foods(ratings_df, foods_df,
-                                                          top_n=sidebar_options["num_recommendations"])
-                        recommendations = popular_foods
-
-            # Áp dụng bộ lọc nếu có
-            if sidebar_options["cuisine_filter"]:
-                recommendations = recommendations[recommendations['cuisine'].isin(sidebar_options["cuisine_filter"])]
-
-            if sidebar_options["price_range"]:
-                recommendations = recommendations[(recommendations['price'] >= sidebar_options["price_range"][0]) &
-                                                  (recommendations['price'] <= sidebar_options["price_range"][1])]
-
-            if sidebar_options["flavors_filter"]:
-                # Lọc món ăn có chứa ít nhất một trong các hương vị được chọn
-                recommendations = recommendations[recommendations['flavors'].apply(
-                    lambda x: any(flavor.strip() in sidebar_options["flavors_filter"] for flavor in x.split(',')))]
+                        recommendations = get_filtered_popular_foods(ratings_df, foods_df, filters,
+                                                                     num_recommendations, attribute_index)
 
             # Hiển thị kết quả
             if recommendations.empty:
                 st.warning("Không tìm thấy món ăn phù hợp với bộ lọc. Vui lòng thử lại với các điều kiện khác.")
             else:
-                recommendations = recommendations.head(sidebar_options["num_recommendations"])
+                recommendations = recommendations.head(num_recommendations)
 
                 # Hiển thị món ăn dưới dạng grid
                 cols = st.columns(3)
@@ -148,6 +158,7 @@ def show_recommendation_tab(sidebar_options, foods_df, ratings_df, content_rec,
 
 def show_analysis_tab(ratings_df, foods_df):
     """Display content for the Analysis tab"""
+    import plotly.express as px
     st.markdown('<h2 class="sub-header">📊 Phân tích dữ liệu</h2>', unsafe_allow_html=True)
 
     # Phân tích theo loại
@@ -201,7 +212,7 @@ def show_analysis_tab(ratings_df, foods_df):
 
     else:  # Giá trung bình theo ẩm thực
         st.markdown('<div class="card">', unsafe_allow_html=True)
-        cuisine_price = foods_df.groupby('cuisine')['price'].mean().reset_index()
+        cuisine_price = cuisine_price_table(foods_df)[['cuisine', 'price']]
         cuisine_price = cuisine_price.sort_values('price', ascending=False)
 
         fig = px.bar(
@@ -254,6 +265,7 @@ def show_analysis_tab(ratings_df, foods_df):
 
 def show_customer_tab(sidebar_options, customers_df, ratings_df, foods_df):
     """Display content for the Customer tab"""
+    import plotly.express as px
     selected_customer = sidebar_options["selected_customer"]
 
     st.markdown('<h2 class="sub-header">👤 Thông tin khách hàng</h2>', unsafe_allow_html=True)
@@ -315,12 +327,13 @@ def show_customer_tab(sidebar_options, customers_df, ratings_df, foods_df):
 
             # Biểu đồ phân phối đánh giá của khách hàng
             st.markdown('<div class="card">', unsafe_allow_html=True)
-            fig = px.histogram(
-                history,
-                x='rating',
-                nbins=9,
+            # Đếm sẵn theo khoảng điểm, biểu đồ chỉ nhận số lượng của từng khoảng
+            fig = px.bar(
+                histogram_counts(history['rating'], bins=RATING_BIN_EDGES),
+                x='center',
+                y='count',
                 title=f'Phân phối đánh giá của khách hàng #{selected_customer}',
-                labels={'rating': 'Điểm đánh giá', 'count': 'Số lượng'},
+                labels={'center': 'Điểm đánh giá', 'count': 'Số lượng'},
                 color_discrete_sequence=['#7E57C2']
             )
 
@@ -352,8 +365,11 @@ def show_customer_tab(sidebar_options, customers_df, ratings_df, foods_df):
                 )
 
 
-def show_explore_section(foods_df):
+def show_explore_section(foods_df, attribute_index=None):
     """Display the Explore New Foods section"""
+    if attribute_index is None:
+        attribute_index = get_attribute_index(foods_df)
+
     st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
     st.markdown('<h2 class="sub-header">✨ Khám phá món ăn mới</h2>', unsafe_allow_html=True)
 
@@ -377,19 +393,16 @@ def show_explore_section(foods_df):
                 discoveries = foods_df[(foods_df['price'] >= price_min) & (foods_df['price'] <= price_max)].sample(
                     min(6, len(foods_df)))
             elif explore_options == "Theo ẩm thực":
-                selected_cuisine = st.session_state.get('selected_cuisine', random.choice(foods_df['cuisine'].unique()))
-                discoveries = foods_df[foods_df['cuisine'] == selected_cuisine].sample(
-                    min(6, len(foods_df[foods_df['cuisine'] == selected_cuisine])))
+                selected_cuisine = st.session_state.get('selected_cuisine',
+                                                        random.choice(attribute_index.values('cuisine')))
+                matches = foods_df[attribute_index.mask('cuisine', [selected_cuisine])]
+                discoveries = matches.sample(min(6, len(matches)))
             else:  # Theo hương vị
-                # Tạo danh sách hương vị duy nhất
-                all_flavors = list(set(
-                    f.strip() for flavors in foods_df['flavors'] for f in flavors.split(',')
-                ))
-
                 # Chọn hương vị mặc định nếu chưa có trong session
-                selected_flavor = st.session_state.get('selected_flavor', random.choice(all_flavors))
-                discoveries = foods_df[foods_df['flavors'].str.contains(selected_flavor)].sample(
-                    min(6, len(foods_df[foods_df['flavors'].str.contains(selected_flavor)])))
+                selected_flavor = st.session_state.get('selected_flavor',
+                                                       random.choice(attribute_index.values('flavors')))
+                matches = foods_df[attribute_index.mask('flavors', [selected_flavor])]
+                discoveries = matches.sample(min(6, len(matches)))
 
             st.markdown("<h3>Món ăn được khám phá:</h3>", unsafe_allow_html=True)
 
@@ -411,19 +424,13 @@ def show_explore_section(foods_df):
         elif explore_options == "Theo ẩm thực":
             st.session_state.selected_cuisine = st.selectbox(
                 "Chọn ẩm thực:",
-                sorted(foods_df['cuisine'].unique()),
+                attribute_index.values('cuisine'),
                 key=f"cuisine_selectbox_{explore_options}"
             )
         elif explore_options == "Theo hương vị":
-            # Tạo danh sách hương vị duy nhất
-            all_flavors = set()
-            for flavors_str in foods_df['flavors']:
-                for flavor in flavors_str.split(','):
-                    all_flavors.add(flavor.strip())
-
             st.session_state.selected_flavor = st.selectbox(
                 "Chọn hương vị:",
-                sorted(list(all_flavors)),
+                attribute_index.values('flavors'),
                 key=f"flavor_selectbox_{explore_options}"
             )
 
@@ -436,12 +443,15 @@ def main():
     create_header()
 
 
+import os
 import streamlit as st
 import pandas as pd
-from recommenders import ContentBasedRecommender, CollaborativeRecommender, HybridRecommender
 from data_loader import load_foods_from_db, load_customers_from_db, load_ratings_from_db, get_customer_ratings, \
-    add_rating, get_food_details
-from db_utils import get_connection, close_connection
+    add_rating, get_food_details, get_data_version, register_rating_listener, load_precomputed_recommendations
+from db_utils import close_connection
+from model_registry import ModelRegistry, BackgroundTrainer, compute_data_version, ARTIFACT_DIR
+from result_cache import RecommendationCache
+from aggregates import apply_rating as apply_aggregate_rating
 import visualizations as viz
 
 # Thiết lập trang
@@ -582,6 +592,13 @@ def generate_food_card(food, score_type=None, score=None):
     return html
 
 
+# Số món láng giềng giữ lại cho mỗi món trong content-based (đủ cho top_n lớn nhất của giao diện)
+CONTENT_TOP_K = 100
+
+# Phục vụ gợi ý dựa trên cộng đồng từ bảng recommendations (batch_recommend.py) khi không có bộ lọc
+USE_PRECOMPUTED_RECOMMENDATIONS = os.getenv('USE_PRECOMPUTED_RECOMMENDATIONS', '0') == '1'
+
+
 def load_data():
     """Tải dữ liệu từ database"""
     with st.spinner('Đang tải dữ liệu...'):
@@ -597,25 +614,93 @@ def load_data():
         return foods_df, customers_df, ratings_df
 
 
+@st.cache_resource
+def get_model_registry():
+    """Kho mô hình dùng chung cho mọi phiên Streamlit trong tiến trình"""
+    # Mô hình được lưu vào ARTIFACT_DIR, lần khởi động sau chỉ cần memory-map thay vì huấn luyện lại
+    registry = ModelRegistry(content_top_k=CONTENT_TOP_K, artifact_dir=ARTIFACT_DIR)
+    # Đánh giá mới từ add_rating được fold-in ngay vào mô hình collaborative, không chờ huấn luyện lại
+    register_rating_listener(partial(registry.apply_rating, name='database'))
+    return registry
+
+
+@st.cache_resource
+def register_aggregates_listener():
+    """Số liệu tổng hợp của biểu đồ được cập nhật theo từng đánh giá mới, không phải gom lại toàn bộ ratings"""
+    register_rating_listener(apply_aggregate_rating)
+    return True
+
+
+@st.cache_resource
+def get_background_trainer():
+    """Luồng nền cập nhật mô hình khi dữ liệu thay đổi, dùng chung cho mọi phiên"""
+    return BackgroundTrainer(get_model_registry(), name='database').start()
+
+
+@st.cache_resource
+def get_result_cache():
+    """Bộ nhớ đệm kết quả gợi ý dùng chung cho mọi phiên"""
+    # Đăng ký sau listener của registry để kết quả chỉ bị xóa khi đánh giá mới đã được fold-in
+    get_model_registry()
+    cache = RecommendationCache()
+    register_rating_listener(cache.on_rating)
+    return cache
+
+
+def model_cache_version(name):
+    """Phiên bản mô hình trong khóa bộ nhớ đệm: (nguồn, thế hệ hiện tại trong registry)"""
+    status = get_model_registry().status(name)
+    return name, status['generation'] if status is not None else None
+
+
+def cached_recommendation(algorithm, compute, customer_id=None, food_id=None, features=None, top_n=10, filters=None,
+                          source='database'):
+    """
+    Lấy gợi ý qua bộ nhớ đệm kết quả, compute() chỉ được gọi khi chưa có kết quả hợp lệ
+
+    Args:
+        source (str): Tên bộ mô hình trong registry đã tính gợi ý ('database' hoặc 'generated'), khóa gồm
+            tên và thế hệ của bộ mô hình đó nên kết quả hai nguồn không dùng chung khóa
+    """
+    cache = get_result_cache()
+    key = cache.make_key(algorithm, customer_id=customer_id, food_id=food_id, features=features, top_n=top_n,
+                         filters=filters, model_version=model_cache_version(source))
+    return cache.get_or_compute(key, compute)
+
+
 def initialize_recommenders(foods_df, ratings_df, customers_df):
     """Khởi tạo các recommender"""
-    if 'recommenders_initialized' not in st.session_state:
-        with st.spinner('Đang huấn luyện mô hình gợi ý...'):
-            # Khởi tạo recommenders
-            content_recommender = ContentBasedRecommender()
-            collab_recommender = CollaborativeRecommender()
-            hybrid_recommender = HybridRecommender()
-
-            # Huấn luyện các mô hình
-            content_recommender.fit(foods_df)
-            collab_recommender.fit(ratings_df, foods_df)
-            hybrid_recommender.fit(foods_df, ratings_df, customers_df)
+    registry = get_model_registry()
+    # Phiên bản dữ liệu do data_loader duy trì, tăng mỗi khi ratings hoặc danh mục món thay đổi
+    version = get_data_version()
 
-            # Lưu các recommender vào session_state
-            st.session_state.content_recommender = content_recommender
-            st.session_state.collab_recommender = collab_recommender
-            st.session_state.hybrid_recommender = hybrid_recommender
-            st.session_state.recommenders_initialized = True
+    current = registry.current('database')
+    if current is None:
+        # Lần đầu chưa có mô hình nào để phục vụ nên phải chờ (thường chỉ memory-map artifact đã lưu)
+        with st.spinner('Đang huấn luyện mô hình gợi ý...'):
+            models = registry.get_models(version, foods_df, ratings_df, customers_df, name='database')
+    else:
+        current_version, models = current
+        if current_version != version:
+            # Tiếp tục phục vụ mô hình hiện tại, luồng nền cập nhật rồi hoán đổi mô hình mới vào registry
+            get_background_trainer().submit(version, foods_df, ratings_df, customers_df)
+
+    status = registry.status('database')
+    if status is not None:
+        st.sidebar.caption(f"Mô hình cập nhật lúc {status['last_trained_at']:%H:%M:%S %d/%m/%Y} "
+                           f"({status['duration']:.1f}s)")
+    cache_stats = get_result_cache().stats()
+    st.sidebar.caption(f"Bộ nhớ đệm gợi ý: {cache_stats['hits']:,} hit / {cache_stats['misses']:,} miss "
+                       f"({cache_stats['hit_rate']:.0%}), {cache_stats['size']:,}/{cache_stats['max_entries']:,} kết quả")
+
+    # Lưu tham chiếu tới các mô hình dùng chung vào session_state
+    st.session_state.content_recommender = models['content']
+    st.session_state.collab_recommender = models['collab']
+    st.session_state.hybrid_recommender = models['hybrid']
+    st.session_state.rated_index = models['rated_index']
+    st.session_state.attribute_index = models['attribute_index']
+    st.session_state.search_index = models['search_index']
+    st.session_state.recommenders_initialized = True
 
 
 def main():
@@ -631,6 +716,7 @@ def main():
 
     # Tải dữ liệu
     foods_df, customers_df, ratings_df = load_data()
+    register_aggregates_listener()
 
     # Khởi tạo các recommender
     initialize_recommenders(foods_df, ratings_df, customers_df)
@@ -674,6 +760,39 @@ def main():
         st.sidebar.success("Đã đóng kết nối Database")
 
 
+@st.cache_resource(max_entries=1)
+def get_precomputed_lookup(model_version):
+    """
+    Bảng gợi ý tính trước theo khách hàng, chỉ truy vấn lại generated_at khi thế hệ mô hình database đổi
+    thay vì ở mỗi lần Streamlit chạy lại script
+    """
+    return load_precomputed_recommendations()
+
+
+def get_precomputed_recommendations(customer_id, foods_df, top_n):
+    """
+    Lấy gợi ý tính trước của khách hàng, bỏ các món đã đánh giá sau lần tính
+
+    Returns:
+        DataFrame | None: Cùng dạng với recommend_for_customer, None nếu không đủ top_n món
+    """
+    entry = get_precomputed_lookup(model_cache_version('database')).get(customer_id)
+    if entry is None:
+        return None
+
+    food_ids, scores = entry
+    rated_index = st.session_state.rated_index
+    keep = ~np.isin(food_ids, rated_index.rated_food_ids(customer_id))
+    positions = pd.Series(food_ids[keep]).map(rated_index.food_codes)
+    known = positions.notna().to_numpy()
+    if known.sum() < top_n:
+        return None
+
+    recommendations = foods_df.iloc[positions[known].astype(int).to_numpy()[:top_n]].copy()
+    recommendations['predicted_rating'] = scores[keep][known][:top_n]
+    return recommendations
+
+
 def show_recommendations(customer_id, foods_df, ratings_df, customers_df):
     st.header("Gợi ý món ăn")
 
@@ -703,7 +822,7 @@ def show_recommendations(customer_id, foods_df, ratings_df, customers_df):
         # Thêm bộ lọc tùy chọn
         with st.expander("Bộ lọc tùy chọn"):
             # Lọc theo ẩm thực
-            cuisine_options = sorted(foods_df['cuisine'].unique())
+            cuisine_options = st.session_state.attribute_index.values('cuisine')
             cuisine_filter = st.multiselect(
                 "Lọc theo ẩm thực:",
                 options=cuisine_options,
@@ -724,19 +843,20 @@ def show_recommendations(customer_id, foods_df, ratings_df, customers_df):
 
         # Lấy gợi ý dựa trên collaborative filtering
         with st.spinner("Đang tạo gợi ý món ăn dựa trên cộng đồng..."):
-            # Lấy nhiều gợi ý hơn để có thể áp dụng bộ lọc
-            recommendations = collab_recommender.recommend_for_customer(customer_id, top_n=num_recommendations * 3)
-
-            # Áp dụng bộ lọc nếu có
-            if cuisine_filter:
-                recommendations = recommendations[recommendations['cuisine'].isin(cuisine_filter)]
-
-            if price_range != (min_price, max_price):
-                recommendations = recommendations[(recommendations['price'] >= price_range[0]) &
-                                                  (recommendations['price'] <= price_range[1])]
-
-            # Cắt lại danh sách kết quả theo số lượng yêu cầu
-            recommendations = recommendations.head(num_recommendations)
+            # Bộ lọc được áp dụng trong mô hình nên chỉ cần lấy đúng num_recommendations món
+            filters = {
+                'cuisines': cuisine_filter,
+                'price_range': price_range if price_range != (min_price, max_price) else None,
+            }
+            recommendations = None
+            if USE_PRECOMPUTED_RECOMMENDATIONS and not cuisine_filter and filters['price_range'] is None:
+                recommendations = get_precomputed_recommendations(customer_id, foods_df, num_recommendations)
+            if recommendations is None:
+                recommendations = cached_recommendation(
+                    'collab',
+                    lambda: collab_recommender.recommend_for_customer(customer_id, top_n=num_recommendations,
+                                                                      filters=filters),
+                    customer_id=customer_id, top_n=num_recommendations, filters=filters)
 
             # Hiển thị kết quả
             if not recommendations.empty:
@@ -782,7 +902,7 @@ def show_recommendations(customer_id, foods_df, ratings_df, customers_df):
         content_recommender = st.session_state.content_recommender
 
         # Tạo danh sách món ăn đã đánh giá bởi khách hàng
-        rated_foods = ratings_df[ratings_df['customer_id'] == customer_id]
+        rated_foods = get_rated_foods(customer_id, ratings_df, st.session_state.rated_index)
 
         if not rated_foods.empty:
             # Lấy danh sách món ăn đã đánh giá cao
@@ -797,7 +917,9 @@ def show_recommendations(customer_id, foods_df, ratings_df, customers_df):
                 )
 
                 # Lấy gợi ý dựa trên nội dung
-                recommendations = content_recommender.recommend(selected_food, top_n=10)
+                recommendations = cached_recommendation(
+                    'content', lambda: content_recommender.recommend(selected_food, top_n=10),
+                    food_id=selected_food, top_n=10)
 
                 # Hiển thị kết quả
                 if not recommendations.empty:
@@ -821,7 +943,9 @@ def show_recommendations(customer_id, foods_df, ratings_df, customers_df):
                                 key="main_features_text_area")
 
         if st.button("Tìm kiếm"):
-            recommendations = content_recommender.get_similar_by_features(features, top_n=10)
+            recommendations = cached_recommendation(
+                'content', lambda: content_recommender.get_similar_by_features(features, top_n=10),
+                features=features, top_n=10)
 
             # Hiển thị kết quả
             if not recommendations.empty:
@@ -845,7 +969,7 @@ def show_recommendations(customer_id, foods_df, ratings_df, customers_df):
         with col1:
             food_id = None
             # Tạo danh sách món ăn đã đánh giá bởi khách hàng
-            rated_foods = ratings_df[ratings_df['customer_id'] == customer_id]
+            rated_foods = get_rated_foods(customer_id, ratings_df, st.session_state.rated_index)
 
             if not rated_foods.empty:
                 st.write("Chọn món ăn yêu thích (không bắt buộc):")
@@ -873,12 +997,15 @@ def show_recommendations(customer_id, foods_df, ratings_df, customers_df):
 
         if st.button("Nhận gợi ý"):
             # Lấy gợi ý kết hợp
-            recommendations = hybrid_recommender.recommend(
-                customer_id=customer_id,
-                food_id=food_id,
-                features=features,
-                top_n=10
-            )
+            recommendations = cached_recommendation(
+                'hybrid',
+                lambda: hybrid_recommender.recommend(
+                    customer_id=customer_id,
+                    food_id=food_id,
+                    features=features,
+                    top_n=10
+                ),
+                customer_id=customer_id, food_id=food_id, features=features, top_n=10)
 
             # Hiển thị kết quả
             if not recommendations.empty:
@@ -896,20 +1023,23 @@ def show_recommendations(customer_id, foods_df, ratings_df, customers_df):
 def search_foods(foods_df):
     st.header("Tìm kiếm món ăn")
 
+    # Chỉ mục thuộc tính của danh mục món (dùng chung với các recommender)
+    attribute_index = st.session_state.get('attribute_index') or get_attribute_index(foods_df)
+
     # Các bộ lọc
     col1, col2, col3 = st.columns(3)
 
     with col1:
         category_filter = st.multiselect(
             "Loại món:",
-            options=sorted(foods_df['category'].unique()),
+            options=attribute_index.values('category'),
             key="category_filter_select"
         )
 
     with col2:
         cuisine_filter = st.multiselect(
             "Ẩm thực:",
-            options=sorted(foods_df['cuisine'].unique()),
+            options=attribute_index.values('cuisine'),
             key="cuisine_filter_select"
         )
 
@@ -926,36 +1056,38 @@ def search_foods(foods_df):
     # Tìm kiếm theo từ khóa
     search_term = st.text_input("Tìm kiếm:", "")
 
-    # Lọc dữ liệu
-    filtered_df = foods_df.copy()
-
-    if category_filter:
-        filtered_df = filtered_df[filtered_df['category'].isin(category_filter)]
-
-    if cuisine_filter:
-        filtered_df = filtered_df[filtered_df['cuisine'].isin(cuisine_filter)]
-
-    filtered_df = filtered_df[(filtered_df['price'] >= price_range[0]) & (filtered_df['price'] <= price_range[1])]
+    # Lọc dữ liệu bằng chỉ mục thuộc tính, chỉ sao chép các món thỏa điều kiện
+    mask = attribute_index.filter_mask({
+        'categories': category_filter,
+        'cuisines': cuisine_filter,
+        'price_range': price_range,
+    })
+    filtered_df = foods_df[mask] if mask is not None else foods_df.copy()
 
     if search_term:
-        # Tìm kiếm trong nhiều cột
-        filtered_df = filtered_df[
-            filtered_df['name'].str.contains(search_term, case=False) |
-            filtered_df['ingredients'].str.contains(search_term, case=False) |
-            filtered_df['flavors'].str.contains(search_term, case=False) |
-            filtered_df['features'].str.contains(search_term, case=False)
-            ]
+        # Tra chỉ mục ngược (không phân biệt dấu, khớp tiền tố) thay vì quét chuỗi trên nhiều cột
+        search_index = st.session_state.get('search_index')
+        if search_index is None:
+            search_index = get_search_index(foods_df)
+        relevance = dict(search_index.search(search_term))
+        filtered_df = filtered_df[filtered_df['food_id'].isin(relevance)]
+        filtered_df = filtered_df.assign(relevance=filtered_df['food_id'].map(relevance))
 
     # Hiển thị kết quả
     st.write(f"Tìm thấy {len(filtered_df)} món ăn")
 
     # Sắp xếp
+    sort_options = ["Tên (A-Z)", "Tên (Z-A)", "Giá (Thấp-Cao)", "Giá (Cao-Thấp)"]
+    if search_term:
+        sort_options.insert(0, "Phù hợp nhất")
     sort_option = st.selectbox(
         "Sắp xếp theo:",
-        options=["Tên (A-Z)", "Tên (Z-A)", "Giá (Thấp-Cao)", "Giá (Cao-Thấp)"]
+        options=sort_options
     )
 
-    if sort_option == "Tên (A-Z)":
+    if sort_option == "Phù hợp nhất":
+        filtered_df = filtered_df.sort_values('relevance', ascending=False, kind='stable')
+    elif sort_option == "Tên (A-Z)":
         filtered_df = filtered_df.sort_values('name', ascending=True)
     elif sort_option == "Tên (Z-A)":
         filtered_df = filtered_df.sort_values('name', ascending=False)
@@ -978,7 +1110,7 @@ def rate_foods(customer_id, foods_df, ratings_df):
 
     with tab1:
         # Danh sách món ăn chưa đánh giá
-        rated_foods = ratings_df[ratings_df['customer_id'] == customer_id]['food_id'].unique()
+        rated_foods = get_rated_foods(customer_id, ratings_df, st.session_state.rated_index)['food_id']
         unrated_foods = foods_df[~foods_df['food_id'].isin(rated_foods)]
 
         if not unrated_foods.empty:
@@ -1049,14 +1181,14 @@ def analyze_data(foods_df, ratings_df):
         st.subheader("Phân phối đánh giá")
 
         # Tạo biểu đồ phân phối đánh giá
-        fig = viz.plot_rating_distribution(ratings_df)
+        fig = viz.plot_rating_distribution(ratings_df, from_database=True)
         st.plotly_chart(fig, use_container_width=True)
 
     elif analysis_type == "Ẩm thực phổ biến":
         st.subheader("Ẩm thực phổ biến")
 
         # Tạo biểu đồ ẩm thực phổ biến
-        fig = viz.plot_popular_cuisines(foods_df, ratings_df)
+        fig = viz.plot_popular_cuisines(foods_df, ratings_df, from_database=True)
         st.plotly_chart(fig, use_container_width=True)
 
     elif analysis_type == "Hương vị phổ biến":
@@ -1070,33 +1202,33 @@ def analyze_data(foods_df, ratings_df):
         st.subheader("Giá trung bình theo ẩm thực")
 
         # Tạo biểu đồ giá trung bình theo ẩm thực
-        fig = viz.plot_avg_price_by_cuisine(foods_df)
+        fig = viz.plot_avg_price_by_cuisine(foods_df, from_database=True)
         st.plotly_chart(fig, use_container_width=True)
 
 
 if __name__ == "__main__":
     main()
+    from data_generator import generate_food_items, generate_customers, generate_ratings
     # Tạo hoặc lấy dữ liệu từ session state
     if 'foods_df' not in st.session_state:
         with st.spinner("Đang tạo dữ liệu món ăn..."):
-            foods_df = create_food_items(num_items=100)
-            customers_df = create_customers(num_customers=500)
-            ratings_df = create_ratings(customers_df, foods_df, sparsity=0.05)
+            # Bộ sinh vector hóa với Generator riêng: mọi phiên nhận cùng một bộ dữ liệu
+            rng = np.random.default_rng(42)
+            foods_df = generate_food_items(100, rng)
+            customers_df = generate_customers(500, rng)
+            ratings_df = generate_ratings(customers_df, foods_df, rng, sparsity=0.05)
 
             # Lưu vào session state
             st.session_state.foods_df = foods_df
             st.session_state.customers_df = customers_df
             st.session_state.ratings_df = ratings_df
 
-            # Khởi tạo recommenders
-            content_rec = ContentBasedRecommender()
-            content_rec.fit(foods_df)
-
-            collab_rec = CollaborativeRecommender()
-            collab_rec.fit(ratings_df, foods_df)
-
-            hybrid_rec = HybridRecommender()
-            hybrid_rec.fit(foods_df, ratings_df, customers_df)
+            # Lấy recommenders dùng chung (dữ liệu sinh với seed cố định nên giống nhau giữa các phiên)
+            models = get_model_registry().get_models(compute_data_version(foods_df, ratings_df),
+                                                     foods_df, ratings_df, customers_df, name='generated')
+            content_rec = models['content']
+            collab_rec = models['collab']
+            hybrid_rec = models['hybrid']
 
             st.session_state.content_rec = content_rec
             st.session_state.collab_rec = collab_rec
@@ -1111,7 +1243,7 @@ if __name__ == "__main__":
         hybrid_rec = st.session_state.hybrid_rec
 
     # Tạo sidebar
-    sidebar_options = create_sidebar(ratings_df, foods_df)
+    sidebar_options = create_sidebar(ratings_df, foods_df, content_rec.attribute_index)
 
     # Tab chính của ứng dụng
     tabs = st.tabs(["🍽️ Gợi ý món ăn", "📊 Phân tích", "👤 Khách hàng", "ℹ️ Giới thiệu"])
@@ -1120,7 +1252,7 @@ if __name__ == "__main__":
     with tabs[0]:
         show_recommendation_tab(sidebar_options, foods_df, ratings_df, content_rec, collab_rec, hybrid_rec)
 
-        show_explore_section(foods_df)
+        show_explore_section(foods_df, content_rec.attribute_index)
 
     # Tab 2: Phân tích
     with tabs[1]:
@@ -0,0 +1,158 @@
+import hashlib
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Cột thuộc tính được đánh chỉ mục -> cột có nhiều giá trị phân tách bằng dấu phẩy hay không
+INDEXED_ATTRIBUTES = {
+    'cuisine': False,
+    'category': False,
+    'flavors': True,
+    'ingredients': True,
+}
+
+# Khóa trong bộ lọc -> cột thuộc tính tương ứng
+FILTER_ATTRIBUTES = {
+    'cuisines': 'cuisine',
+    'categories': 'category',
+    'flavors': 'flavors',
+    'ingredients': 'ingredients',
+}
+
+
+class CatalogAttributeIndex:
+    """
+    Chỉ mục bitset theo thuộc tính của danh mục món ăn
+
+    Mỗi giá trị (một ẩm thực, loại món, hương vị hay nguyên liệu) giữ một bitset đã nén bằng np.packbits,
+    bit thứ i ứng với món ở vị trí i trong foods_df. Bộ lọc nhiều điều kiện chỉ còn là các phép AND/OR
+    trên mảng uint8, không phải tách lại chuỗi flavors/ingredients.
+
+    Args:
+        foods_df (DataFrame): Danh mục món ăn
+    """
+
+    def __init__(self, foods_df):
+        self.n_items = len(foods_df)
+        self.prices = foods_df['price'].to_numpy(dtype=float) if 'price' in foods_df.columns else None
+        # thuộc tính -> (danh sách giá trị đã sắp xếp, {giá trị: bitset})
+        self._bitsets = {}
+
+        for attribute, multi_valued in INDEXED_ATTRIBUTES.items():
+            if attribute in foods_df.columns:
+                self._bitsets[attribute] = self._build_bitsets(foods_df[attribute], multi_valued)
+
+    def _build_bitsets(self, column, multi_valued):
+        values = column.reset_index(drop=True)
+        if multi_valued:
+            values = values.str.split(',').explode().str.strip()
+        values = values.dropna()
+        values = values[values != '']
+
+        codes, uniques = pd.factorize(values, sort=True)
+        # Ma trận giá trị × món, mỗi lần chỉ nén một dòng nên bộ nhớ tạm là O(số món)
+        positions = values.index.to_numpy()
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+
+        bitsets = {}
+        for code, value in enumerate(uniques):
+            row = np.zeros(self.n_items, dtype=bool)
+            row[positions[order[bounds[code]:bounds[code + 1]]]] = True
+            bitsets[value] = np.packbits(row)
+        return list(uniques), bitsets
+
+    def values(self, attribute):
+        """Danh sách giá trị (đã sắp xếp) của một thuộc tính, dùng cho các ô chọn bộ lọc"""
+        if attribute not in self._bitsets:
+            return []
+        return list(self._bitsets[attribute][0])
+
+    def _match(self, attribute, values, match_all=False):
+        """Bitset các món có ít nhất một (hoặc tất cả nếu match_all) giá trị trong values"""
+        bitsets = self._bitsets.get(attribute, ([], {}))[1]
+        empty = np.zeros((self.n_items + 7) // 8, dtype=np.uint8)
+
+        result = None
+        for value in values:
+            bitset = bitsets.get(value, empty)
+            if result is None:
+                result = bitset.copy()
+            elif match_all:
+                result &= bitset
+            else:
+                result |= bitset
+        return empty if result is None else result
+
+    def mask(self, attribute, values, match_all=False):
+        """
+        Mặt nạ boolean các món thỏa điều kiện trên một thuộc tính
+
+        Args:
+            attribute (str): 'cuisine', 'category', 'flavors' hoặc 'ingredients'
+            values (list): Các giá trị cần khớp
+            match_all (bool): True nếu món phải có đủ mọi giá trị (mặc định chỉ cần một)
+
+        Returns:
+            ndarray: Mảng bool theo vị trí trong foods_df
+        """
+        return np.unpackbits(self._match(attribute, values, match_all), count=self.n_items).astype(bool)
+
+    def filter_mask(self, filters=None):
+        """
+        Tạo mặt nạ boolean từ bộ lọc nhiều điều kiện (AND giữa các điều kiện, OR trong mỗi điều kiện)
+
+        Args:
+            filters (dict, optional): {'cuisines': [...], 'categories': [...], 'flavors': [...],
+                'ingredients': [...], 'price_range': (min, max)}, khóa bị thiếu hoặc rỗng được bỏ qua
+
+        Returns:
+            ndarray | None: Mảng bool theo vị trí trong foods_df, None nếu không có điều kiện lọc nào
+        """
+        if not filters:
+            return None
+
+        combined = None
+        for key, attribute in FILTER_ATTRIBUTES.items():
+            values = filters.get(key)
+            if not values:
+                continue
+            bitset = self._match(attribute, values)
+            combined = bitset if combined is None else combined & bitset
+
+        mask = None if combined is None else np.unpackbits(combined, count=self.n_items).astype(bool)
+
+        price_range = filters.get('price_range')
+        if price_range and self.prices is not None:
+            in_range = (self.prices >= price_range[0]) & (self.prices <= price_range[1])
+            mask = in_range if mask is None else mask & in_range
+
+        return mask
+
+
+# Chỉ mục của danh mục món gần nhất, chỉ xây lại khi danh mục thay đổi
+_index_cache = {'key': None, 'index': None}
+_index_lock = threading.Lock()
+
+
+def get_attribute_index(foods_df):
+    """
+    Lấy chỉ mục thuộc tính cho danh mục món ăn, dùng lại bản đã xây nếu danh mục không đổi
+
+    Args:
+        foods_df (DataFrame): Danh mục món ăn
+
+    Returns:
+        CatalogAttributeIndex: Chỉ mục thuộc tính
+    """
+    columns = [column for column in ['food_id', 'price', *INDEXED_ATTRIBUTES] if column in foods_df.columns]
+    # Bitset theo vị trí món nên khóa phải phụ thuộc thứ tự dòng (không cộng các giá trị băm)
+    row_hashes = pd.util.hash_pandas_object(foods_df[columns], index=False).to_numpy()
+    key = (len(foods_df), hashlib.sha1(row_hashes.tobytes()).hexdigest())
+
+    with _index_lock:
+        if _index_cache['key'] != key:
+            _index_cache['index'] = CatalogAttributeIndex(foods_df)
+            _index_cache['key'] = key
+        return _index_cache['index']
@@ -0,0 +1,360 @@
+"""
+Tính trước top-N gợi ý cho toàn bộ khách hàng (dashboard, email marketing)
+
+Mô hình collaborative được tải từ artifact (hoặc huấn luyện nếu chưa có), các ma trận nhân tố được đặt vào
+shared memory một lần và các tiến trình con chấm điểm từng khối khách hàng trực tiếp trên đó.
+
+Chạy từ thư mục gốc của repo:
+    python batch_recommend.py --output recommendations.csv
+    python batch_recommend.py --top-n 50 --workers 8 --to-db
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from bulk_import import bulk_insert
+from db_utils import DB_ERRORS, execute_query, pooled_connection
+from model_registry import ModelRegistry, ARTIFACT_DIR
+
+RECOMMENDATIONS_TABLE = 'recommendations'
+DEFAULT_TOP_N = 50
+# Bộ nhớ tối đa (byte) cho khối điểm của mỗi tiến trình con, quyết định số khách hàng mỗi tác vụ
+BATCH_MEMORY_BUDGET = int(os.getenv('BATCH_MEMORY_BUDGET', 128 * 1024 ** 2))
+# Mỗi ô của khối điểm: điểm float32 và chỉ số int64 do argpartition tạo ra
+BYTES_PER_SCORE = np.dtype(np.float32).itemsize + np.dtype(np.intp).itemsize
+# Cùng số láng giềng content-based với ứng dụng để dùng chung artifact
+DEFAULT_CONTENT_TOP_K = 100
+
+# Mỗi lần chạy ghi vào bảng tạm rồi đổi tên, nên mọi dòng trong bảng luôn thuộc cùng một lần tính
+CREATE_RECOMMENDATIONS_TABLE = """
+CREATE TABLE {table} (
+    customer_id VARCHAR(50) NOT NULL,
+    position INT NOT NULL,
+    food_id VARCHAR(50) NOT NULL,
+    score DOUBLE,
+    generated_at DATETIME NOT NULL,
+    PRIMARY KEY (customer_id, position)
+);
+"""
+
+
+class SharedArrays:
+    """
+    Đặt các mảng NumPy vào shared memory để nhiều tiến trình đọc chung, không phải pickle theo từng tác vụ
+
+    Args:
+        **arrays: Tên -> mảng cần chia sẻ
+    """
+
+    def __init__(self, **arrays):
+        self._blocks = []
+        # tên -> (tên vùng shared memory, shape, dtype), đủ để tiến trình con gắn vào
+        self.specs = {}
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            self._blocks.append(block)
+            self.specs[name] = (block.name, array.shape, array.dtype.str)
+
+    def close(self):
+        """Giải phóng các vùng shared memory"""
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Trạng thái của tiến trình con, gắn một lần trong _init_worker
+_worker = {}
+
+
+def _init_worker(specs, params):
+    for name, (block_name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        # Giữ tham chiếu tới vùng nhớ để mảng không bị giải phóng
+        _worker[f'_block_{name}'] = block
+        _worker[name] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+    _worker.update(params)
+
+
+def _score_block(start, end):
+    """Chấm điểm khách hàng [start, end) và chọn top-N, chạy trong tiến trình con"""
+    w = _worker
+    users = w['user_factors'][start:end]
+    # Nhân tố float32 nên khối điểm cũng là float32
+    scores = users @ w['item_factors'].T
+
+    # Cùng công thức với CollaborativeRecommender._score_all_items, cộng tại chỗ để không tạo thêm khối tạm
+    if w['biased']:
+        scores += w['user_bias'][start:end, None]
+        scores += w['item_bias'] + w['global_mean']
+    else:
+        scores = np.where(w['has_item_factors'][None, :] & w['has_user_factors'][start:end, None],
+                          scores, w['global_mean'])
+    np.clip(scores, w['lower_bound'], w['higher_bound'], out=scores)
+
+    # Loại các món khách hàng đã đánh giá
+    indptr = w['rated_indptr']
+    rows = np.repeat(np.arange(end - start), np.diff(indptr[start:end + 1]))
+    scores[rows, w['rated_indices'][indptr[start]:indptr[end]]] = -np.inf
+
+    top_n = min(w['top_n'], scores.shape[1])
+    # Đổi dấu tại chỗ thay vì tạo bản sao -scores
+    np.negative(scores, out=scores)
+    top = np.argpartition(scores, top_n - 1, axis=1)[:, :top_n]
+    top_scores = -np.take_along_axis(scores, top, axis=1)
+    # Hòa điểm thì theo thứ tự trong danh mục như _select_top
+    order = np.lexsort((top, -top_scores), axis=1)
+    top = np.take_along_axis(top, order, axis=1)
+    top_scores = np.take_along_axis(top_scores, order, axis=1)
+    top[~np.isfinite(top_scores)] = -1
+    return start, top.astype(np.int32), top_scores.astype(np.float32)
+
+
+def _scoring_arrays(collab, customer_ids):
+    """Nhân tố của khách hàng và món (theo vị trí trong danh mục) cùng chỉ mục món đã đánh giá dạng CSR"""
+    rank = collab.item_factors.shape[1]
+    user_factors = np.zeros((len(customer_ids), rank), dtype=np.float32)
+    user_bias = np.zeros(len(customer_ids), dtype=np.float32)
+    has_user_factors = np.zeros(len(customer_ids), dtype=bool)
+    rated = []
+    for i, customer_id in enumerate(customer_ids):
+        user = collab._user_vector(customer_id)
+        if user is not None:
+            user_factors[i], user_bias[i] = user
+            has_user_factors[i] = True
+        rated.append(collab.rated_index.rated_positions(customer_id))
+
+    item_factors, item_bias, has_item_factors = collab._item_vectors(np.arange(len(collab.foods)))
+    rated_indptr = np.zeros(len(customer_ids) + 1, dtype=np.int64)
+    np.cumsum([len(positions) for positions in rated], out=rated_indptr[1:])
+    rated_indices = np.concatenate(rated).astype(np.int64) if rated else np.empty(0, dtype=np.int64)
+
+    return {
+        'user_factors': user_factors,
+        'user_bias': user_bias,
+        'has_user_factors': has_user_factors,
+        'item_factors': item_factors.astype(np.float32),
+        'item_bias': item_bias.astype(np.float32),
+        'has_item_factors': has_item_factors,
+        'rated_indptr': rated_indptr,
+        'rated_indices': rated_indices,
+    }
+
+
+def _customers_to_score(collab, customers_df=None):
+    """Khách hàng có ít nhất một đánh giá (recommend_for_customer trả về rỗng với khách hàng còn lại)"""
+    if customers_df is not None and not customers_df.empty:
+        candidates = customers_df['customer_id'].drop_duplicates().tolist()
+    else:
+        candidates = collab.rated_index.customer_ids.tolist()
+    return [customer_id for customer_id in candidates if collab.rated_index.has_ratings(customer_id)]
+
+
+def _to_frame(customer_ids, food_ids, positions, scores):
+    """Bảng dài (customer_id, position, food_id, score), position bắt đầu từ 1"""
+    valid = positions >= 0
+    rows, ranks = np.nonzero(valid)
+    return pd.DataFrame({
+        'customer_id': np.asarray(customer_ids, dtype=object)[rows],
+        'position': ranks + 1,
+        'food_id': food_ids[positions[valid]],
+        'score': scores[valid].astype(float),
+    })
+
+
+def _recommend_serial(collab, customer_ids, top_n):
+    """Thuật toán không có ma trận nhân tố: gọi recommend_for_customer lần lượt cho từng khách hàng"""
+    frames = []
+    for customer_id in customer_ids:
+        recs = collab.recommend_for_customer(customer_id, top_n=top_n)
+        if recs.empty:
+            continue
+        frames.append(pd.DataFrame({
+            'customer_id': customer_id,
+            'position': np.arange(1, len(recs) + 1),
+            'food_id': recs['food_id'].to_numpy(),
+            'score': recs['predicted_rating'].to_numpy(dtype=float),
+        }))
+    if not frames:
+        return pd.DataFrame(columns=['customer_id', 'position', 'food_id', 'score'])
+    return pd.concat(frames, ignore_index=True)
+
+
+def _block_size(n_items, memory_budget=BATCH_MEMORY_BUDGET):
+    """Số khách hàng mỗi tác vụ để khối điểm block_size × n_items nằm trong memory_budget"""
+    return max(1, memory_budget // (max(n_items, 1) * BYTES_PER_SCORE))
+
+
+def batch_recommend(model, customers_df=None, top_n=DEFAULT_TOP_N, workers=None, block_size=None,
+                    memory_budget=BATCH_MEMORY_BUDGET):
+    """
+    Tính top-N gợi ý cho mọi khách hàng đã có đánh giá, kết quả giống recommend_for_customer (không lọc)
+
+    Args:
+        model (CollaborativeRecommender | HybridRecommender): Mô hình đã huấn luyện. Không có món gốc thì
+            gợi ý kết hợp chính là phần collaborative, nên HybridRecommender dùng mô hình collaborative của nó
+        customers_df (DataFrame, optional): Khách hàng cần gợi ý, mặc định mọi khách hàng trong ratings
+        top_n (int): Số món gợi ý cho mỗi khách hàng
+        workers (int, optional): Số tiến trình con, mặc định theo số CPU
+        block_size (int, optional): Số khách hàng mỗi tác vụ, mặc định tính từ memory_budget
+        memory_budget (int): Bộ nhớ tối đa (byte) cho khối điểm của mỗi tiến trình con
+
+    Returns:
+        DataFrame: Các cột customer_id, position (1 = tốt nhất), food_id, score
+    """
+    collab = getattr(model, 'collab_recommender', model)
+    customer_ids = _customers_to_score(collab, customers_df)
+    if collab.item_factors is None:
+        return _recommend_serial(collab, customer_ids, top_n)
+
+    if block_size is None:
+        block_size = _block_size(len(collab.foods), memory_budget)
+
+    params = {
+        'top_n': top_n,
+        'biased': collab.biased,
+        # Số Python để phép cộng với mảng float32 không nâng khối điểm lên float64
+        'global_mean': float(collab.global_mean),
+        'lower_bound': collab.rating_scale[0],
+        'higher_bound': collab.rating_scale[1],
+    }
+    positions = np.full((len(customer_ids), min(top_n, len(collab.foods))), -1, dtype=np.int32)
+    scores = np.full(positions.shape, -np.inf, dtype=np.float32)
+
+    with SharedArrays(**_scoring_arrays(collab, customer_ids)) as shared:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(shared.specs, params)) as executor:
+            blocks = [(start, min(start + block_size, len(customer_ids)))
+                      for start in range(0, len(customer_ids), block_size)]
+            for start, top, top_scores in executor.map(_score_block, *zip(*blocks)) if blocks else []:
+                positions[start:start + len(top)] = top
+                scores[start:start + len(top)] = top_scores
+
+    return _to_frame(customer_ids, collab.foods['food_id'].to_numpy(), positions, scores)
+
+
+def write_recommendations_file(recommendations, path):
+    """Ghi bảng gợi ý ra file, định dạng theo phần mở rộng (.parquet hoặc CSV)"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if path.endswith('.parquet'):
+        recommendations.to_parquet(path, index=False)
+    else:
+        recommendations.to_csv(path, index=False)
+
+
+def _swap_tables(conn, staging, table):
+    """Thay bảng table bằng bảng staging, người đọc không bao giờ thấy bảng đang ghi dở"""
+    cursor = conn.cursor()
+    try:
+        if getattr(conn, 'dialect', 'mysql') == 'mysql':
+            old = f'{table}_old'
+            cursor.execute(f"DROP TABLE IF EXISTS {old}")
+            cursor.execute(f"CREATE TABLE IF NOT EXISTS {table} LIKE {staging}")
+            # RENAME nhiều bảng trong một câu lệnh là nguyên tử
+            cursor.execute(f"RENAME TABLE {table} TO {old}, {staging} TO {table}")
+            cursor.execute(f"DROP TABLE {old}")
+        else:
+            # DDL của SQLite nằm trong giao dịch
+            cursor.execute("BEGIN")
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+            cursor.execute(f"ALTER TABLE {staging} RENAME TO {table}")
+        conn.commit()
+    except DB_ERRORS:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def write_recommendations_table(recommendations, conn=None, generated_at=None):
+    """
+    Thay toàn bộ bảng recommendations bằng kết quả mới (bulk insert vào bảng tạm rồi đổi tên)
+
+    Returns:
+        dict: Thống kê như bulk_insert
+    """
+    if conn is None:
+        with pooled_connection() as conn:
+            if not conn:
+                raise ConnectionError("Không thể kết nối tới database")
+            return write_recommendations_table(recommendations, conn, generated_at)
+
+    staging = f'{RECOMMENDATIONS_TABLE}_staging'
+    execute_query(conn, f"DROP TABLE IF EXISTS {staging}")
+    if not execute_query(conn, CREATE_RECOMMENDATIONS_TABLE.format(table=staging)):
+        raise RuntimeError(f"Không thể tạo bảng {staging}")
+
+    frame = recommendations.assign(generated_at=generated_at or datetime.now().replace(microsecond=0))
+    stats = bulk_insert(conn, staging, frame, columns=['customer_id', 'position', 'food_id', 'score', 'generated_at'])
+    _swap_tables(conn, staging, RECOMMENDATIONS_TABLE)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', choices=['collab', 'hybrid'], default='hybrid')
+    parser.add_argument('--top-n', type=int, default=DEFAULT_TOP_N)
+    parser.add_argument('--workers', type=int, default=None, help="Số tiến trình con (mặc định theo số CPU)")
+    parser.add_argument('--block-size', type=int, default=None,
+                        help="Số khách hàng mỗi tác vụ (mặc định tính từ --memory-budget)")
+    parser.add_argument('--memory-budget', type=int, default=BATCH_MEMORY_BUDGET,
+                        help="Bộ nhớ tối đa (byte) cho khối điểm của mỗi tiến trình con")
+    parser.add_argument('--artifact-dir', default=ARTIFACT_DIR, help="Thư mục artifact mô hình")
+    parser.add_argument('--content-top-k', type=int, default=DEFAULT_CONTENT_TOP_K)
+    parser.add_argument('--output', help="File kết quả (.csv hoặc .parquet)")
+    parser.add_argument('--to-db', action='store_true', help="Ghi kết quả vào bảng recommendations")
+    args = parser.parse_args()
+
+    if not args.output and not args.to_db:
+        parser.error("Cần --output và/hoặc --to-db")
+
+    # Nạp trực tiếp từ database, không cần Streamlit
+    from data_loader import load_foods_from_db, load_customers_from_db, load_ratings_from_db
+
+    foods_df = load_foods_from_db()
+    customers_df = load_customers_from_db()
+    ratings_df = load_ratings_from_db()
+    if foods_df.empty or ratings_df.empty:
+        print("Không thể tải dữ liệu từ database hoặc dữ liệu trống")
+        return
+
+    start = time.perf_counter()
+    registry = ModelRegistry(content_top_k=args.content_top_k, artifact_dir=args.artifact_dir)
+    models = registry.get_models(None, foods_df, ratings_df, customers_df, name='database')
+    print(f"Đã tải mô hình trong {time.perf_counter() - start:.1f} giây")
+
+    start = time.perf_counter()
+    recommendations = batch_recommend(models[args.model], customers_df, top_n=args.top_n,
+                                      workers=args.workers, block_size=args.block_size,
+                                      memory_budget=args.memory_budget)
+    elapsed = time.perf_counter() - start
+    num_customers = recommendations['customer_id'].nunique()
+    print(f"Đã tính gợi ý cho {num_customers:,} khách hàng trong {elapsed:.1f} giây "
+          f"({num_customers / max(elapsed, 1e-9):,.0f} khách hàng/giây)")
+
+    if args.output:
+        write_recommendations_file(recommendations, args.output)
+        print(f"Đã ghi {len(recommendations):,} dòng vào {args.output}")
+    if args.to_db:
+        stats = write_recommendations_table(recommendations)
+        print(f"Đã ghi {stats['rows']:,} dòng vào bảng {RECOMMENDATIONS_TABLE} trong {stats['seconds']:.1f} giây")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark huấn luyện collaborative filtering: ALS đa luồng (algorithm='als') so với SVD của surprise
+
+Đo thời gian huấn luyện và RMSE trên tập kiểm tra (10% đánh giá) với nhiều kích thước dữ liệu.
+
+Chạy từ thư mục gốc của repo:
+    python -m benchmarks.collab_training
+    python -m benchmarks.collab_training --customers 10000 100000 --n-jobs 1 4
+"""
+import argparse
+import time
+
+import numpy as np
+
+from data_generator import generate_food_items, generate_customers, generate_ratings
+from recommenders import CollaborativeRecommender
+
+
+def holdout_rmse(model, test_df):
+    """RMSE của dự đoán đã giới hạn trong thang điểm, chỉ tính các cặp khách hàng/món có trong tập huấn luyện"""
+    errors = []
+    for customer_id, group in test_df.groupby('customer_id'):
+        if customer_id not in model.user_codes:
+            continue
+        scores = model._score_all_items(customer_id)
+        positions = group['food_id'].map(model.rated_index.food_codes).to_numpy()
+        errors.append(scores[positions] - group['rating'].to_numpy())
+    errors = np.concatenate(errors)
+    return float(np.sqrt(np.mean(errors ** 2)))
+
+
+def time_fit(train_df, foods_df, **kwargs):
+    model = CollaborativeRecommender(**kwargs)
+    start = time.perf_counter()
+    model.fit(train_df, foods_df)
+    return model, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--customers', type=int, nargs='+', default=[2000, 10000, 50000])
+    parser.add_argument('--foods', type=int, default=1000)
+    parser.add_argument('--sparsity', type=float, default=0.02)
+    parser.add_argument('--n-jobs', type=int, nargs='+', default=[1, None],
+                        help="Số luồng ALS cần đo (mặc định 1 và toàn bộ CPU)")
+    parser.add_argument('--svd-max', type=int, default=10 ** 6, help="Bỏ qua SVD khi số đánh giá vượt ngưỡng này")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    foods_df = generate_food_items(args.foods, rng)
+
+    print(f"{'customers':>10} {'ratings':>10} {'model':>12} {'fit (s)':>9} {'RMSE':>7}")
+    for num_customers in args.customers:
+        customers_df = generate_customers(num_customers, rng)
+        ratings_df = generate_ratings(customers_df, foods_df, rng, sparsity=args.sparsity)
+        test = ratings_df.sample(frac=0.1, random_state=args.seed)
+        train = ratings_df.drop(test.index)
+
+        runs = [('svd', {'algorithm': 'svd'})] if len(train) <= args.svd_max else []
+        runs += [(f"als/{n_jobs or 'all'}", {'algorithm': 'als', 'n_jobs': n_jobs}) for n_jobs in args.n_jobs]
+        for label, kwargs in runs:
+            model, seconds = time_fit(train, foods_df, **kwargs)
+            print(f"{num_customers:10,} {len(train):10,} {label:>12} {seconds:9.2f} {holdout_rmse(model, test):7.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark get_flavor_popularity: bản vector hóa so với vòng lặp iterrows() cũ
+
+Chạy từ thư mục gốc của repo:
+    python -m benchmarks.flavor_popularity
+    python -m benchmarks.flavor_popularity --sizes 10000 100000 --legacy-max 100000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_generator import create_food_items
+from aggregates import _aggregates_cache, _flavor_table_cache
+from utils import get_flavor_popularity
+
+
+def legacy_flavor_popularity(ratings_df, foods_df):
+    """Cài đặt cũ (O(ratings × foods)), giữ lại để so sánh kết quả và thời gian"""
+    all_flavors = []
+
+    for _, row in ratings_df.iterrows():
+        food_id = row['food_id']
+        rating = row['rating']
+
+        food_row = foods_df[foods_df['food_id'] == food_id]
+        if not food_row.empty:
+            flavors_str = food_row['flavors'].values[0]
+            flavors = [f.strip() for f in flavors_str.split(',')]
+
+            for flavor in flavors:
+                all_flavors.append({
+                    'flavor': flavor,
+                    'rating': rating
+                })
+
+    flavor_df = pd.DataFrame(all_flavors)
+
+    flavor_stats = flavor_df.groupby('flavor').agg(
+        avg_rating=('rating', 'mean'),
+        count=('rating', 'count')
+    ).reset_index()
+
+    flavor_stats = flavor_stats[flavor_stats['count'] >= 20].sort_values('avg_rating', ascending=False)
+
+    return flavor_stats
+
+
+def make_ratings(foods_df, num_ratings, seed=42):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'customer_id': rng.integers(1, max(num_ratings // 20, 2), num_ratings),
+        'food_id': rng.choice(foods_df['food_id'].to_numpy(), num_ratings),
+        'rating': np.round(rng.uniform(1, 5, num_ratings), 1),
+    })
+
+
+def time_call(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7])
+    parser.add_argument('--num-foods', type=int, default=1000)
+    parser.add_argument('--legacy-max', type=int, default=10 ** 4,
+                        help='Chỉ chạy cài đặt cũ với số đánh giá không vượt quá giá trị này')
+    args = parser.parse_args()
+
+    foods_df = create_food_items(num_items=args.num_foods)
+    legacy_rate = None
+
+    print(f"{'ratings':>10} {'vectorized (s)':>15} {'legacy (s)':>12} {'speed-up':>10}")
+    for size in args.sizes:
+        ratings_df = make_ratings(foods_df, size)
+
+        # Lần chạy đầu tính cả chi phí tách hương vị của danh mục và xây số liệu tổng hợp
+        _flavor_table_cache['key'] = None
+        _aggregates_cache['aggregates'] = None
+        fast, fast_time = time_call(get_flavor_popularity, ratings_df, foods_df)
+
+        if size <= args.legacy_max:
+            slow, legacy_time = time_call(legacy_flavor_popularity, ratings_df, foods_df)
+            pd.testing.assert_frame_equal(fast.reset_index(drop=True), slow.reset_index(drop=True))
+            legacy_rate = legacy_time / size
+            legacy_label = f"{legacy_time:12.3f}"
+        elif legacy_rate is not None:
+            # Cài đặt cũ tuyến tính theo số đánh giá nên ngoại suy từ lần đo gần nhất
+            legacy_time = legacy_rate * size
+            legacy_label = f"~{legacy_time:11.1f}"
+        else:
+            legacy_time = None
+            legacy_label = f"{'-':>12}"
+
+        speed_up = f"{legacy_time / fast_time:9.0f}x" if legacy_time else f"{'-':>10}"
+        print(f"{size:>10} {fast_time:15.3f} {legacy_label} {speed_up}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark thời gian import của các module đầu vào (app, CLI), dựa trên `python -X importtime`
+
+Mỗi module được import trong một tiến trình Python mới, kết quả `-X importtime` được phân tích để
+in tổng thời gian và các import nặng nhất, so với ngân sách trong BUDGETS. sklearn, surprise,
+joblib và plotly phải được import lười ở lần dùng đầu tiên nên không được xuất hiện ở đây.
+
+Chạy từ thư mục gốc của repo:
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time recommenders --top 20
+    python -m benchmarks.import_time --check    # mã thoát 1 nếu có module vượt ngân sách
+"""
+import argparse
+import re
+import subprocess
+import sys
+
+# Ngân sách thời gian import (ms) cho từng module đầu vào
+BUDGETS = {
+    'db_utils': 300,
+    'data_loader': 600,
+    'data_generator': 600,
+    'bulk_import': 600,
+    'utils': 600,
+    'visualizations': 600,
+    'recommenders': 700,
+    'model_registry': 800,
+    'batch_recommend': 800,
+}
+
+# Module nặng chỉ được import khi thực sự cần
+LAZY_MODULES = ('sklearn', 'surprise', 'joblib', 'plotly', 'matplotlib', 'seaborn')
+
+_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def parse_importtime(output):
+    """
+    Phân tích kết quả của `python -X importtime`
+
+    Returns:
+        list: Các tuple (tên module, thời gian riêng ms, thời gian tích lũy ms, độ sâu)
+    """
+    records = []
+    for line in output.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            records.append((name, int(self_us) / 1000, int(cumulative_us) / 1000, len(indent) // 2))
+    return records
+
+
+def profile_import(module):
+    """Import module trong tiến trình mới và trả về các bản ghi import"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Không import được {module}: {result.stderr.strip().splitlines()[-1]}")
+    return parse_importtime(result.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('modules', nargs='*', default=list(BUDGETS), help="Module cần đo (mặc định toàn bộ BUDGETS)")
+    parser.add_argument('--top', type=int, default=5, help="Số import nặng nhất in ra cho mỗi module")
+    parser.add_argument('--check', action='store_true', help="Thoát với mã 1 nếu có module vượt ngân sách")
+    args = parser.parse_args()
+
+    failed = []
+    for module in args.modules:
+        try:
+            records = profile_import(module)
+        except RuntimeError as e:
+            print(e)
+            failed.append(module)
+            continue
+
+        # -X importtime in module con trước module cha: các import của module nằm ngay trước dòng của nó
+        end = next((i for i, r in enumerate(records) if r[0] == module and r[3] == 0), len(records) - 1)
+        start = end
+        while start > 0 and records[start - 1][3] > 0:
+            start -= 1
+        own = records[start:end + 1]
+        total = own[-1][2]
+        budget = BUDGETS.get(module)
+        over = budget is not None and total > budget
+        lazy = sorted({name.split('.')[0] for name, _, _, _ in own} & set(LAZY_MODULES))
+        if over or lazy:
+            failed.append(module)
+
+        status = 'VƯỢT' if over else 'ok'
+        print(f"{module}: {total:.0f} ms (ngân sách {budget if budget is not None else '-'} ms) {status}")
+        if lazy:
+            print(f"  import sớm module nặng: {', '.join(lazy)}")
+        # Import nặng nhất tính theo thời gian tích lũy, chỉ lấy các import trực tiếp của module (độ sâu 1)
+        direct = sorted((r for r in own if r[3] == 1), key=lambda r: r[2], reverse=True)
+        for name, self_ms, cumulative_ms, _ in direct[:args.top]:
+            print(f"  {cumulative_ms:8.1f} ms  (riêng {self_ms:6.1f} ms)  {name}")
+
+    if args.check and failed:
+        print(f"Không đạt: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark tìm kiếm món ăn: chỉ mục ngược (search_index) so với quét str.contains trên 4 cột như search_foods cũ
+
+Chạy từ thư mục gốc của repo:
+    python -m benchmarks.search_index
+    python -m benchmarks.search_index --sizes 10000 100000 --queries "thit bo" "cay"
+"""
+import argparse
+import time
+
+import numpy as np
+
+from data_generator import generate_food_items
+from search_index import FoodSearchIndex
+
+DEFAULT_QUERIES = ['việt nam', 'thịt bò', 'hải sản', 'cay', 'tráng miệng', 'nấm']
+
+
+def legacy_search(foods_df, search_term):
+    """Cài đặt cũ của search_foods: bốn lần quét regex trên toàn bộ danh mục"""
+    return foods_df[
+        foods_df['name'].str.contains(search_term, case=False) |
+        foods_df['ingredients'].str.contains(search_term, case=False) |
+        foods_df['flavors'].str.contains(search_term, case=False) |
+        foods_df['features'].str.contains(search_term, case=False)
+        ]
+
+
+def time_call(func, *args, repeat=5):
+    """Thời gian tốt nhất trong repeat lần chạy"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10 ** 3, 10 ** 4, 10 ** 5])
+    parser.add_argument('--queries', nargs='+', default=DEFAULT_QUERIES)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        foods_df = generate_food_items(size, np.random.default_rng(args.seed))
+
+        start = time.perf_counter()
+        index = FoodSearchIndex(foods_df)
+        build_time = time.perf_counter() - start
+
+        # Cập nhật tăng dần: sửa 1% số món rồi đồng bộ lại
+        changed = foods_df.copy()
+        rows = changed.sample(max(size // 100, 1), random_state=args.seed).index
+        changed.loc[rows, 'name'] = changed.loc[rows, 'name'] + ' đặc biệt'
+        start = time.perf_counter()
+        index.sync(changed)
+        sync_time = time.perf_counter() - start
+        index.sync(foods_df)
+
+        print(f"\n{size:,} món: xây chỉ mục {build_time:.2f}s, đồng bộ 1% món thay đổi {sync_time:.3f}s")
+        print(f"{'query':>14} {'pandas (ms)':>12} {'index (ms)':>11} {'speed-up':>9} {'pandas hits':>12} {'index hits':>11}")
+        for query in args.queries:
+            slow, slow_time = time_call(legacy_search, foods_df, query)
+            fast, fast_time = time_call(index.search, query)
+
+            # Chỉ mục khớp theo từ và bỏ dấu nên phải bao trùm kết quả quét chuỗi với các từ khóa nguyên từ
+            missing = set(slow['food_id']) - {food_id for food_id, _ in fast}
+            if missing:
+                print(f"  cảnh báo: {len(missing)} món tìm thấy bằng pandas nhưng không có trong chỉ mục")
+
+            print(f"{query:>14} {slow_time * 1000:12.2f} {fast_time * 1000:11.2f} {slow_time / fast_time:8.1f}x "
+                  f"{len(slow):12,} {len(fast):11,}")
+
+
+if __name__ == "__main__":
+    main()
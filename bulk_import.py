@@ -0,0 +1,180 @@
+import argparse
+import re
+import time
+
+import pandas as pd
+
+from db_utils import DB_ERRORS, pooled_connection
+
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def _check_identifier(name):
+    """Chỉ cho phép tên bảng/cột gồm chữ, số và dấu gạch dưới"""
+    if not re.fullmatch(r'\w+', name):
+        raise ValueError(f"Tên không hợp lệ: {name}")
+    return name
+
+
+def _iter_chunks(data, chunk_size):
+    if isinstance(data, pd.DataFrame):
+        for start in range(0, len(data), chunk_size):
+            yield data.iloc[start:start + chunk_size]
+    else:
+        # Iterable các DataFrame, ví dụ pd.read_csv(..., chunksize=...)
+        for frame in data:
+            for start in range(0, len(frame), chunk_size):
+                yield frame.iloc[start:start + chunk_size]
+
+
+def _to_rows(chunk):
+    """Chuyển DataFrame thành list tuple kiểu Python mà driver database nhận được"""
+    chunk = chunk.copy()
+    for column in chunk.columns:
+        if pd.api.types.is_datetime64_any_dtype(chunk[column]):
+            chunk[column] = chunk[column].dt.strftime('%Y-%m-%d %H:%M:%S')
+    chunk = chunk.astype(object).where(chunk.notna(), None)
+    return list(chunk.itertuples(index=False, name=None))
+
+
+def _table_engine(cursor, table):
+    """Storage engine của bảng MySQL (ví dụ 'InnoDB', 'MyISAM'), None nếu không xác định được"""
+    cursor.execute("SELECT ENGINE FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+                   (table,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def _set_key_checks(cursor, table, enabled, disable_indexes=False):
+    """
+    Bật/tắt kiểm tra khóa trong lúc nạp (chỉ áp dụng cho MySQL)
+
+    unique_checks/foreign_key_checks áp dụng cho mọi engine. ALTER TABLE ... DISABLE KEYS chỉ hoãn cập nhật
+    chỉ mục không unique của bảng MyISAM (InnoDB bỏ qua kèm cảnh báo), nên chỉ chạy khi disable_indexes.
+    """
+    flag = 1 if enabled else 0
+    cursor.execute(f"SET unique_checks = {flag}")
+    cursor.execute(f"SET foreign_key_checks = {flag}")
+    if disable_indexes:
+        cursor.execute(f"ALTER TABLE {table} {'ENABLE' if enabled else 'DISABLE'} KEYS")
+
+
+def bulk_insert(conn, table, data, columns=None, chunk_size=DEFAULT_CHUNK_SIZE, disable_keys=False, verbose=True):
+    """
+    Ghi dữ liệu vào bảng theo từng khối bằng executemany, commit một lần mỗi khối
+
+    Args:
+        conn: Đối tượng kết nối database
+        table (str): Tên bảng
+        data (DataFrame | iterable): DataFrame hoặc iterable các DataFrame (đọc CSV theo chunksize)
+        columns (list, optional): Các cột cần ghi, mặc định là toàn bộ cột của dữ liệu
+        chunk_size (int): Số dòng mỗi lần executemany/commit
+        disable_keys (bool): Tắt kiểm tra khóa ngoại và unique trong lúc nạp (MySQL). Với bảng MyISAM còn hoãn
+            cập nhật chỉ mục không unique (DISABLE KEYS); InnoDB (mặc định) luôn cập nhật chỉ mục khi ghi
+        verbose (bool): In tiến độ sau mỗi khối
+
+    Returns:
+        dict: {'rows': số dòng đã ghi, 'seconds': thời gian, 'rows_per_second': tốc độ}
+    """
+    table = _check_identifier(table)
+    is_mysql = getattr(conn, 'dialect', 'mysql') == 'mysql'
+
+    cursor = conn.cursor()
+    total_rows = 0
+    start = time.perf_counter()
+    disable_indexes = False
+    try:
+        if disable_keys and is_mysql:
+            disable_indexes = _table_engine(cursor, table) == 'MyISAM'
+            _set_key_checks(cursor, table, enabled=False, disable_indexes=disable_indexes)
+
+        insert_query = None
+        for chunk in _iter_chunks(data, chunk_size):
+            if columns is not None:
+                chunk = chunk[list(columns)]
+            if insert_query is None:
+                column_list = ', '.join(_check_identifier(column) for column in chunk.columns)
+                placeholders = ', '.join(['%s'] * len(chunk.columns))
+                # mysql.connector gộp executemany của INSERT thành một câu VALUES nhiều dòng
+                insert_query = f"INSERT INTO {table} ({column_list}) VALUES ({placeholders})"
+
+            rows = _to_rows(chunk)
+            if not rows:
+                continue
+            cursor.executemany(insert_query, rows)
+            conn.commit()
+
+            total_rows += len(rows)
+            if verbose:
+                elapsed = time.perf_counter() - start
+                print(f"{table}: {total_rows:,} dòng ({total_rows / max(elapsed, 1e-9):,.0f} dòng/giây)")
+    except DB_ERRORS as e:
+        conn.rollback()
+        print(f"Lỗi khi import vào bảng {table}: {e}")
+        raise
+    finally:
+        if disable_keys and is_mysql:
+            _set_key_checks(cursor, table, enabled=True, disable_indexes=disable_indexes)
+        cursor.close()
+
+    seconds = time.perf_counter() - start
+    return {
+        'rows': total_rows,
+        'seconds': seconds,
+        'rows_per_second': total_rows / seconds if seconds > 0 else 0.0,
+    }
+
+
+def import_csv(path, table, conn=None, chunk_size=DEFAULT_CHUNK_SIZE, disable_keys=False, truncate=False,
+               **read_csv_kwargs):
+    """
+    Import file CSV (ví dụ bản export từ hệ thống thật) vào bảng theo từng khối
+
+    Args:
+        path (str): Đường dẫn file CSV, dòng đầu là tên cột trùng với cột của bảng
+        table (str): Tên bảng
+        conn: Đối tượng kết nối, mặc định mượn một kết nối từ pool
+        chunk_size (int): Số dòng mỗi khối đọc và ghi
+        disable_keys (bool): Tắt kiểm tra khóa trong lúc nạp (MySQL), xem bulk_insert
+        truncate (bool): Xóa dữ liệu cũ của bảng trước khi import
+
+    Returns:
+        dict: Thống kê như bulk_insert
+    """
+    reader = pd.read_csv(path, chunksize=chunk_size, **read_csv_kwargs)
+    if conn is not None:
+        return _import_frames(conn, table, reader, chunk_size, disable_keys, truncate)
+
+    with pooled_connection() as conn:
+        if not conn:
+            raise ConnectionError("Không thể kết nối tới database")
+        return _import_frames(conn, table, reader, chunk_size, disable_keys, truncate)
+
+
+def _import_frames(conn, table, frames, chunk_size, disable_keys, truncate):
+    if truncate:
+        cursor = conn.cursor()
+        cursor.execute(f"DELETE FROM {_check_identifier(table)}")
+        conn.commit()
+        cursor.close()
+    return bulk_insert(conn, table, frames, chunk_size=chunk_size, disable_keys=disable_keys)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import file CSV vào database theo từng khối")
+    parser.add_argument('table', help="Tên bảng (foods, customers, ratings, ...)")
+    parser.add_argument('csv_path', help="Đường dẫn file CSV")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--disable-keys', action='store_true', help="Tắt unique_checks/foreign_key_checks trong lúc nạp (MySQL); "
+                        "chỉ bảng MyISAM được hoãn cập nhật chỉ mục, InnoDB thì không")
+    parser.add_argument('--truncate', action='store_true', help="Xóa dữ liệu cũ trước khi import")
+    args = parser.parse_args()
+
+    stats = import_csv(args.csv_path, args.table, chunk_size=args.chunk_size,
+                       disable_keys=args.disable_keys, truncate=args.truncate)
+    print(f"Đã import {stats['rows']:,} dòng vào {args.table} trong {stats['seconds']:.1f} giây "
+          f"({stats['rows_per_second']:,.0f} dòng/giây)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from aggregates import get_rating_aggregates, cuisine_price_table
+from db_utils import database_configured, pooled_connection, get_dataframe_from_query
+
+# Nguồn dữ liệu biểu đồ: 'database' (truy vấn GROUP BY), 'memory' (DataFrame đã nạp, qua aggregates)
+# hoặc 'auto': truy vấn database khi đã cấu hình kết nối và DataFrame (nếu có) được nạp từ chính database đó
+CHART_DATA_SOURCE = os.getenv('CHART_DATA_SOURCE', 'auto')
+
+# Biểu thức ngày đầu tháng của r.timestamp theo từng loại database
+MONTH_EXPRESSIONS = {
+    'mysql': "DATE_FORMAT(r.timestamp, '%Y-%m-01')",
+    'sqlite': "strftime('%Y-%m-01', r.timestamp)",
+}
+
+MONTHLY_QUERY = """
+SELECT {month} AS month, AVG(r.rating) AS rating, COUNT(*) AS count
+FROM ratings r
+WHERE r.timestamp IS NOT NULL
+GROUP BY month
+ORDER BY month
+"""
+
+GROUP_QUERY = """
+SELECT f.{column} AS {column}, AVG(r.rating) AS avg_rating, COUNT(*) AS count
+FROM ratings r
+JOIN foods f ON r.food_id = f.food_id
+WHERE f.{column} IS NOT NULL
+GROUP BY f.{column}
+ORDER BY f.{column}
+"""
+
+CUISINE_CATEGORY_QUERY = """
+SELECT f.cuisine AS cuisine, f.category AS category, AVG(r.rating) AS rating, COUNT(*) AS count
+FROM ratings r
+JOIN foods f ON r.food_id = f.food_id
+WHERE f.cuisine IS NOT NULL AND f.category IS NOT NULL
+GROUP BY f.cuisine, f.category
+"""
+
+# Cận dưới khoảng điểm chứa r.rating (điểm không âm nên CAST của SQLite tương đương FLOOR)
+BUCKET_EXPRESSIONS = {
+    'mysql': "FLOOR(r.rating / {width}) * {width}",
+    'sqlite': "CAST(r.rating / {width} AS INTEGER) * {width}",
+}
+
+RATING_COUNTS_QUERY = """
+SELECT {bucket} AS rating, COUNT(*) AS count
+FROM ratings r
+GROUP BY {bucket}
+ORDER BY rating
+"""
+
+CUISINE_PRICE_QUERY = """
+SELECT cuisine, AVG(price) AS price, COUNT(*) AS count
+FROM foods
+WHERE cuisine IS NOT NULL AND price IS NOT NULL
+GROUP BY cuisine
+ORDER BY cuisine
+"""
+
+# Thuộc tính món được phép gom theo (tên cột được ghép vào câu truy vấn)
+GROUP_COLUMNS = ('cuisine', 'category')
+
+# Biên các khoảng điểm đánh giá: mỗi khoảng rộng 0.5 quanh các mức 1, 1.5, ..., 5
+RATING_BIN_EDGES = np.arange(0.75, 5.5, 0.5)
+
+
+def histogram_counts(values, bins=10, range=None, weights=None):
+    """
+    Đếm số giá trị trong từng khoảng bằng np.histogram
+
+    Biểu đồ được vẽ từ bảng đếm này (px.bar) thay vì truyền cả cột cho px.histogram, nên dữ liệu gửi tới
+    trình duyệt chỉ có O(số khoảng) điểm, không phụ thuộc số dòng.
+
+    Args:
+        values (array-like): Các giá trị cần đếm, NaN bị bỏ qua
+        bins (int | array-like): Số khoảng hoặc biên các khoảng
+        range (tuple, optional): (min, max) khi bins là số khoảng
+        weights (array-like, optional): Trọng số từng giá trị (ví dụ số lượng khi values đã được đếm sẵn)
+
+    Returns:
+        DataFrame: left, right, center, count theo từng khoảng
+    """
+    values = np.asarray(values, dtype=float)
+    valid = ~np.isnan(values)
+    if weights is not None:
+        weights = np.asarray(weights, dtype=float)[valid]
+    counts, edges = np.histogram(values[valid], bins=bins, range=range, weights=weights)
+    return pd.DataFrame({
+        'left': edges[:-1],
+        'right': edges[1:],
+        'center': (edges[:-1] + edges[1:]) / 2,
+        'count': counts.astype(np.int64),
+    })
+
+
+class ChartDataProvider:
+    """
+    Dữ liệu đã gom sẵn cho các biểu đồ phân tích
+
+    Với nguồn 'database', mỗi biểu đồ là một truy vấn GROUP BY nên chỉ các dòng đã gom đi qua kết nối.
+    Với nguồn 'memory' (hoặc khi truy vấn lỗi), số liệu được lấy từ DataFrame đã nạp: qua số liệu tổng hợp
+    (aggregates) nếu có cả danh mục món, nếu không thì groupby pandas trên cột cần thiết, không sửa
+    DataFrame của phía gọi. Không truyền DataFrame nào thì luôn truy vấn database.
+
+    Với nguồn 'auto' (mặc định), database chỉ được dùng khi đã cấu hình kết nối và phía gọi không truyền
+    DataFrame, hoặc DataFrame được nạp từ chính database đó (from_database=True); DataFrame khác
+    (dữ liệu sinh, dữ liệu đã lọc) luôn được gom trong bộ nhớ.
+
+    Args:
+        ratings_df (DataFrame, optional): Dữ liệu đánh giá đã nạp
+        foods_df (DataFrame, optional): Danh mục món ăn đã nạp
+        source (str): 'auto', 'database' hoặc 'memory'
+        from_database (bool): DataFrame truyền vào là bản nạp đầy đủ từ database (data_loader)
+    """
+
+    def __init__(self, ratings_df=None, foods_df=None, source=CHART_DATA_SOURCE, from_database=False):
+        self.ratings_df = ratings_df
+        self.foods_df = foods_df
+        self.source = source
+        self.from_database = from_database
+
+    def _use_database(self, has_memory):
+        """Truy vấn database thay vì gom DataFrame trong bộ nhớ hay không"""
+        if not has_memory or self.source == 'database':
+            return True
+        if self.source == 'auto':
+            return self.from_database and database_configured()
+        return False
+
+    def _query(self, build_query):
+        """Chạy truy vấn gom nhóm, None nếu không kết nối được hoặc truy vấn lỗi"""
+        with pooled_connection() as conn:
+            if not conn:
+                return None
+            query = build_query(getattr(conn, 'dialect', 'mysql'))
+            # get_dataframe_from_query trả về DataFrame rỗng không có cột khi lỗi
+            frame = get_dataframe_from_query(conn, query)
+        return frame if len(frame.columns) else None
+
+    def _load(self, build_query, from_memory, needs_foods=False):
+        """Lấy từ database hoặc bộ nhớ theo nguồn đã chọn, nguồn còn lại dùng khi nguồn chính không có dữ liệu"""
+        has_memory = self.ratings_df is not None and (self.foods_df is not None or not needs_foods)
+        if not self._use_database(has_memory):
+            return from_memory()
+
+        frame = self._query(build_query)
+        if frame is None:
+            return from_memory() if has_memory else None
+        return frame
+
+    def _aggregates(self):
+        if self.foods_df is None:
+            return None
+        return get_rating_aggregates(self.ratings_df, self.foods_df)
+
+    def monthly_ratings(self):
+        """
+        Điểm trung bình theo tháng
+
+        Returns:
+            DataFrame: month (ngày đầu tháng), rating (trung bình), count, sắp theo thời gian
+        """
+        def from_memory():
+            aggregates = self._aggregates()
+            if aggregates is not None:
+                return aggregates.monthly_stats()
+            months = pd.to_datetime(self.ratings_df['timestamp'], errors='coerce').dt.to_period('M')
+            stats = self.ratings_df['rating'].groupby(months).agg(rating='mean', count='count')
+            stats.index = stats.index.to_timestamp()
+            return stats.rename_axis('month').reset_index()
+
+        frame = self._load(lambda dialect: MONTHLY_QUERY.format(month=MONTH_EXPRESSIONS[dialect]), from_memory)
+        if frame is None:
+            return pd.DataFrame({'month': pd.Series(dtype='datetime64[ns]'), 'rating': [], 'count': []})
+        frame['month'] = pd.to_datetime(frame['month'])
+        frame['rating'] = frame['rating'].astype(float)
+        return frame
+
+    def group_ratings(self, column):
+        """
+        Điểm trung bình và số lượng đánh giá theo ẩm thực hoặc loại món
+
+        Args:
+            column (str): 'cuisine' hoặc 'category'
+
+        Returns:
+            DataFrame: <column>, avg_rating, count, sắp theo tên nhóm
+        """
+        if column not in GROUP_COLUMNS:
+            raise ValueError(f"Không hỗ trợ gom theo cột {column}")
+        frame = self._load(lambda dialect: GROUP_QUERY.format(column=column),
+                           lambda: self._aggregates().group_stats(column), needs_foods=True)
+        if frame is None:
+            return pd.DataFrame({column: [], 'avg_rating': [], 'count': []})
+        frame['avg_rating'] = frame['avg_rating'].astype(float)
+        return frame
+
+    def cuisine_category_ratings(self):
+        """
+        Điểm trung bình theo từng cặp (ẩm thực, loại món)
+
+        Returns:
+            DataFrame: cuisine, category, rating (trung bình), count
+        """
+        frame = self._load(lambda dialect: CUISINE_CATEGORY_QUERY,
+                           lambda: self._aggregates().cuisine_category_stats(), needs_foods=True)
+        if frame is None:
+            return pd.DataFrame({'cuisine': [], 'category': [], 'rating': [], 'count': []})
+        frame['rating'] = frame['rating'].astype(float)
+        return frame
+
+    def rating_counts(self, bucket_width=None):
+        """
+        Số lượng đánh giá theo mức điểm
+
+        Args:
+            bucket_width (float, optional): Độ rộng mỗi khoảng điểm, None để đếm theo từng giá trị điểm
+
+        Returns:
+            DataFrame: rating (giá trị hoặc cận dưới của khoảng), count, sắp theo điểm
+        """
+        def build_query(dialect):
+            bucket = 'r.rating' if bucket_width is None else \
+                BUCKET_EXPRESSIONS[dialect].format(width=float(bucket_width))
+            return RATING_COUNTS_QUERY.format(bucket=bucket)
+
+        def from_memory():
+            aggregates = self._aggregates()
+            if aggregates is not None:
+                counts = aggregates.rating_distribution()
+            else:
+                counts = self.ratings_df['rating'].value_counts()
+            ratings = counts.index.to_numpy(dtype=float)
+            if bucket_width is not None:
+                ratings = np.floor(ratings / bucket_width) * bucket_width
+            frame = pd.DataFrame({'rating': ratings, 'count': counts.to_numpy(dtype=np.int64)})
+            return frame.groupby('rating', as_index=False)['count'].sum()
+
+        frame = self._load(build_query, from_memory)
+        if frame is None:
+            return pd.DataFrame({'rating': [], 'count': []})
+        frame['rating'] = frame['rating'].astype(float)
+        return frame
+
+    def rating_histogram(self, bins=RATING_BIN_EDGES):
+        """
+        Số lượng đánh giá theo khoảng điểm, gom từ rating_counts (GROUP BY hoặc số liệu tổng hợp)
+
+        Returns:
+            DataFrame: left, right, center, count theo từng khoảng
+        """
+        counts = self.rating_counts()
+        return histogram_counts(counts['rating'], bins=bins, weights=counts['count'])
+
+    def cuisine_prices(self):
+        """
+        Giá trung bình của các món theo ẩm thực
+
+        Returns:
+            DataFrame: cuisine, price (trung bình), count (số món), sắp theo tên ẩm thực
+        """
+        if not self._use_database(self.foods_df is not None):
+            return cuisine_price_table(self.foods_df)
+
+        frame = self._query(lambda dialect: CUISINE_PRICE_QUERY)
+        if frame is None:
+            if self.foods_df is None:
+                return pd.DataFrame({'cuisine': [], 'price': [], 'count': []})
+            return cuisine_price_table(self.foods_df)
+        frame['price'] = frame['price'].astype(float)
+        return frame
@@ -1,3 +1,9 @@
+import argparse
+import importlib.util
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import numpy as np
 import random
@@ -6,12 +12,23 @@ import random
 np.random.seed(42)
 random.seed(42)
 
+CATEGORIES = ['Món chính', 'Món khai vị', 'Món tráng miệng', 'Đồ uống', 'Món đặc biệt']
+CUISINES = ['Việt Nam', 'Trung Hoa', 'Nhật Bản', 'Ý', 'Pháp', 'Ấn Độ', 'Thái Lan', 'Hàn Quốc']
+FLAVORS = ['cay', 'ngọt', 'mặn', 'chua', 'đắng', 'béo', 'thơm']
+INGREDIENTS = ['thịt bò', 'thịt gà', 'thịt heo', 'hải sản', 'rau củ', 'gạo', 'mì', 'nấm', 'đậu', 'trứng']
+COOKING_METHODS = ['nướng', 'xào', 'hấp', 'chiên', 'luộc', 'lẩu', 'nấu', 'ủ']
+NAME_PREFIXES = ['', 'Món ', 'Đặc sản ']
+NAME_SUFFIXES = ['', ' đặc biệt', ' truyền thống', ' fusion', ' nhà làm', ' premium']
+DRINK_NAMES = ['Nước', 'Sinh tố', 'Trà', 'Cà phê', 'Rượu', 'Cocktail']
+DRINK_SUFFIXES = [' đặc biệt', ' truyền thống', ' fusion', ' nhà làm', ' premium']
+
+
 def create_food_items(num_items=100):
-    categories = ['Món chính', 'Món khai vị', 'Món tráng miệng', 'Đồ uống', 'Món đặc biệt']
-    cuisines = ['Việt Nam', 'Trung Hoa', 'Nhật Bản', 'Ý', 'Pháp', 'Ấn Độ', 'Thái Lan', 'Hàn Quốc']
-    flavors = ['cay', 'ngọt', 'mặn', 'chua', 'đắng', 'béo', 'thơm']
-    ingredients = ['thịt bò', 'thịt gà', 'thịt heo', 'hải sản', 'rau củ', 'gạo', 'mì', 'nấm', 'đậu', 'trứng']
-    cooking_methods = ['nướng', 'xào', 'hấp', 'chiên', 'luộc', 'lẩu', 'nấu', 'ủ']
+    categories = CATEGORIES
+    cuisines = CUISINES
+    flavors = FLAVORS
+    ingredients = INGREDIENTS
+    cooking_methods = COOKING_METHODS
 
     foods = []
 
@@ -20,14 +37,14 @@ def create_food_items(num_items=100):
         item_cuisine = random.choice(cuisines)
 
         # Tạo tên món ăn
-        prefix = random.choice(['', 'Món ', 'Đặc sản '])
+        prefix = random.choice(NAME_PREFIXES)
         if item_category == 'Đồ uống':
-            name_options = ['Nước', 'Sinh tố', 'Trà', 'Cà phê', 'Rượu', 'Cocktail']
-            name_suffix = random.choice([' đặc biệt', ' truyền thống', ' fusion', ' nhà làm', ' premium'])
+            name_options = DRINK_NAMES
+            name_suffix = random.choice(DRINK_SUFFIXES)
             name_base = random.choice(name_options)
             name = f"{name_base}{name_suffix} #{i}"
         else:
-            name_suffix = random.choice(['', ' đặc biệt', ' truyền thống', ' fusion', ' nhà làm', ' premium'])
+            name_suffix = random.choice(NAME_SUFFIXES)
             if random.random() < 0.5:
                 ingredient = random.choice(ingredients)
                 method = random.choice(cooking_methods)
@@ -72,9 +89,8 @@ def create_customers(num_customers=500):
     for i in range(1, num_customers + 1):
         age = random.randint(18, 70)
         gender = random.choice(['Nam', 'Nữ', 'Khác'])
-        preferred_flavors = random.sample(['cay', 'ngọt', 'mặn', 'chua', 'đắng', 'béo', 'thơm'], random.randint(1, 4))
-        preferred_cuisines = random.sample(
-            ['Việt Nam', 'Trung Hoa', 'Nhật Bản', 'Ý', 'Pháp', 'Ấn Độ', 'Thái Lan', 'Hàn Quốc'], random.randint(1, 3))
+        preferred_flavors = random.sample(FLAVORS, random.randint(1, 4))
+        preferred_cuisines = random.sample(CUISINES, random.randint(1, 3))
         price_sensitivity = random.uniform(0.2, 1.0)
 
         customers.append({
@@ -134,3 +150,270 @@ def create_ratings(customers_df, foods_df, sparsity=0.05):
             })
 
     return pd.DataFrame(all_ratings)
+
+
+# ---------------------------------------------------------------------------
+# Bộ sinh dữ liệu vector hóa cho kiểm thử tải (10^7 đánh giá trở lên)
+# ---------------------------------------------------------------------------
+
+def _mask_labels(values):
+    """Bảng tra bitmask -> chuỗi 'a, b, c' cho mọi tập con của values"""
+    return np.array([', '.join(value for bit, value in enumerate(values) if mask >> bit & 1)
+                     for mask in range(1 << len(values))], dtype=object)
+
+
+def _random_subset_masks(rng, n_rows, n_values, low, high):
+    """Chọn ngẫu nhiên low..high phần tử không lặp cho mỗi dòng, trả về bitmask"""
+    sizes = rng.integers(low, high + 1, n_rows)
+    order = np.argsort(rng.random((n_rows, n_values)), axis=1)
+    chosen = np.arange(n_values) < sizes[:, None]
+    bits = np.where(chosen, np.left_shift(1, order), 0)
+    return bits.sum(axis=1).astype(np.int64)
+
+
+def _food_names(rng, food_ids, categories, cuisines):
+    """Tên món theo cùng quy tắc với create_food_items (đồ uống, nguyên liệu + cách nấu, hoặc "Món <ẩm thực>")"""
+    n = len(food_ids)
+
+    def choose(values):
+        return pd.Series(np.array(values, dtype=object)[rng.integers(0, len(values), n)])
+
+    prefixes = choose(NAME_PREFIXES)
+    suffixes = choose(NAME_SUFFIXES)
+    dishes = np.where(rng.random(n) < 0.5,
+                      prefixes + choose(INGREDIENTS) + ' ' + choose(COOKING_METHODS) + suffixes,
+                      prefixes + 'Món ' + cuisines + suffixes)
+    names = np.where(categories == 'Đồ uống', choose(DRINK_NAMES) + choose(DRINK_SUFFIXES), dishes)
+    return pd.Series(names) + ' #' + pd.Series(food_ids).astype(str)
+
+
+def generate_food_items(num_items, rng):
+    """
+    Sinh danh mục món ăn vector hóa
+
+    Returns:
+        DataFrame: Cùng các cột với create_food_items, kèm cột mã hóa flavor_mask và cuisine_code
+    """
+    food_ids = np.arange(1, num_items + 1)
+    category_codes = rng.integers(0, len(CATEGORIES), num_items)
+    cuisine_codes = rng.integers(0, len(CUISINES), num_items)
+    flavor_masks = _random_subset_masks(rng, num_items, len(FLAVORS), 1, 3)
+    ingredient_masks = _random_subset_masks(rng, num_items, len(INGREDIENTS), 1, 4)
+
+    categories = pd.Series(np.array(CATEGORIES, dtype=object)[category_codes])
+    cuisines = pd.Series(np.array(CUISINES, dtype=object)[cuisine_codes])
+    flavors = pd.Series(_mask_labels(FLAVORS)[flavor_masks])
+    ingredients = pd.Series(_mask_labels(INGREDIENTS)[ingredient_masks])
+    prices = np.round(rng.uniform(2, 30, num_items), 1) * 10000
+    popularity = rng.uniform(2.5, 5.0, num_items)
+
+    return pd.DataFrame({
+        'food_id': food_ids,
+        'name': _food_names(rng, food_ids, categories, cuisines),
+        'category': categories,
+        'cuisine': cuisines,
+        'flavors': flavors,
+        'ingredients': ingredients,
+        'price': prices,
+        'features': categories + ' ' + cuisines + ' ' + flavors + ' ' + ingredients,
+        'popularity': popularity,
+        'flavor_mask': flavor_masks,
+        'cuisine_code': cuisine_codes,
+    })
+
+
+def generate_customers(num_customers, rng, start_id=1):
+    """
+    Sinh khách hàng vector hóa
+
+    Returns:
+        DataFrame: Cùng các cột với create_customers, kèm cột mã hóa flavor_mask và cuisine_mask
+    """
+    flavor_masks = _random_subset_masks(rng, num_customers, len(FLAVORS), 1, 4)
+    cuisine_masks = _random_subset_masks(rng, num_customers, len(CUISINES), 1, 3)
+
+    return pd.DataFrame({
+        'customer_id': np.arange(start_id, start_id + num_customers),
+        'age': rng.integers(18, 71, num_customers),
+        'gender': np.array(['Nam', 'Nữ', 'Khác'], dtype=object)[rng.integers(0, 3, num_customers)],
+        'preferred_flavors': _mask_labels(FLAVORS)[flavor_masks],
+        'preferred_cuisines': _mask_labels(CUISINES)[cuisine_masks],
+        'price_sensitivity': rng.uniform(0.2, 1.0, num_customers),
+        'flavor_mask': flavor_masks,
+        'cuisine_mask': cuisine_masks,
+    })
+
+
+def _sample_foods(rng, num_ratings, num_foods):
+    """Chọn num_ratings[c] món không lặp cho mỗi khách hàng c, vector hóa toàn bộ"""
+    num_customers = len(num_ratings)
+    # Rút dư có hoàn lại rồi bỏ cặp trùng, giữ thứ tự rút để vẫn ngẫu nhiên
+    draws = np.ceil(num_ratings * 1.2).astype(np.int64) + 2
+    customers = np.repeat(np.arange(num_customers), draws)
+    foods = rng.integers(0, num_foods, len(customers))
+
+    _, first = np.unique(customers * num_foods + foods, return_index=True)
+    first.sort()
+    customers, foods = customers[first], foods[first]
+
+    starts = np.searchsorted(customers, np.arange(num_customers))
+    rank = np.arange(len(customers)) - starts[customers]
+    keep = rank < num_ratings[customers]
+    customers, foods = customers[keep], foods[keep]
+
+    # Hiếm khi thiếu (tỉ lệ đánh giá rất cao): bổ sung bằng cách chọn không lặp
+    counts = np.bincount(customers, minlength=num_customers)
+    short = np.flatnonzero(counts < num_ratings)
+    if len(short):
+        extra_customers, extra_foods = [], []
+        for customer in short:
+            rated = foods[customers == customer]
+            remaining = np.setdiff1d(np.arange(num_foods), rated)
+            picked = rng.choice(remaining, num_ratings[customer] - counts[customer], replace=False)
+            extra_customers.append(np.full(len(picked), customer))
+            extra_foods.append(picked)
+        customers = np.concatenate([customers] + extra_customers)
+        foods = np.concatenate([foods] + extra_foods)
+
+    return customers, foods
+
+
+def generate_ratings(customers_df, foods_df, rng, sparsity=0.05):
+    """
+    Sinh đánh giá vector hóa với cùng quy tắc như create_ratings
+
+    Điểm gốc là độ phổ biến của món nhân hệ số ngẫu nhiên, cộng thêm khi hợp hương vị hoặc ẩm thực,
+    trừ đi khi món đắt (> 150.000) với khách hàng có price_sensitivity < 0.5.
+    """
+    num_foods = len(foods_df)
+    num_ratings = (num_foods * sparsity * rng.uniform(0.5, 1.5, len(customers_df))).astype(np.int64)
+    num_ratings = np.minimum(num_ratings, num_foods)
+    c, f = _sample_foods(rng, num_ratings, num_foods)
+    n = len(c)
+
+    popularity = foods_df['popularity'].to_numpy()[f]
+    food_flavors = foods_df['flavor_mask'].to_numpy()[f]
+    food_cuisines = foods_df['cuisine_code'].to_numpy()[f]
+    prices = foods_df['price'].to_numpy()[f]
+    customer_flavors = customers_df['flavor_mask'].to_numpy()[c]
+    customer_cuisines = customers_df['cuisine_mask'].to_numpy()[c]
+    sensitivity = customers_df['price_sensitivity'].to_numpy()[c]
+
+    base_rating = popularity * rng.uniform(0.7, 1.3, n)
+
+    # Điều chỉnh rating dựa trên sở thích
+    flavor_match = (food_flavors & customer_flavors) != 0
+    cuisine_match = (np.right_shift(customer_cuisines, food_cuisines) & 1) == 1
+    expensive = (prices > 150000) & (sensitivity < 0.5)
+
+    adjustment = (np.where(flavor_match, rng.uniform(0.2, 0.8, n), 0.0)
+                  + np.where(cuisine_match, rng.uniform(0.2, 0.8, n), 0.0)
+                  - np.where(expensive, rng.uniform(0.2, 0.8, n), 0.0))
+
+    rating = np.clip(base_rating + adjustment, 1.0, 5.0)
+
+    return pd.DataFrame({
+        'customer_id': customers_df['customer_id'].to_numpy()[c],
+        'food_id': foods_df['food_id'].to_numpy()[f],
+        'rating': np.round(rating, 1),
+        'days_ago': rng.integers(1, 181, n),
+    })
+
+
+def _write_frame(frame, path, fmt):
+    if fmt == 'parquet':
+        frame.to_parquet(path, index=False)
+    else:
+        frame.to_csv(path, index=False)
+
+
+def _generate_shard(shard_id, seed_sequence, start_id, num_customers, foods_df, sparsity, output_dir, fmt):
+    """Sinh và ghi khách hàng + đánh giá của một shard, seed riêng nên kết quả không phụ thuộc tiến trình"""
+    rng = np.random.default_rng(seed_sequence)
+    customers_df = generate_customers(num_customers, rng, start_id=start_id)
+    ratings_df = generate_ratings(customers_df, foods_df, rng, sparsity=sparsity)
+
+    _write_frame(customers_df.drop(columns=['flavor_mask', 'cuisine_mask']),
+                 os.path.join(output_dir, f"customers-{shard_id:05d}.{fmt}"), fmt)
+    _write_frame(ratings_df, os.path.join(output_dir, f"ratings-{shard_id:05d}.{fmt}"), fmt)
+    return len(customers_df), len(ratings_df)
+
+
+def generate_dataset(output_dir, num_foods=1000, num_customers=100000, sparsity=0.05,
+                     customers_per_shard=10000, seed=42, fmt='csv', workers=None):
+    """
+    Sinh bộ dữ liệu lớn theo shard và ghi ra đĩa
+
+    Mỗi shard có seed riêng sinh từ np.random.SeedSequence(seed) nên cùng seed luôn cho cùng dữ liệu,
+    bất kể số tiến trình chạy song song.
+
+    Args:
+        output_dir (str): Thư mục ghi foods.*, customers-XXXXX.*, ratings-XXXXX.*
+        num_foods (int): Số món ăn
+        num_customers (int): Số khách hàng
+        sparsity (float): Tỉ lệ món trung bình mỗi khách hàng đánh giá
+        customers_per_shard (int): Số khách hàng mỗi shard
+        seed (int): Seed gốc
+        fmt (str): 'csv' hoặc 'parquet' (cần pyarrow)
+        workers (int, optional): Số tiến trình, 1 để chạy tuần tự
+
+    Returns:
+        dict: {'foods': ..., 'customers': ..., 'ratings': ..., 'seconds': ...}
+    """
+    if fmt not in ('csv', 'parquet'):
+        raise ValueError(f"Định dạng không hỗ trợ: {fmt}")
+    # Kiểm tra trước khi sinh dữ liệu để không phải chờ tới lần ghi shard đầu tiên mới báo lỗi
+    if fmt == 'parquet' and importlib.util.find_spec('pyarrow') is None:
+        raise ImportError("Ghi parquet cần cài đặt pyarrow: pip install pyarrow")
+
+    start = time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+
+    num_shards = max(1, -(-num_customers // customers_per_shard))
+    food_seed, *shard_seeds = np.random.SeedSequence(seed).spawn(num_shards + 1)
+
+    foods_df = generate_food_items(num_foods, np.random.default_rng(food_seed))
+    _write_frame(foods_df.drop(columns=['flavor_mask', 'cuisine_code']),
+                 os.path.join(output_dir, f"foods.{fmt}"), fmt)
+
+    tasks = []
+    for shard_id in range(num_shards):
+        start_id = shard_id * customers_per_shard + 1
+        shard_customers = min(customers_per_shard, num_customers - shard_id * customers_per_shard)
+        tasks.append((shard_id, shard_seeds[shard_id], start_id, shard_customers, foods_df, sparsity, output_dir, fmt))
+
+    if workers == 1:
+        results = [_generate_shard(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_generate_shard, *zip(*tasks)))
+
+    return {
+        'foods': num_foods,
+        'customers': sum(r[0] for r in results),
+        'ratings': sum(r[1] for r in results),
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sinh dữ liệu tổng hợp cho kiểm thử tải")
+    parser.add_argument('output_dir')
+    parser.add_argument('--num-foods', type=int, default=1000)
+    parser.add_argument('--num-customers', type=int, default=100000)
+    parser.add_argument('--sparsity', type=float, default=0.05)
+    parser.add_argument('--customers-per-shard', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    stats = generate_dataset(args.output_dir, num_foods=args.num_foods, num_customers=args.num_customers,
+                             sparsity=args.sparsity, customers_per_shard=args.customers_per_shard,
+                             seed=args.seed, fmt=args.format, workers=args.workers)
+    print(f"Đã sinh {stats['foods']:,} món, {stats['customers']:,} khách hàng, {stats['ratings']:,} đánh giá "
+          f"trong {stats['seconds']:.1f} giây")
+
+
+if __name__ == "__main__":
+    main()
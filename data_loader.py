@@ -1,97 +1,332 @@
+import hashlib
+import threading
+import numpy as np
 import pandas as pd
-from db_utils import get_connection, get_dataframe_from_query
+from db_utils import pooled_connection, get_dataframe_from_query, execute_read_query
+
+RATINGS_QUERY = """
+SELECT r.*, f.name as food_name, f.category, f.cuisine, f.price 
+FROM ratings r
+JOIN foods f ON r.food_id = f.food_id
+"""
+
+# Số dòng và id lớn nhất của cùng tập dòng mà RATINGS_QUERY trả về
+RATINGS_BOUNDS_QUERY = """
+SELECT COUNT(*) AS n_ratings, MAX(r.id) AS max_id
+FROM ratings r
+JOIN foods f ON r.food_id = f.food_id
+"""
+
+# Trạng thái nạp gần nhất, dùng chung cho mọi phiên trong tiến trình
+_state_lock = threading.Lock()
+_ratings_state = {
+    'frame': None,          # DataFrame đánh giá đã nạp
+    'max_id': None,         # watermark theo id
+    'max_timestamp': None,  # watermark theo thời gian đánh giá
+}
+_catalog_hash = None
+_data_version = 0
+
+# Các hàm được gọi sau khi add_rating ghi thành công
+_rating_listeners = []
+
+# Bảng gợi ý tính trước (batch_recommend.py) đã nạp: thời điểm tính và customer_id -> (food_id, điểm)
+_recommendations_state = {
+    'generated_at': None,
+    'lookup': {},
+}
+
+
+def register_rating_listener(listener):
+    """
+    Đăng ký hàm được gọi mỗi khi add_rating ghi thành công một đánh giá
+
+    Args:
+        listener (callable): Nhận (customer_id, food_id, rating, previous_rating),
+            previous_rating là None nếu đây là đánh giá mới
+    """
+    if listener not in _rating_listeners:
+        _rating_listeners.append(listener)
+
+
+def get_data_version():
+    """
+    Lấy phiên bản dữ liệu hiện tại
+
+    Returns:
+        int: Bộ đếm tăng mỗi khi dữ liệu đánh giá hoặc danh mục món ăn thay đổi
+    """
+    return _data_version
+
+
+def _bump_data_version():
+    global _data_version
+    _data_version += 1
+
 
 def load_foods_from_db():
     """Tải dữ liệu món ăn từ database"""
-    conn = get_connection()
-    if not conn:
-        return pd.DataFrame()
-    
-    query = "SELECT * FROM foods"
-    return get_dataframe_from_query(conn, query)
+    global _catalog_hash
+    with pooled_connection() as conn:
+        if not conn:
+            return pd.DataFrame()
+
+        # Thứ tự cố định: các chỉ mục và mô hình lưu món theo vị trí dòng
+        query = "SELECT * FROM foods ORDER BY food_id"
+        foods_df = get_dataframe_from_query(conn, query)
+
+    # Danh mục nhỏ nên băm toàn bộ (theo thứ tự dòng) để phát hiện thay đổi
+    catalog_hash = None
+    if not foods_df.empty:
+        row_hashes = pd.util.hash_pandas_object(foods_df, index=False).to_numpy()
+        catalog_hash = hashlib.sha1(row_hashes.tobytes()).hexdigest()
+    with _state_lock:
+        if catalog_hash != _catalog_hash:
+            _catalog_hash = catalog_hash
+            _bump_data_version()
+    return foods_df
 
 def load_customers_from_db():
     """Tải dữ liệu khách hàng từ database"""
-    conn = get_connection()
-    if not conn:
-        return pd.DataFrame()
-    
-    query = "SELECT * FROM customers"
-    return get_dataframe_from_query(conn, query)
+    with pooled_connection() as conn:
+        if not conn:
+            return pd.DataFrame()
+
+        query = "SELECT * FROM customers"
+        return get_dataframe_from_query(conn, query)
+
+def _sort_latest_first(frame):
+    """Giữ thứ tự mới nhất trước như ORDER BY r.timestamp DESC"""
+    if frame['timestamp'].is_monotonic_decreasing:
+        return frame
+    return frame.sort_values('timestamp', ascending=False, kind='stable').reset_index(drop=True)
+
+
+def _as_query_param(value):
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
+
+
+def _update_watermark(frame):
+    if frame.empty:
+        _ratings_state['max_id'] = None
+        _ratings_state['max_timestamp'] = None
+    else:
+        _ratings_state['max_id'] = _as_query_param(frame['id'].max())
+        _ratings_state['max_timestamp'] = _as_query_param(frame['timestamp'].max())
+
+
+def _same_values(before, after):
+    """So sánh id, điểm và thời gian theo giá trị, không theo dtype (SQLite có thể trả điểm float cho cột INT)"""
+    return (np.array_equal(before['id'].to_numpy(dtype=np.int64), after['id'].to_numpy(dtype=np.int64))
+            and np.array_equal(before['rating'].to_numpy(dtype=float), after['rating'].to_numpy(dtype=float))
+            and np.array_equal(before['timestamp'].to_numpy(dtype='datetime64[ns]'),
+                               after['timestamp'].to_numpy(dtype='datetime64[ns]')))
+
+
+def _full_load(conn):
+    """Đọc toàn bộ bảng ratings, mới nhất trước"""
+    frame = get_dataframe_from_query(conn, RATINGS_QUERY + "ORDER BY r.timestamp DESC")
+    if not frame.empty:
+        frame['timestamp'] = pd.to_datetime(frame['timestamp'])
+    return frame
+
+
+def _delta_load(conn, frame, max_id, max_timestamp):
+    """
+    Chỉ lấy các dòng có id hoặc thời gian vượt watermark và ghép vào frame đã nạp
+
+    Returns:
+        DataFrame | None: Frame mới, None nếu dữ liệu không đổi
+    """
+    # Đánh giá thêm mới: id lớn hơn hẳn watermark. Đánh giá được sửa giữ id cũ nên cần thêm điều kiện thời gian,
+    # dùng >= vì DATETIME chỉ chính xác tới giây (một lần sửa cùng giây với watermark vẫn được thấy)
+    delta = get_dataframe_from_query(
+        conn,
+        RATINGS_QUERY + "WHERE r.id > %s OR r.timestamp >= %s",
+        params=(max_id, max_timestamp)
+    )
+
+    changed = False
+    merged = frame
+    if not delta.empty:
+        delta['timestamp'] = pd.to_datetime(delta['timestamp'])
+        existing = frame[frame['id'].isin(delta['id'])]
+        if len(existing) != len(delta):
+            changed = True
+        else:
+            # Các dòng ở đúng giây watermark được lấy lại: chỉ coi là thay đổi nếu khác nội dung
+            before = existing.sort_values('id')
+            after = delta.sort_values('id')
+            changed = not _same_values(before, after)
+        if changed:
+            remaining = frame[~frame['id'].isin(delta['id'])]
+            delta = delta.sort_values('timestamp', ascending=False, kind='stable')
+            merged = _sort_latest_first(pd.concat([delta, remaining], ignore_index=True))
+
+    # Truy vấn delta không thấy dòng bị xóa (hoặc bị xóa rồi thêm lại): số dòng hoặc id lớn nhất trong
+    # database khác frame đã ghép thì nạp lại toàn bộ
+    bounds = execute_read_query(conn, RATINGS_BOUNDS_QUERY)
+    if (not bounds or bounds[0]['n_ratings'] != len(merged)
+            or _as_query_param(bounds[0]['max_id']) != _as_query_param(merged['id'].max())):
+        return _full_load(conn)
+    return merged if changed else None
+
 
 def load_ratings_from_db():
-    """Tải dữ liệu đánh giá từ database"""
-    conn = get_connection()
-    if not conn:
-        return pd.DataFrame()
-    
-    query = """
-    SELECT r.*, f.name as food_name, f.category, f.cuisine, f.price 
-    FROM ratings r
-    JOIN foods f ON r.food_id = f.food_id
-    ORDER BY r.timestamp DESC
     """
-    return get_dataframe_from_query(conn, query)
+    Tải dữ liệu đánh giá từ database
+
+    Lần đầu nạp toàn bộ bảng, các lần sau chỉ truy vấn phần thay đổi kể từ watermark
+    (id, timestamp) và ghép vào frame đã lưu trong bộ nhớ. Khóa trạng thái chỉ được giữ khi đọc
+    watermark và khi ghép kết quả, không giữ trong lúc truy vấn database.
+    """
+    with _state_lock:
+        frame = _ratings_state['frame']
+        max_id, max_timestamp = _ratings_state['max_id'], _ratings_state['max_timestamp']
+
+    with pooled_connection() as conn:
+        if not conn:
+            return pd.DataFrame()
+
+        if frame is None or frame.empty:
+            loaded = _full_load(conn)
+        else:
+            loaded = _delta_load(conn, frame, max_id, max_timestamp)
+
+    with _state_lock:
+        current = _ratings_state['frame']
+        # Luồng khác đã ghép trong lúc truy vấn: giữ kết quả của luồng đó, lần tải sau sẽ đọc tiếp từ watermark mới
+        if loaded is not None and (current is frame or current is None):
+            _ratings_state['frame'] = current = loaded
+            _update_watermark(loaded)
+            _bump_data_version()
+        elif current is None:
+            # Bộ nhớ đệm vừa bị xóa (reset_ratings_cache), trả về frame đã đọc
+            current = frame
+
+        # Bản sao nông: phía gọi thêm/sửa cột không làm hỏng frame đã lưu
+        return current.copy(deep=False)
+
+
+def reset_ratings_cache():
+    """Xóa trạng thái đã nạp, lần tải sau sẽ đọc lại toàn bộ bảng ratings"""
+    with _state_lock:
+        _ratings_state['frame'] = None
+        _ratings_state['max_id'] = None
+        _ratings_state['max_timestamp'] = None
+
 
 def get_customer_ratings(customer_id):
     """Lấy lịch sử đánh giá của một khách hàng"""
-    conn = get_connection()
-    if not conn:
-        return pd.DataFrame()
-    
-    query = """
-    SELECT r.*, f.name as food_name, f.category, f.cuisine, f.price 
-    FROM ratings r
-    JOIN foods f ON r.food_id = f.food_id
-    WHERE r.customer_id = %s
-    ORDER BY r.timestamp DESC
-    """
-    return get_dataframe_from_query(conn, query, params=(customer_id,))
+    with pooled_connection() as conn:
+        if not conn:
+            return pd.DataFrame()
+
+        query = """
+        SELECT r.*, f.name as food_name, f.category, f.cuisine, f.price 
+        FROM ratings r
+        JOIN foods f ON r.food_id = f.food_id
+        WHERE r.customer_id = %s
+        ORDER BY r.timestamp DESC
+        """
+        return get_dataframe_from_query(conn, query, params=(customer_id,))
 
 def add_rating(customer_id, food_id, rating):
     """Thêm hoặc cập nhật đánh giá của khách hàng"""
-    conn = get_connection()
-    if not conn:
-        return False
-    
-    # Kiểm tra xem đánh giá đã tồn tại chưa
-    check_query = """
-    SELECT id FROM ratings 
-    WHERE customer_id = %s AND food_id = %s
-    """
-    cursor = conn.cursor()
-    cursor.execute(check_query, (customer_id, food_id))
-    result = cursor.fetchone()
-    
-    if result:
-        # Cập nhật đánh giá hiện có
-        update_query = """
-        UPDATE ratings 
-        SET rating = %s, timestamp = CURRENT_TIMESTAMP
+    with pooled_connection() as conn:
+        if not conn:
+            return False
+
+        # Kiểm tra xem đánh giá đã tồn tại chưa
+        check_query = """
+        SELECT id, rating FROM ratings 
         WHERE customer_id = %s AND food_id = %s
         """
-        cursor.execute(update_query, (rating, customer_id, food_id))
-    else:
-        # Thêm đánh giá mới
-        insert_query = """
-        INSERT INTO ratings (customer_id, food_id, rating)
-        VALUES (%s, %s, %s)
-        """
-        cursor.execute(insert_query, (customer_id, food_id, rating))
-    
-    conn.commit()
-    cursor.close()
+        cursor = conn.cursor()
+        cursor.execute(check_query, (customer_id, food_id))
+        result = cursor.fetchone()
+        previous_rating = result[1] if result else None
+
+        if result:
+            # Cập nhật đánh giá hiện có
+            update_query = """
+            UPDATE ratings 
+            SET rating = %s, timestamp = CURRENT_TIMESTAMP
+            WHERE customer_id = %s AND food_id = %s
+            """
+            cursor.execute(update_query, (rating, customer_id, food_id))
+        else:
+            # Thêm đánh giá mới
+            insert_query = """
+            INSERT INTO ratings (customer_id, food_id, rating)
+            VALUES (%s, %s, %s)
+            """
+            cursor.execute(insert_query, (customer_id, food_id, rating))
+
+        conn.commit()
+        cursor.close()
+
+    for listener in _rating_listeners:
+        try:
+            listener(customer_id, food_id, rating, previous_rating)
+        except Exception as e:
+            print(f"Lỗi khi cập nhật sau đánh giá mới: {e}")
     return True
 
+def load_precomputed_recommendations():
+    """
+    Tải bảng gợi ý tính trước bởi batch_recommend.py
+
+    Bảng chỉ được đọc lại khi có lần tính mới (mọi dòng cùng generated_at nên chỉ cần đọc một dòng để kiểm tra).
+
+    Returns:
+        dict: customer_id -> (mảng food_id, mảng điểm) theo thứ hạng, rỗng nếu chưa có bảng
+    """
+    with pooled_connection() as conn:
+        if not conn:
+            return {}
+
+        latest = execute_read_query(conn, "SELECT generated_at FROM recommendations LIMIT 1")
+        if not latest:
+            return {}
+        generated_at = latest[0]['generated_at']
+
+        with _state_lock:
+            if generated_at == _recommendations_state['generated_at']:
+                return _recommendations_state['lookup']
+
+        frame = get_dataframe_from_query(
+            conn, "SELECT customer_id, food_id, score FROM recommendations ORDER BY customer_id, position"
+        )
+
+    # Các dòng của một khách hàng nằm liền nhau: tách thành mảng một lần, tra cứu O(1) theo customer_id
+    customer_ids = frame['customer_id'].to_numpy()
+    starts = np.flatnonzero(np.r_[True, customer_ids[1:] != customer_ids[:-1]]) if len(frame) else []
+    bounds = np.append(starts, len(frame))
+    food_ids = frame['food_id'].to_numpy()
+    scores = frame['score'].to_numpy(dtype=float)
+    lookup = {customer_ids[start]: (food_ids[start:end], scores[start:end])
+              for start, end in zip(bounds[:-1], bounds[1:])}
+
+    with _state_lock:
+        _recommendations_state['generated_at'] = generated_at
+        _recommendations_state['lookup'] = lookup
+    return lookup
+
+
 def get_food_details(food_id):
     """Lấy thông tin chi tiết của một món ăn"""
-    conn = get_connection()
-    if not conn:
-        return None
-    
-    query = "SELECT * FROM foods WHERE food_id = %s"
-    result = get_dataframe_from_query(conn, query, params=(food_id,))
-    
+    with pooled_connection() as conn:
+        if not conn:
+            return None
+
+        query = "SELECT * FROM foods WHERE food_id = %s"
+        result = get_dataframe_from_query(conn, query, params=(food_id,))
+
     if result.empty:
         return None
     return result.iloc[0].to_dict()
@@ -1,8 +1,11 @@
 import mysql.connector
 from mysql.connector import Error
-import pandas as pd
-import streamlit as st
 import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
 from dotenv import load_dotenv
 load_dotenv()
 host1 = os.getenv("DB_HOST")
@@ -10,7 +13,17 @@ port1 = os.getenv("DB_PORT")
 user1 = os.getenv("DB_USER")
 password1 = os.getenv("DB_PASSWORD")
 database1 = os.getenv("DB_NAME")
-port1 = int(port1)
+port1 = int(port1) if port1 else 3307
+
+# Cấu hình pool kết nối
+DB_BACKEND = os.getenv("DB_BACKEND", "mysql")
+DB_SQLITE_PATH = os.getenv("DB_SQLITE_PATH", "food_recommendation.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+# Lỗi database có thể gặp với cả MySQL lẫn SQLite
+DB_ERRORS = (Error, sqlite3.Error)
+
 def create_connection(host=host1, port=port1, user=user1, password=password1, database=database1):
     """
     Tạo kết nối tới MySQL database
@@ -35,11 +48,284 @@ def create_connection(host=host1, port=port1, user=user1, password=password1, da
             database=database
         )
         print("Kết nối MySQL thành công")
-    except Error as e:
+    except DB_ERRORS as e:
         print(f"Lỗi kết nối MySQL: {e}")
     
     return connection
 
+class SQLiteCursor:
+    """Cursor SQLite có cùng giao diện với cursor của mysql.connector"""
+
+    def __init__(self, cursor, dictionary=False):
+        self._cursor = cursor
+        self._dictionary = dictionary
+
+    @staticmethod
+    def _translate(query):
+        # mysql.connector dùng %s, sqlite3 dùng ?
+        return query.replace('%s', '?')
+
+    def execute(self, query, params=None):
+        if params:
+            self._cursor.execute(self._translate(query), tuple(params))
+        else:
+            self._cursor.execute(self._translate(query))
+        return self
+
+    def executemany(self, query, seq_of_params):
+        self._cursor.executemany(self._translate(query), seq_of_params)
+        return self
+
+    def _convert(self, row):
+        if row is None or not self._dictionary:
+            return row
+        columns = [column[0] for column in self._cursor.description]
+        return dict(zip(columns, row))
+
+    def fetchone(self):
+        return self._convert(self._cursor.fetchone())
+
+    def fetchall(self):
+        return [self._convert(row) for row in self._cursor.fetchall()]
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """
+    Adapter SQLite nhúng có cùng giao diện với kết nối mysql.connector
+
+    Dùng để chạy ứng dụng hoặc kiểm thử tầng truy cập dữ liệu mà không cần MySQL server.
+    """
+
+    dialect = 'sqlite'
+
+    def __init__(self, path=DB_SQLITE_PATH):
+        self.path = path
+        self._connection = None
+        self.reconnect()
+
+    def reconnect(self):
+        # Pool chuyển kết nối giữa các luồng (mỗi lúc chỉ một luồng dùng)
+        self._connection = sqlite3.connect(self.path, check_same_thread=False,
+                                           detect_types=sqlite3.PARSE_DECLTYPES)
+
+    def cursor(self, dictionary=False):
+        return SQLiteCursor(self._connection.cursor(), dictionary=dictionary)
+
+    def is_connected(self):
+        if self._connection is None:
+            return False
+        try:
+            self._connection.execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def ping(self, reconnect=False):
+        if not self.is_connected():
+            if not reconnect:
+                raise sqlite3.OperationalError("Mất kết nối SQLite")
+            self.reconnect()
+
+    def commit(self):
+        self._connection.commit()
+
+    def rollback(self):
+        self._connection.rollback()
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+def create_sqlite_connection(path=DB_SQLITE_PATH):
+    """
+    Tạo kết nối tới SQLite database nhúng
+
+    Args:
+        path (str): Đường dẫn file SQLite (hoặc ':memory:')
+
+    Returns:
+        SQLiteConnection: Kết nối có cùng giao diện với mysql.connector hoặc None nếu có lỗi
+    """
+    try:
+        return SQLiteConnection(path)
+    except sqlite3.Error as e:
+        print(f"Lỗi kết nối SQLite: {e}")
+        return None
+
+
+class ConnectionPool:
+    """
+    Pool kết nối giới hạn số lượng, kiểm tra kết nối còn sống khi lấy ra và tự kết nối lại
+
+    Args:
+        factory (callable): Hàm tạo kết nối mới, trả về None nếu có lỗi
+        pool_size (int): Số kết nối tối đa tới server
+        timeout (float): Số giây chờ tối đa khi pool đã dùng hết
+    """
+
+    def __init__(self, factory, pool_size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT):
+        self.factory = factory
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._idle = deque()
+        self._created = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    @staticmethod
+    def _is_alive(connection):
+        try:
+            return connection.is_connected()
+        except DB_ERRORS:
+            return False
+
+    @staticmethod
+    def _discard(connection):
+        try:
+            connection.close()
+        except DB_ERRORS:
+            pass
+
+    def acquire(self):
+        """
+        Lấy một kết nối còn sống từ pool
+
+        Returns:
+            connection: Đối tượng kết nối hoặc None nếu không thể kết nối / hết thời gian chờ
+
+        Raises:
+            RuntimeError: Pool đã bị đóng (close)
+        """
+        deadline = time.monotonic() + self.timeout
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Pool kết nối đã đóng")
+            while True:
+                while self._idle:
+                    connection = self._idle.pop()
+                    if self._is_alive(connection):
+                        return connection
+                    # Kết nối đã chết: bỏ đi và tạo kết nối mới thay thế
+                    self._discard(connection)
+                    self._created -= 1
+
+                if self._created < self.pool_size:
+                    self._created += 1
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    print("Lỗi: hết thời gian chờ kết nối từ pool")
+                    return None
+                self._condition.wait(remaining)
+
+        # Tạo kết nối ngoài khóa để không chặn các luồng khác
+        connection = self.factory()
+        if connection is None:
+            with self._condition:
+                self._created -= 1
+                self._condition.notify()
+        return connection
+
+    def release(self, connection):
+        """Trả kết nối về pool sau khi dùng xong"""
+        if connection is None:
+            return
+        try:
+            # Kết thúc giao dịch đang mở để lần đọc sau thấy dữ liệu mới nhất
+            connection.rollback()
+            reusable = not self._closed
+        except DB_ERRORS:
+            reusable = False
+
+        with self._condition:
+            if reusable:
+                self._idle.append(connection)
+            else:
+                self._discard(connection)
+                self._created -= 1
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self):
+        """Context manager lấy kết nối và tự trả về pool khi kết thúc"""
+        connection = self.acquire()
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+    def close(self):
+        """Đóng mọi kết nối đang rảnh, kết nối đang dùng sẽ được đóng khi trả về; pool không dùng lại được"""
+        with self._condition:
+            self._closed = True
+            while self._idle:
+                self._discard(self._idle.pop())
+                self._created -= 1
+            self._condition.notify_all()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _default_factory():
+    if DB_BACKEND == 'sqlite':
+        return create_sqlite_connection(DB_SQLITE_PATH)
+    return create_connection(host=host1, port=port1, user=user1, password=password1, database=database1)
+
+
+def database_configured():
+    """Đã cấu hình database để kết nối hay chưa (SQLite nhúng, hoặc có DB_HOST cho MySQL)"""
+    return DB_BACKEND == 'sqlite' or bool(host1)
+
+
+def get_pool():
+    """
+    Lấy pool kết nối dùng chung cho toàn bộ tiến trình
+
+    Returns:
+        ConnectionPool: Pool kết nối tới database theo cấu hình DB_BACKEND
+    """
+    global _pool
+    pool = _pool
+    if pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(_default_factory)
+            pool = _pool
+    return pool
+
+
+@contextmanager
+def pooled_connection():
+    """
+    Mượn một kết nối từ pool dùng chung cho một truy vấn
+
+    Yields:
+        connection: Đối tượng kết nối hoặc None nếu không thể kết nối
+    """
+    with get_pool().connection() as connection:
+        yield connection
+
+
 def execute_query(connection, query, params=None):
     """
     Thực thi câu truy vấn SQL
@@ -60,7 +346,7 @@ def execute_query(connection, query, params=None):
             cursor.execute(query)
         connection.commit()
         return True
-    except Error as e:
+    except DB_ERRORS as e:
         print(f"Lỗi thực thi truy vấn: {e}")
         return False
     finally:
@@ -87,7 +373,7 @@ def execute_read_query(connection, query, params=None):
             cursor.execute(query)
         result = cursor.fetchall()
         return result
-    except Error as e:
+    except DB_ERRORS as e:
         print(f"Lỗi thực thi truy vấn đọc: {e}")
         return None
     finally:
@@ -105,39 +391,27 @@ def get_dataframe_from_query(connection, query, params=None):
     Returns:
         DataFrame: DataFrame pandas hoặc DataFrame rỗng nếu có lỗi
     """
+    import pandas as pd
+
+    if isinstance(connection, SQLiteConnection):
+        # pandas chỉ hỗ trợ trực tiếp kết nối sqlite3, không phải adapter
+        query = SQLiteCursor._translate(query)
+        connection = connection._connection
+
     try:
         if params:
             return pd.read_sql_query(query, connection, params=params)
         else:
             return pd.read_sql_query(query, connection)
-    except Error as e:
+    except (*DB_ERRORS, pd.errors.DatabaseError) as e:
         print(f"Lỗi đọc DataFrame: {e}")
         return pd.DataFrame()
 
-# Hàm tiện ích sử dụng với Streamlit để lưu kết nối trong session state
-def get_connection():
-    """
-    Lấy hoặc tạo kết nối MySQL từ session state của Streamlit
-    
-    Returns:
-        connection: Đối tượng kết nối MySQL
-    """
-    if 'db_connection' not in st.session_state:
-        # Thay đổi thông tin kết nối phù hợp với cấu hình của bạn
-
-        st.session_state.db_connection = create_connection(
-            host=host1,
-            port=port1,
-            user=user1,
-            password=password1,
-            database=database1
-        )
-    
-    return st.session_state.db_connection
-
 def close_connection():
-    """Đóng kết nối database nếu tồn tại trong session state"""
-    if 'db_connection' in st.session_state and st.session_state.db_connection:
-        st.session_state.db_connection.close()
-        del st.session_state.db_connection
+    """Đóng các kết nối database đang rảnh trong pool, lần truy vấn sau sẽ dùng một pool mới"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
         print("Đã đóng kết nối MySQL")
@@ -3,6 +3,7 @@ import numpy as np
 import random
 from datetime import datetime, timedelta
 from db_utils import create_connection, execute_query
+from bulk_import import bulk_insert
 import os
 from dotenv import load_dotenv
 
@@ -165,23 +166,16 @@ def import_sample_foods():
     cursor.execute("DELETE FROM foods")
     conn.commit()
     
-    # Thêm dữ liệu mới
-    for _, row in foods_df.iterrows():
-        insert_query = """
-        INSERT INTO foods (food_id, name, category, cuisine, ingredients, flavors, features, price)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        
-        cursor.execute(insert_query, (
-            row['food_id'], row['name'], row['category'], row['cuisine'],
-            row['ingredients'], row['flavors'], row['features'], float(row['price'])
-        ))
-    
-    conn.commit()
     cursor.close()
+
+    # Thêm dữ liệu mới theo từng khối
+    foods_df['price'] = foods_df['price'].astype(float)
+    stats = bulk_insert(conn, 'foods', foods_df,
+                        columns=['food_id', 'name', 'category', 'cuisine', 'ingredients', 'flavors', 'features', 'price'],
+                        verbose=False)
     conn.close()
     
-    print(f"Đã import {len(foods_df)} món ăn vào database")
+    print(f"Đã import {stats['rows']} món ăn vào database ({stats['rows_per_second']:,.0f} dòng/giây)")
     return True
 
 def import_sample_customers():
@@ -238,22 +232,13 @@ def import_sample_customers():
     cursor.execute("DELETE FROM customers")
     conn.commit()
     
-    # Thêm dữ liệu mới
-    for _, row in customers_df.iterrows():
-        insert_query = """
-        INSERT INTO customers (customer_id, name, age, gender, price_sensitivity)
-        VALUES (%s, %s, %s, %s, %s)
-        """
-        
-        cursor.execute(insert_query, (
-            row['customer_id'], row['name'], int(row['age']), row['gender'], float(row['price_sensitivity'])
-        ))
-    
-    conn.commit()
     cursor.close()
+
+    # Thêm dữ liệu mới theo từng khối
+    stats = bulk_insert(conn, 'customers', customers_df, verbose=False)
     conn.close()
     
-    print(f"Đã import {len(customers_df)} khách hàng vào database")
+    print(f"Đã import {stats['rows']} khách hàng vào database ({stats['rows_per_second']:,.0f} dòng/giây)")
     return True
 
 def import_sample_ratings():
@@ -310,22 +295,13 @@ def import_sample_ratings():
     cursor.execute("DELETE FROM ratings")
     conn.commit()
     
-    # Thêm dữ liệu mới
-    for _, row in ratings_df.iterrows():
-        insert_query = """
-        INSERT INTO ratings (customer_id, food_id, rating, timestamp)
-        VALUES (%s, %s, %s, %s)
-        """
-        
-        cursor.execute(insert_query, (
-            row['customer_id'], row['food_id'], int(row['rating']), row['timestamp']
-        ))
-    
-    conn.commit()
     cursor.close()
+
+    # Thêm dữ liệu mới theo từng khối
+    stats = bulk_insert(conn, 'ratings', ratings_df, verbose=False)
     conn.close()
     
-    print(f"Đã import {len(ratings_df)} đánh giá vào database")
+    print(f"Đã import {stats['rows']} đánh giá vào database ({stats['rows_per_second']:,.0f} dòng/giây)")
     return True
 
 def import_all_sample_data():
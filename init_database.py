@@ -79,6 +79,7 @@ def initialize_tables():
         food_id VARCHAR(50),
         rating INT NOT NULL,
         timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        INDEX idx_ratings_timestamp (timestamp),
         FOREIGN KEY (customer_id) REFERENCES customers(customer_id),
         FOREIGN KEY (food_id) REFERENCES foods(food_id)
     );
@@ -0,0 +1,507 @@
+import copy
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from attribute_index import get_attribute_index
+from rating_index import RatedItemsIndex
+from search_index import get_search_index
+from recommenders import ContentBasedRecommender, CollaborativeRecommender, HybridRecommender, ARTIFACT_FORMAT_VERSION
+
+# Thư mục lưu mô hình đã huấn luyện, để trống để tắt việc lưu/tải artifact
+ARTIFACT_DIR = os.getenv('MODEL_ARTIFACT_DIR', 'model_artifacts')
+# Số artifact giữ lại cho mỗi nguồn dữ liệu
+KEEP_ARTIFACTS = int(os.getenv('MODEL_KEEP_ARTIFACTS', 3))
+ARTIFACT_MANIFEST = 'manifest.json'
+
+
+def compute_data_version(foods_df, ratings_df):
+    """
+    Tạo khóa phiên bản dữ liệu rẻ để biết khi nào cần huấn luyện lại
+
+    Args:
+        foods_df (DataFrame): Dữ liệu món ăn
+        ratings_df (DataFrame): Dữ liệu đánh giá
+
+    Returns:
+        tuple: Khóa phiên bản (số món, số đánh giá, id và thời gian đánh giá mới nhất)
+    """
+    if {'id', 'timestamp'}.issubset(ratings_df.columns):
+        latest_id = ratings_df['id'].max() if not ratings_df.empty else None
+        latest_timestamp = ratings_df['timestamp'].max() if not ratings_df.empty else None
+        return len(foods_df), len(ratings_df), str(latest_id), str(latest_timestamp)
+
+    # Dữ liệu không có id/timestamp (ví dụ dữ liệu sinh ngẫu nhiên): băm nội dung
+    content_hash = int(pd.util.hash_pandas_object(ratings_df, index=False).sum())
+    return len(foods_df), len(ratings_df), content_hash
+
+
+def compute_data_fingerprint(foods_df, ratings_df):
+    """
+    Dấu vân tay dữ liệu ổn định giữa các tiến trình, dùng để chọn artifact đã lưu
+
+    Bộ đếm phiên bản của data_loader chỉ có ý nghĩa trong một tiến trình nên không dùng được
+    cho artifact trên đĩa.
+
+    Returns:
+        str: Chuỗi hex đại diện cho danh mục món và dữ liệu đánh giá
+    """
+    # Mô hình lưu món theo vị trí dòng nên băm danh mục theo đúng thứ tự
+    catalog_hash = hashlib.sha1(pd.util.hash_pandas_object(foods_df, index=False).to_numpy().tobytes()).hexdigest()
+    key = repr((compute_data_version(foods_df, ratings_df), catalog_hash))
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def _ratings_watermark(ratings_df):
+    """(id, thời gian) đánh giá mới nhất mà mô hình đã thấy, None nếu dữ liệu không có các cột này"""
+    if ratings_df.empty or not {'id', 'timestamp'}.issubset(ratings_df.columns):
+        return None
+    return ratings_df['id'].max(), ratings_df['timestamp'].max()
+
+
+def _same_rating(current, rating):
+    # rated_index lưu điểm dạng float32
+    return current is not None and np.float32(current) == np.float32(rating)
+
+
+def _shared_indexes(foods_df, ratings_df):
+    # Chỉ mục thuộc tính chỉ xây lại khi danh mục món thay đổi, không phải mỗi lần ratings thay đổi
+    return get_attribute_index(foods_df), RatedItemsIndex(ratings_df, foods_df)
+
+
+def _models_dict(hybrid_recommender, rated_index, attribute_index, foods_df):
+    return {
+        'content': hybrid_recommender.content_recommender,
+        'collab': hybrid_recommender.collab_recommender,
+        'hybrid': hybrid_recommender,
+        'rated_index': rated_index,
+        'attribute_index': attribute_index,
+        # Chỉ mục tìm kiếm dùng chung, chỉ các món thay đổi được đánh chỉ mục lại
+        'search_index': get_search_index(foods_df),
+    }
+
+
+def _copy_for_fold_in(models):
+    """Bộ mô hình mới dùng bản sao mô hình collaborative, phiên đang đọc vẫn dùng bộ cũ trong lúc fold-in"""
+    collab = models['collab'].copy_for_fold_in()
+    hybrid = copy.copy(models['hybrid'])
+    hybrid.collab_recommender = collab
+    return {**models, 'collab': collab, 'hybrid': hybrid, 'rated_index': collab.rated_index}
+
+
+def train_models(foods_df, ratings_df, customers_df=None, content_top_k=None):
+    """
+    Huấn luyện bộ ba mô hình gợi ý, hybrid dùng lại các mô hình thành phần đã huấn luyện
+
+    Returns:
+        dict: {'content': ..., 'collab': ..., 'hybrid': ..., 'rated_index': ..., 'attribute_index': ...,
+            'search_index': ...}
+    """
+    attribute_index, rated_index = _shared_indexes(foods_df, ratings_df)
+    content_recommender = ContentBasedRecommender(top_k=content_top_k)
+    collab_recommender = CollaborativeRecommender()
+
+    content_recommender.fit(foods_df, attribute_index=attribute_index)
+    collab_recommender.fit(ratings_df, foods_df, rated_index=rated_index, attribute_index=attribute_index)
+
+    hybrid_recommender = HybridRecommender(content_recommender=content_recommender,
+                                           collab_recommender=collab_recommender)
+    hybrid_recommender.fit(foods_df, ratings_df, customers_df)
+
+    return _models_dict(hybrid_recommender, rated_index, attribute_index, foods_df)
+
+
+def load_models(directory, foods_df, ratings_df, customers_df=None, mmap_mode='r'):
+    """
+    Tải bộ ba mô hình từ artifact đã lưu (xem ModelRegistry), các mảng lớn được memory-map
+
+    Returns:
+        dict: Cùng dạng với train_models
+    """
+    attribute_index, rated_index = _shared_indexes(foods_df, ratings_df)
+    hybrid_recommender = HybridRecommender.load(directory, foods_df, ratings_df, customers_df,
+                                                rated_index=rated_index, attribute_index=attribute_index,
+                                                mmap_mode=mmap_mode)
+    return _models_dict(hybrid_recommender, rated_index, attribute_index, foods_df)
+
+
+class ModelRegistry:
+    """
+    Kho mô hình dùng chung cho toàn bộ tiến trình
+
+    Mỗi phiên bản dữ liệu chỉ được huấn luyện một lần, các phiên Streamlit dùng chung
+    các mô hình này ở chế độ chỉ đọc. Khi chỉ có thêm đánh giá mới, chúng được fold-in vào bản sao của mô hình
+    hiện có rồi hoán đổi vào; huấn luyện lại toàn bộ khi danh mục món đổi hoặc đã fold-in quá retrain_threshold
+    đánh giá. Nếu có artifact_dir, mô hình vừa huấn luyện được lưu xuống đĩa
+    và lần khởi động sau chỉ cần memory-map artifact mới nhất có cùng dấu vân tay dữ liệu.
+
+    Args:
+        content_top_k (int, optional): Số láng giềng giữ lại cho mô hình content-based
+        artifact_dir (str, optional): Thư mục lưu artifact, None để chỉ giữ mô hình trong bộ nhớ
+        keep_artifacts (int): Số artifact giữ lại cho mỗi nguồn dữ liệu
+    """
+
+    def __init__(self, content_top_k=None, artifact_dir=None, keep_artifacts=KEEP_ARTIFACTS):
+        self.content_top_k = content_top_k
+        self.artifact_dir = artifact_dir
+        self.keep_artifacts = keep_artifacts
+        self._lock = threading.Lock()
+        # name -> (version, models, watermark đánh giá), chỉ được thay nguyên bộ (hoán đổi nguyên tử)
+        self._entries = {}
+        # name -> thông tin lần cập nhật mô hình gần nhất
+        self._status = {}
+        # Tăng mỗi khi bộ mô hình được thay bằng bộ mới (huấn luyện, tải artifact hoặc fold-in từ dữ liệu nạp lại)
+        self._generation = 0
+
+    def get_models(self, version, foods_df, ratings_df, customers_df=None, name='default'):
+        """
+        Lấy các mô hình cho phiên bản dữ liệu, huấn luyện nếu chưa có
+
+        Args:
+            version: Khóa phiên bản dữ liệu (xem compute_data_version)
+            foods_df (DataFrame): Dữ liệu món ăn
+            ratings_df (DataFrame): Dữ liệu đánh giá
+            customers_df (DataFrame, optional): Dữ liệu khách hàng
+            name (str): Tên nguồn dữ liệu, mỗi nguồn giữ một phiên bản mới nhất
+
+        Returns:
+            dict: {'content': ..., 'collab': ..., 'hybrid': ..., 'rated_index': ..., 'attribute_index': ...,
+            'search_index': ...}
+        """
+        entry = self._entries.get(name)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+
+        with self._lock:
+            # Một phiên khác có thể đã huấn luyện xong trong lúc chờ khóa
+            entry = self._entries.get(name)
+            if entry is not None and entry[0] == version:
+                return entry[1]
+
+            start = time.perf_counter()
+            # Chỉ có thêm đánh giá mới: fold-in vào bản sao mô hình hiện có trong vài mili giây thay vì huấn luyện lại
+            new_ratings = self._new_ratings(entry, foods_df, ratings_df) if entry is not None else None
+            if new_ratings is not None:
+                models = entry[1]
+                if not new_ratings.empty:
+                    models = _copy_for_fold_in(models)
+                    collab = models['collab']
+                    # Dữ liệu sắp mới nhất trước, fold-in theo thứ tự thời gian để đánh giá sau cùng được giữ lại
+                    for row in new_ratings.iloc[::-1].itertuples(index=False):
+                        collab.fold_in(row.customer_id, row.food_id, row.rating)
+                    collab.ratings = ratings_df
+                self._swap(name, version, models, ratings_df, 'fold_in', start, changed=not new_ratings.empty)
+                return models
+
+            models = None
+            source = 'artifact'
+            if self.artifact_dir:
+                fingerprint = compute_data_fingerprint(foods_df, ratings_df)
+                models = self._load_artifact(name, fingerprint, foods_df, ratings_df, customers_df)
+
+            if models is None:
+                source = 'train'
+                models = train_models(foods_df, ratings_df, customers_df, content_top_k=self.content_top_k)
+                if self.artifact_dir:
+                    self._save_artifact(name, fingerprint, models['hybrid'])
+
+            self._swap(name, version, models, ratings_df, source, start)
+            return models
+
+    def can_fold_in(self, foods_df, ratings_df, name='default'):
+        """Dữ liệu mới chỉ cần fold-in vào mô hình hiện có (không phải huấn luyện lại toàn bộ) hay không"""
+        entry = self._entries.get(name)
+        entry = self._entries.get(name)
+        return entry is not None and self._new_ratings(entry, foods_df, ratings_df) is not None
+
+    def _swap(self, name, version, models, ratings_df, source, start, changed=True):
+        # Mô hình đã được dựng xong hoàn toàn trước khi thay, phiên đang đọc vẫn dùng bộ cũ tới hết request.
+        # Thế hệ mới làm các kết quả gợi ý đã lưu theo thế hệ cũ hết hiệu lực
+        self._entries[name] = (version, models, _ratings_watermark(ratings_df))
+        if changed:
+            self._generation += 1
+            generation = self._generation
+        else:
+            generation = self._status[name]['generation']
+        self._status[name] = {
+            'version': version,
+            'generation': generation,
+            'source': source,
+            'last_trained_at': datetime.now(),
+            'duration': time.perf_counter() - start,
+        }
+
+    def mark_status(self, name='default', **fields):
+        """
+        Ghi đè các trường trong thông tin lần cập nhật gần nhất (ví dụ thời gian huấn luyện tính cả tiến trình con)
+
+        Args:
+            name (str): Tên nguồn dữ liệu
+            **fields: Các trường của status() cần ghi đè
+        """
+        with self._lock:
+            status = self._status.get(name)
+            if status is not None:
+                self._status[name] = {**status, **fields}
+
+    def current(self, name='default'):
+        """
+        Mô hình đang phục vụ, không chờ huấn luyện
+
+        Returns:
+            tuple | None: (version, models) hoặc None nếu chưa có mô hình nào
+        """
+        entry = self._entries.get(name)
+        return None if entry is None else (entry[0], entry[1])
+
+    def status(self, name='default'):
+        """
+        Thông tin lần cập nhật mô hình gần nhất
+
+        Returns:
+            dict | None: {'version', 'generation' (đổi khi mô hình được thay bằng bộ mới, kể cả bộ vừa fold-in
+                đánh giá mới), 'source' ('train', 'artifact' hoặc 'fold_in'), 'last_trained_at', 'duration'}
+        """
+        status = self._status.get(name)
+        return dict(status) if status is not None else None
+
+    def _new_ratings(self, entry, foods_df, ratings_df):
+        """
+        Các đánh giá mô hình chưa thấy (mới hơn watermark), cần fold-in
+
+        Returns:
+            DataFrame | None: Các đánh giá cần fold-in (có thể rỗng), None nếu cần huấn luyện lại toàn bộ
+        """
+        _, models, watermark = entry
+        collab = models['collab']
+        if watermark is None or not collab.supports_fold_in or collab.needs_retrain:
+            return None
+        # Danh mục món thay đổi (chỉ mục thuộc tính được xây lại) hoặc có đánh giá bị xóa
+        if models['attribute_index'] is not get_attribute_index(foods_df) or len(ratings_df) < len(collab.ratings):
+            return None
+
+        # Đánh giá thêm mới có id lớn hơn watermark; đánh giá được sửa giữ id cũ nhưng có thời gian mới hơn
+        max_id, max_timestamp = watermark
+        candidates = ratings_df[(ratings_df['id'] > max_id) | (ratings_df['timestamp'] >= max_timestamp)]
+        # Bỏ các đánh giá mô hình đã có: dòng tại watermark và đánh giá listener apply_rating đã fold-in
+        rated_index = collab.rated_index
+        applied = [
+            _same_rating(rated_index.get_rating(row.customer_id, row.food_id), row.rating)
+            for row in candidates.itertuples(index=False)
+        ]
+        new_ratings = candidates[~np.array(applied, dtype=bool)]
+        if collab.updates_since_fit + len(new_ratings) > collab.retrain_threshold:
+            return None
+        return new_ratings
+
+    def _artifact_root(self, name):
+        return os.path.join(self.artifact_dir, name)
+
+    def _read_manifest(self, directory):
+        try:
+            with open(os.path.join(directory, ARTIFACT_MANIFEST), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            # Thư mục dở dang (tiến trình bị dừng giữa chừng) hoặc không phải artifact
+            return None
+
+    def _list_artifacts(self, name):
+        """Các artifact hợp lệ của một nguồn dữ liệu, mới nhất trước"""
+        root = self._artifact_root(name)
+        if not os.path.isdir(root):
+            return []
+
+        artifacts = []
+        for entry in os.listdir(root):
+            directory = os.path.join(root, entry)
+            manifest = self._read_manifest(directory)
+            if manifest is not None and manifest.get('format_version') == ARTIFACT_FORMAT_VERSION:
+                artifacts.append((manifest['created_at'], directory, manifest))
+        artifacts.sort(key=lambda artifact: artifact[0], reverse=True)
+        return [(directory, manifest) for _, directory, manifest in artifacts]
+
+    def _load_artifact(self, name, fingerprint, foods_df, ratings_df, customers_df):
+        """Memory-map artifact mới nhất khớp dấu vân tay dữ liệu và tham số, None nếu không có"""
+        for directory, manifest in self._list_artifacts(name):
+            if manifest['data_fingerprint'] != fingerprint or manifest['content_top_k'] != self.content_top_k:
+                continue
+            try:
+                return load_models(directory, foods_df, ratings_df, customers_df)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Không thể tải artifact {directory}: {e}")
+        return None
+
+    def _save_artifact(self, name, fingerprint, hybrid_recommender):
+        """Ghi artifact vào thư mục tạm rồi đổi tên, tiến trình khác không bao giờ thấy artifact dở dang"""
+        root = self._artifact_root(name)
+        created_at = time.time()
+        directory = os.path.join(root, f"{time.strftime('%Y%m%d-%H%M%S')}-{fingerprint[:12]}")
+        staging = os.path.join(root, f".tmp-{uuid.uuid4().hex}")
+
+        manifest = {
+            'format_version': ARTIFACT_FORMAT_VERSION,
+            'data_fingerprint': fingerprint,
+            'content_top_k': self.content_top_k,
+            'created_at': created_at,
+        }
+        try:
+            hybrid_recommender.save(staging, metadata={'data_fingerprint': fingerprint})
+            with open(os.path.join(staging, ARTIFACT_MANIFEST), 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=2)
+            if os.path.exists(directory):
+                shutil.rmtree(directory)
+            os.rename(staging, directory)
+        except OSError as e:
+            print(f"Không thể lưu artifact mô hình: {e}")
+            shutil.rmtree(staging, ignore_errors=True)
+            return
+
+        # Chỉ giữ lại một số artifact mới nhất
+        for old_directory, _ in self._list_artifacts(name)[self.keep_artifacts:]:
+            shutil.rmtree(old_directory, ignore_errors=True)
+
+    def apply_rating(self, customer_id, food_id, rating, previous_rating=None, name='default'):
+        """Fold-in đánh giá mới vào mô hình collaborative và chỉ mục món đã đánh giá (listener của add_rating)"""
+        # Cùng khóa với get_models/BackgroundTrainer để không fold-in song song hoặc vào bộ mô hình đang bị thay.
+        # Giữ nguyên thế hệ: bộ nhớ đệm kết quả chỉ xóa gợi ý của khách hàng này (xem RecommendationCache.on_rating)
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None:
+                version, models, watermark = entry
+                models = _copy_for_fold_in(models)
+                models['collab'].fold_in(customer_id, food_id, rating)
+                self._entries[name] = (version, models, watermark)
+
+    def clear(self):
+        """Xóa toàn bộ mô hình đã lưu"""
+        with self._lock:
+            self._entries = {}
+            self._status = {}
+
+
+def _train_artifact(artifact_dir, keep_artifacts, content_top_k, name, foods_df, ratings_df, customers_df):
+    """Chạy trong tiến trình con: huấn luyện rồi ghi artifact để tiến trình chính memory-map lại"""
+    registry = ModelRegistry(content_top_k=content_top_k, artifact_dir=artifact_dir, keep_artifacts=keep_artifacts)
+    registry.get_models(None, foods_df, ratings_df, customers_df, name=name)
+
+
+class BackgroundTrainer:
+    """
+    Luồng nền cập nhật mô hình khi phiên bản dữ liệu thay đổi, request không bao giờ phải chờ huấn luyện
+
+    Đánh giá mới được fold-in ngay trong luồng nền. Khi cần huấn luyện lại toàn bộ và registry có artifact_dir,
+    việc huấn luyện chạy trong một tiến trình con (không giữ GIL của server), tiến trình chính chỉ memory-map
+    artifact vừa ghi. Mô hình mới được hoán đổi nguyên khối vào registry.
+
+    Args:
+        registry (ModelRegistry): Kho mô hình đang phục vụ
+        load_data (callable, optional): Hàm trả về (foods_df, ratings_df, customers_df), dùng để tự kiểm tra
+            dữ liệu định kỳ
+        get_version (callable, optional): Hàm trả về phiên bản dữ liệu hiện tại (gọi sau load_data)
+        name (str): Tên nguồn dữ liệu trong registry
+        interval (float): Số giây giữa hai lần tự kiểm tra dữ liệu
+        use_process (bool): Huấn luyện lại toàn bộ trong tiến trình con (cần registry.artifact_dir)
+    """
+
+    def __init__(self, registry, load_data=None, get_version=None, name='default', interval=60, use_process=True):
+        self.registry = registry
+        self.load_data = load_data
+        self.get_version = get_version
+        self.name = name
+        self.interval = interval
+        self.use_process = use_process and bool(registry.artifact_dir)
+        self.last_error = None
+
+        self._pending = None
+        self._pending_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._executor = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Khởi động luồng nền (không làm gì nếu đang chạy)"""
+        if self.running:
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f'model-trainer-{self.name}', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Dừng luồng nền sau khi xong lượt cập nhật đang chạy"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def submit(self, version, foods_df, ratings_df, customers_df=None):
+        """Gửi dữ liệu mới nhất cho luồng nền, chỉ giữ lại bản gửi sau cùng"""
+        with self._pending_lock:
+            self._pending = (version, foods_df, ratings_df, customers_df)
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+
+            with self._pending_lock:
+                snapshot, self._pending = self._pending, None
+            try:
+                if snapshot is None:
+                    snapshot = self._poll()
+                if snapshot is not None:
+                    self.refresh(*snapshot)
+                self.last_error = None
+            except Exception as e:
+                # Giữ mô hình đang phục vụ, thử lại ở lượt sau
+                self.last_error = e
+                print(f"Lỗi khi cập nhật mô hình nền: {e}")
+
+    def _poll(self):
+        if self.load_data is None or self.get_version is None:
+            return None
+        foods_df, ratings_df, customers_df = self.load_data()
+        if foods_df.empty or ratings_df.empty:
+            return None
+        return self.get_version(), foods_df, ratings_df, customers_df
+
+    def refresh(self, version, foods_df, ratings_df, customers_df=None):
+        """Cập nhật mô hình cho phiên bản dữ liệu (chạy trong luồng nền, có thể gọi trực tiếp)"""
+        current = self.registry.current(self.name)
+        if current is not None and current[0] == version:
+            return
+
+        start = time.perf_counter()
+        needs_training = not self.registry.can_fold_in(foods_df, ratings_df, self.name)
+        if needs_training and self.use_process:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=1)
+            registry = self.registry
+            self._executor.submit(_train_artifact, registry.artifact_dir, registry.keep_artifacts,
+                                  registry.content_top_k, self.name, foods_df, ratings_df, customers_df).result()
+
+        # Fold-in, hoặc memory-map artifact vừa huấn luyện, rồi hoán đổi vào registry
+        self.registry.get_models(version, foods_df, ratings_df, customers_df, name=self.name)
+        if needs_training and self.use_process:
+            # Thời gian huấn luyện tính cả phần chạy trong tiến trình con
+            self.registry.mark_status(self.name, source='train', duration=time.perf_counter() - start)
@@ -0,0 +1,136 @@
+import copy
+import threading
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+
+
+class RatedItemsIndex:
+    """
+    Chỉ mục khách hàng -> các món đã đánh giá, dạng CSR với id được mã hóa thành số nguyên
+
+    Xây một lần cho mỗi phiên bản dữ liệu. Truy vấn theo một khách hàng chỉ tốn O(số món đã đánh giá),
+    không phải quét lại toàn bộ bảng ratings. Đánh giá mới (add_rating) được cập nhật tại chỗ.
+
+    Args:
+        ratings_df (DataFrame): Dữ liệu đánh giá (customer_id, food_id, rating)
+        foods_df (DataFrame): Danh mục món ăn, vị trí món trong chỉ mục theo thứ tự của foods_df
+    """
+
+    def __init__(self, ratings_df, foods_df):
+        self._lock = threading.Lock()
+
+        # Mã món ăn = vị trí trong foods_df (lần xuất hiện đầu tiên nếu trùng food_id)
+        food_positions = pd.Series(np.arange(len(foods_df)), index=foods_df['food_id'])
+        food_positions = food_positions[~food_positions.index.duplicated()]
+        self.food_ids = foods_df['food_id'].to_numpy()
+        self.food_codes = food_positions.to_dict()
+
+        # Mỗi cặp (khách hàng, món) chỉ giữ đánh giá đầu tiên (dữ liệu đã sắp mới nhất trước)
+        rated = ratings_df[['customer_id', 'food_id', 'rating']].drop_duplicates(['customer_id', 'food_id'])
+        rated = rated.assign(position=rated['food_id'].map(food_positions))
+
+        customer_codes, customers = pd.factorize(rated['customer_id'], sort=True)
+        self.customer_ids = customers.to_numpy()
+        self.customer_codes = {customer_id: code for code, customer_id in enumerate(self.customer_ids)}
+
+        known = rated['position'].notna().to_numpy()
+        rows = customer_codes[known]
+        order = np.lexsort((rated['position'].to_numpy()[known], rows))
+        self.indices = rated['position'].to_numpy()[known][order].astype(np.int32)
+        self.data = rated['rating'].to_numpy()[known][order].astype(np.float32)
+        self.indptr = np.zeros(len(self.customer_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(self.customer_ids)), out=self.indptr[1:])
+
+        # Đánh giá thêm sau khi xây chỉ mục: customer_id -> {vị trí món: điểm}
+        self._extra = {}
+
+    def has_ratings(self, customer_id):
+        """Khách hàng đã đánh giá ít nhất một món hay chưa"""
+        return customer_id in self.customer_codes or customer_id in self._extra
+
+    def customer_ratings(self, customer_id):
+        """
+        Lấy các món khách hàng đã đánh giá
+
+        Returns:
+            tuple: (mảng vị trí món trong foods_df, mảng điểm đánh giá)
+        """
+        code = self.customer_codes.get(customer_id)
+        if code is None:
+            positions = np.empty(0, dtype=np.int32)
+            ratings = np.empty(0, dtype=np.float32)
+        else:
+            start, end = self.indptr[code], self.indptr[code + 1]
+            positions, ratings = self.indices[start:end], self.data[start:end]
+
+        extra = self._extra.get(customer_id)
+        if extra:
+            positions = np.concatenate([positions, np.fromiter(extra.keys(), dtype=np.int32, count=len(extra))])
+            ratings = np.concatenate([ratings, np.fromiter(extra.values(), dtype=np.float32, count=len(extra))])
+        return positions, ratings
+
+    def rated_positions(self, customer_id):
+        """Vị trí (trong foods_df) các món khách hàng đã đánh giá"""
+        return self.customer_ratings(customer_id)[0]
+
+    def rated_food_ids(self, customer_id):
+        """food_id các món khách hàng đã đánh giá"""
+        return self.food_ids[self.rated_positions(customer_id)]
+
+    def get_rating(self, customer_id, food_id):
+        """Điểm khách hàng đã đánh giá món, None nếu chưa đánh giá"""
+        position = self.food_codes.get(food_id)
+        if position is None:
+            return None
+        extra = self._extra.get(customer_id)
+        if extra and position in extra:
+            return extra[position]
+        code = self.customer_codes.get(customer_id)
+        if code is None:
+            return None
+        start, end = self.indptr[code], self.indptr[code + 1]
+        row = self.indices[start:end]
+        found = np.searchsorted(row, position)
+        if found < len(row) and row[found] == position:
+            return float(self.data[start + found])
+        return None
+
+    def ratings_frame(self, customer_id):
+        """DataFrame (food_id, rating) các món khách hàng đã đánh giá"""
+        positions, ratings = self.customer_ratings(customer_id)
+        return pd.DataFrame({'food_id': self.food_ids[positions], 'rating': ratings})
+
+    def add_rating(self, customer_id, food_id, rating):
+        """Cập nhật tại chỗ khi khách hàng thêm hoặc sửa một đánh giá"""
+        position = self.food_codes.get(food_id)
+        if position is None:
+            return
+
+        with self._lock:
+            code = self.customer_codes.get(customer_id)
+            if code is not None:
+                start, end = self.indptr[code], self.indptr[code + 1]
+                row = self.indices[start:end]
+                found = np.searchsorted(row, position)
+                if found < len(row) and row[found] == position:
+                    self.data[start + found] = rating
+                    return
+
+            extra = dict(self._extra.get(customer_id, {}))
+            extra[position] = rating
+            # Gán dict mới để các luồng đọc không thấy trạng thái dở dang
+            self._extra[customer_id] = extra
+
+    def copy(self):
+        """Bản sao để cập nhật mà luồng đang đọc bản gốc không bị ảnh hưởng (dùng chung indices/indptr)"""
+        clone = copy.copy(self)
+        clone._lock = threading.Lock()
+        clone.data = self.data.copy()
+        clone._extra = dict(self._extra)
+        return clone
+
+    def to_csr(self):
+        """Ma trận thưa khách hàng × món (chỉ gồm dữ liệu lúc xây chỉ mục)"""
+        return csr_matrix((self.data, self.indices, self.indptr), shape=(len(self.customer_ids), len(self.food_ids)))
@@ -1,73 +1,381 @@
+import copy
+import io
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.feature_extraction.text import TfidfVectorizer
-from surprise import Dataset, Reader, SVD, KNNBasic
+from scipy.sparse import csr_matrix
+
+from attribute_index import get_attribute_index
+from rating_index import RatedItemsIndex
+
+
+# Bộ nhớ tối đa (byte) cho bảng tích ngoài q·qᵀ của phía cố định khi giải ALS theo khối
+ALS_GRAM_BUDGET = 256 * 1024 ** 2
+
+# Tăng khi định dạng file artifact thay đổi, artifact cũ sẽ bị bỏ qua và huấn luyện lại
+ARTIFACT_FORMAT_VERSION = 1
+METADATA_FILE = 'metadata.json'
+
+
+def _write_metadata(directory, metadata):
+    with open(os.path.join(directory, METADATA_FILE), 'w', encoding='utf-8') as f:
+        json.dump({'format_version': ARTIFACT_FORMAT_VERSION, **metadata}, f, ensure_ascii=False, indent=2)
+
+
+def _read_metadata(directory, model_type):
+    """Đọc metadata của artifact, báo lỗi nếu không đúng loại mô hình hoặc định dạng cũ"""
+    with open(os.path.join(directory, METADATA_FILE), encoding='utf-8') as f:
+        metadata = json.load(f)
+    if metadata.get('format_version') != ARTIFACT_FORMAT_VERSION or metadata.get('model') != model_type:
+        raise ValueError(f"Artifact không hợp lệ trong {directory}")
+    return metadata
+
+
+def _save_arrays(directory, **arrays):
+    """Mỗi mảng một file .npy để có thể mở bằng mmap_mode khi tải"""
+    for name, array in arrays.items():
+        np.save(os.path.join(directory, f'{name}.npy'), np.asarray(array), allow_pickle=False)
+
+
+def _load_array(directory, name, mmap_mode='r'):
+    return np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode, allow_pickle=False)
+
+
+def _select_top(scores, top_n, mask=None):
+    """Chọn vị trí top_n điểm cao nhất (bỏ điểm -inf và món bị lọc) bằng argpartition"""
+    valid = np.isfinite(scores)
+    if mask is not None:
+        valid &= mask
+    candidates = np.flatnonzero(valid)
+
+    k = min(top_n, len(candidates))
+    if k <= 0:
+        return np.array([], dtype=np.int64)
+    # Chỉ sắp xếp phần nhỏ đã chọn, hòa điểm thì theo thứ tự trong danh mục
+    top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+    return top[np.lexsort((top, -scores[top]))]
+
 
 class ContentBasedRecommender:
-    def __init__(self):
-        self.tfidf = None
+    def __init__(self, top_k=None, block_size=1024):
+        """
+        Args:
+            top_k (int, optional): Số món láng giềng giữ lại cho mỗi món. Nếu None, giữ toàn bộ
+                ma trận cosine N×N (chỉ phù hợp với danh mục nhỏ)
+            block_size (int): Số dòng tính độ tương tự mỗi lần khi xây bảng top-K
+        """
+        self.top_k = top_k
+        self.block_size = block_size
+        self._tfidf = None
+        # Vectorizer đã lưu (joblib) của mô hình tải từ artifact, chỉ giải nén khi truy vấn theo đặc điểm
+        self._tfidf_bytes = None
+        self.tfidf_matrix = None
         self.cosine_sim = None
+        self.neighbor_indices = None
+        self.neighbor_scores = None
         self.foods = None
         self.indices = None
+        self.attribute_index = None
+
+    @property
+    def tfidf(self):
+        """TfidfVectorizer của mô hình, mô hình tải từ artifact chỉ nạp sklearn khi cần tới"""
+        if self._tfidf is None and self._tfidf_bytes is not None:
+            import joblib
+            self._tfidf = joblib.load(io.BytesIO(self._tfidf_bytes))
+            self._tfidf_bytes = None
+        return self._tfidf
+
+    @tfidf.setter
+    def tfidf(self, vectorizer):
+        self._tfidf = vectorizer
+        self._tfidf_bytes = None
+
+    def fit(self, foods_df, attribute_index=None):
+        """
+        Args:
+            foods_df (DataFrame): Danh mục món ăn
+            attribute_index (CatalogAttributeIndex, optional): Chỉ mục thuộc tính dùng cho bộ lọc,
+                mặc định lấy theo danh mục món
+        """
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.preprocessing import normalize
 
-    def fit(self, foods_df):
         self.foods = foods_df
+        self.attribute_index = attribute_index if attribute_index is not None else get_attribute_index(foods_df)
         # Tạo ma trận TF-IDF từ đặc điểm món ăn
         self.tfidf = TfidfVectorizer(stop_words='english')
         tfidf_matrix = self.tfidf.fit_transform(foods_df['features'])
 
-        # Tính độ tương tự cosine
-        self.cosine_sim = cosine_similarity(tfidf_matrix, tfidf_matrix)
+        # Giữ ma trận danh mục (đã chuẩn hóa L2) để truy vấn theo đặc điểm chỉ cần một phép nhân thưa
+        self.tfidf_matrix = normalize(tfidf_matrix, norm='l2', copy=False).tocsr()
+
+        if self.top_k is None:
+            # Tính độ tương tự cosine
+            from sklearn.metrics.pairwise import cosine_similarity
+            self.cosine_sim = cosine_similarity(tfidf_matrix, tfidf_matrix)
+        else:
+            # Chỉ giữ top-K láng giềng cho mỗi món, tính theo từng khối dòng
+            self.cosine_sim = None
+            self.neighbor_indices, self.neighbor_scores = self._build_neighbor_table(tfidf_matrix)
 
         # Tạo mapping từ food_id sang vị trí trong ma trận
         self.indices = pd.Series(foods_df.index, index=foods_df['food_id']).drop_duplicates()
 
-    def recommend(self, food_id, top_n=10):
+    def _build_neighbor_table(self, tfidf_matrix):
+        """
+        Xây bảng top-K láng giềng (chỉ số int32, điểm float32) cho mọi món
+
+        Các vector TF-IDF đã được chuẩn hóa L2 nên tích vô hướng chính là độ tương tự cosine.
+        Mỗi lần chỉ tạo một khối block_size × N nên bộ nhớ đỉnh không phụ thuộc N².
+        """
+        tfidf_matrix = tfidf_matrix.tocsr().astype(np.float32)
+        n_items = tfidf_matrix.shape[0]
+        k = min(self.top_k, max(n_items - 1, 0))
+
+        neighbor_indices = np.empty((n_items, k), dtype=np.int32)
+        neighbor_scores = np.empty((n_items, k), dtype=np.float32)
+        if k == 0:
+            return neighbor_indices, neighbor_scores
+
+        matrix_t = tfidf_matrix.T.tocsc()
+        for start in range(0, n_items, self.block_size):
+            end = min(start + self.block_size, n_items)
+            block = (tfidf_matrix[start:end] @ matrix_t).toarray()
+
+            # Loại bỏ chính món đó khỏi danh sách láng giềng
+            rows = np.arange(end - start)
+            block[rows, rows + start] = -np.inf
+
+            top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(block, top, axis=1)
+            order = np.argsort(-top_scores, axis=1, kind='stable')
+
+            neighbor_indices[start:end] = np.take_along_axis(top, order, axis=1)
+            neighbor_scores[start:end] = np.take_along_axis(top_scores, order, axis=1)
+
+        return neighbor_indices, neighbor_scores
+
+    def save(self, directory, metadata=None):
+        """
+        Lưu mô hình đã huấn luyện vào thư mục: vectorizer (joblib), ma trận TF-IDF và bảng độ tương tự (.npy)
+
+        Args:
+            directory (str): Thư mục lưu artifact
+            metadata (dict, optional): Thông tin thêm ghi vào metadata (ví dụ phiên bản dữ liệu)
+        """
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, 'tfidf_vectorizer.joblib')
+        if self._tfidf_bytes is not None:
+            # Vectorizer chưa được giải nén: ghi lại nguyên bản đã lưu
+            with open(path, 'wb') as f:
+                f.write(self._tfidf_bytes)
+        else:
+            import joblib
+            joblib.dump(self.tfidf, path)
+
+        matrix = self.tfidf_matrix
+        _save_arrays(directory, tfidf_data=matrix.data, tfidf_indices=matrix.indices, tfidf_indptr=matrix.indptr)
+        if self.cosine_sim is not None:
+            _save_arrays(directory, cosine_sim=self.cosine_sim)
+        else:
+            _save_arrays(directory, neighbor_indices=self.neighbor_indices, neighbor_scores=self.neighbor_scores)
+
+        _write_metadata(directory, {
+            'model': 'content',
+            'top_k': self.top_k,
+            'block_size': self.block_size,
+            'n_items': int(matrix.shape[0]),
+            'n_features': int(matrix.shape[1]),
+            **(metadata or {}),
+        })
+
+    @classmethod
+    def load(cls, directory, foods_df, attribute_index=None, mmap_mode='r'):
+        """
+        Tải mô hình đã lưu bằng save(), các mảng lớn được memory-map thay vì đọc toàn bộ vào RAM
+
+        Args:
+            directory (str): Thư mục artifact
+            foods_df (DataFrame): Danh mục món ăn lúc huấn luyện (cùng thứ tự)
+            attribute_index (CatalogAttributeIndex, optional): Chỉ mục thuộc tính dùng cho bộ lọc
+            mmap_mode (str, optional): Chế độ mở file .npy, None để đọc hẳn vào bộ nhớ
+
+        Returns:
+            ContentBasedRecommender: Mô hình đã tải
+        """
+        metadata = _read_metadata(directory, 'content')
+        if metadata['n_items'] != len(foods_df):
+            raise ValueError(f"Artifact trong {directory} không khớp với danh mục món ăn hiện tại")
+
+        model = cls(top_k=metadata['top_k'], block_size=metadata['block_size'])
+        model.foods = foods_df
+        model.attribute_index = attribute_index if attribute_index is not None else get_attribute_index(foods_df)
+        # Đọc sẵn vectorizer vào bộ nhớ (artifact có thể bị dọn sau khi tải) nhưng chưa giải nén
+        with open(os.path.join(directory, 'tfidf_vectorizer.joblib'), 'rb') as f:
+            model._tfidf_bytes = f.read()
+        model.tfidf_matrix = csr_matrix(
+            (_load_array(directory, 'tfidf_data', mmap_mode),
+             _load_array(directory, 'tfidf_indices', mmap_mode),
+             _load_array(directory, 'tfidf_indptr', mmap_mode)),
+            shape=(metadata['n_items'], metadata['n_features']), copy=False)
+
+        if model.top_k is None:
+            model.cosine_sim = _load_array(directory, 'cosine_sim', mmap_mode)
+        else:
+            model.neighbor_indices = _load_array(directory, 'neighbor_indices', mmap_mode)
+            model.neighbor_scores = _load_array(directory, 'neighbor_scores', mmap_mode)
+
+        model.indices = pd.Series(foods_df.index, index=foods_df['food_id']).drop_duplicates()
+        return model
+
+    def recommend(self, food_id, top_n=10, filters=None):
+        """
+        Args:
+            food_id: Món ăn gốc
+            top_n (int): Số món cần gợi ý
+            filters (dict, optional): Bộ lọc món ăn, xem CatalogAttributeIndex.filter_mask
+        """
         if food_id not in self.indices:
             return pd.DataFrame()
 
         idx = self.indices[food_id]
-        sim_scores = list(enumerate(self.cosine_sim[idx]))
-        sim_scores = sorted(sim_scores, key=lambda x: x[1], reverse=True)
-        sim_scores = sim_scores[1:top_n + 1]  # bỏ chính nó, lấy top_n
-        food_indices = [i[0] for i in sim_scores]
+        mask = self.attribute_index.filter_mask(filters)
+        if mask is not None:
+            # Có bộ lọc: chấm điểm cả dòng để luôn đủ top_n món thỏa điều kiện
+            if self.cosine_sim is None:
+                scores = (self.tfidf_matrix @ self.tfidf_matrix[idx].T).toarray().ravel()
+            else:
+                scores = self.cosine_sim[idx].astype(float)
+            scores[idx] = -np.inf
+            top = _select_top(scores, top_n, mask)
+            food_indices = top.tolist()
+            scores = scores[top].tolist()
+        elif self.cosine_sim is None:
+            # Phục vụ từ bảng top-K láng giềng
+            food_indices = self.neighbor_indices[idx, :top_n].tolist()
+            scores = self.neighbor_scores[idx, :top_n].astype(float).tolist()
+        else:
+            sim_scores = list(enumerate(self.cosine_sim[idx]))
+            sim_scores = sorted(sim_scores, key=lambda x: x[1], reverse=True)
+            sim_scores = sim_scores[1:top_n + 1]  # bỏ chính nó, lấy top_n
+            food_indices = [i[0] for i in sim_scores]
+            scores = [i[1] for i in sim_scores]
 
         result = self.foods.iloc[food_indices].copy()
         # Thêm điểm tương tự vào kết quả
-        result['similarity_score'] = [i[1] for i in sim_scores]
+        result['similarity_score'] = scores
         return result
 
-    def get_similar_by_features(self, features, top_n=10):
-        # Chuyển đổi đặc điểm thành vector TF-IDF
+    def get_similar_by_features(self, features, top_n=10, filters=None):
+        # Chuyển đổi đặc điểm thành vector TF-IDF (đã chuẩn hóa L2)
         features_vec = self.tfidf.transform([features])
 
-        # Tính độ tương tự với tất cả món ăn
-        sim_scores = cosine_similarity(features_vec, self.tfidf.transform(self.foods['features']))
-        sim_scores = sim_scores.flatten()
+        # Độ tương tự cosine với toàn bộ danh mục: một phép nhân ma trận thưa
+        sim_scores = (self.tfidf_matrix @ features_vec.T).toarray().ravel()
 
-        # Tạo DataFrame với điểm tương tự
-        result_df = self.foods.copy()
-        result_df['similarity_score'] = sim_scores
+        # Chọn top_n trong các món thỏa bộ lọc, chỉ tạo DataFrame cho các món được chọn
+        top = _select_top(sim_scores, top_n, self.attribute_index.filter_mask(filters))
 
-        # Sắp xếp và trả về top_n
-        return result_df.sort_values('similarity_score', ascending=False).head(top_n)
+        result_df = self.foods.iloc[top].copy()
+        result_df['similarity_score'] = sim_scores[top]
+        return result_df
 
 
 class CollaborativeRecommender:
-    def __init__(self, algorithm='svd'):
+    def __init__(self, algorithm='svd', fold_in_reg=5.0, retrain_threshold=500, top_k=40, similarity='cosine',
+                 block_size=1024, n_factors=20, n_epochs=8, reg=0.2, n_jobs=None):
+        """
+        Args:
+            algorithm (str): Thuật toán ('svd', 'als', 'knn' hoặc 'item_knn')
+            fold_in_reg (float): Hệ số chuẩn hóa khi giải lại vector khách hàng/món trong fold_in
+            retrain_threshold (int): Số lần fold-in tối đa trước khi cần huấn luyện lại toàn bộ
+            top_k (int): Số món láng giềng giữ lại cho mỗi món (item_knn)
+            similarity (str): Độ tương tự giữa các món, 'cosine' hoặc 'pearson' (item_knn)
+            block_size (int): Số dòng xử lý mỗi lần khi xây bảng láng giềng (item_knn) hoặc giải ALS (als)
+            n_factors (int): Số nhân tố ẩn (als)
+            n_epochs (int): Số vòng lặp giải luân phiên khách hàng/món (als)
+            reg (float): Hệ số chuẩn hóa L2 cho nhân tố và bias (als)
+            n_jobs (int, optional): Số luồng giải ALS song song, mặc định theo số CPU (als)
+        """
         self.algorithm = algorithm
+        self.fold_in_reg = fold_in_reg
+        self.retrain_threshold = retrain_threshold
+        self.top_k = top_k
+        self.similarity = similarity
+        self.block_size = block_size
+        self.n_factors = n_factors
+        self.n_epochs = n_epochs
+        self.reg = reg
+        self.n_jobs = n_jobs
         self.model = None
         self.foods = None
         self.ratings = None
-        self.reader = Reader(rating_scale=(1, 5))
+        self.rating_scale = (1, 5)
 
-    def fit(self, ratings_df, foods_df):
+        # Các mảng nhân tố dùng cho đường chấm điểm vector hóa (chỉ có với SVD)
+        self.user_factors = None
+        self.item_factors = None
+        self.user_bias = None
+        self.item_bias = None
+        self.global_mean = None
+        self.biased = True
+        self.user_ids = None
+        self.item_ids = None
+        self.user_codes = None
+        self.item_codes = None
+        self.rated_index = None
+        self.attribute_index = None
+
+        # Bảng top-K món láng giềng (chỉ có với item_knn): chỉ số int32, độ tương tự float32
+        self.neighbor_indices = None
+        self.neighbor_scores = None
+        self.item_means = None
+        self.similarity_matrix = None
+
+        # Nhân tố được giải lại sau khi huấn luyện (fold-in), ưu tiên hơn mảng nhân tố gốc:
+        # customer_id -> (vector, bias) và vị trí món -> (vector, bias)
+        self._folded_users = {}
+        self._folded_items = {}
+        # Vị trí món chưa có nhân tố -> {customer_id: điểm}, dùng để fold-in món mới
+        self._new_item_ratings = {}
+        self.updates_since_fit = 0
+
+    def fit(self, ratings_df, foods_df, rated_index=None, attribute_index=None):
+        """
+        Args:
+            ratings_df (DataFrame): Dữ liệu đánh giá
+            foods_df (DataFrame): Danh mục món ăn
+            rated_index (RatedItemsIndex, optional): Chỉ mục món đã đánh giá dùng chung,
+                tự xây nếu không truyền vào
+            attribute_index (CatalogAttributeIndex, optional): Chỉ mục thuộc tính dùng cho bộ lọc,
+                mặc định lấy theo danh mục món
+        """
         self.ratings = ratings_df
         self.foods = foods_df
+        self.rated_index = rated_index if rated_index is not None else RatedItemsIndex(ratings_df, foods_df)
+        self.attribute_index = attribute_index if attribute_index is not None else get_attribute_index(foods_df)
+
+        if self.algorithm == 'item_knn':
+            # Không dùng surprise: KNNBasic tính ma trận dày n_users × n_users
+            self.model = None
+            self._fit_item_knn()
+            self._reset_fold_in()
+            return
+        if self.algorithm == 'als':
+            self.model = None
+            self._fit_als(ratings_df)
+            self._reset_fold_in()
+            return
+
+        from surprise import Dataset, Reader, SVD, KNNBasic
 
         # Chuyển ratings thành dạng surprise có thể sử dụng
-        data = Dataset.load_from_df(ratings_df[['customer_id', 'food_id', 'rating']], self.reader)
+        data = Dataset.load_from_df(ratings_df[['customer_id', 'food_id', 'rating']],
+                                    Reader(rating_scale=self.rating_scale))
         trainset = data.build_full_trainset()
 
         # Chọn và huấn luyện mô hình
@@ -79,14 +387,511 @@ class CollaborativeRecommender:
             self.model = SVD()  # default
 
         self.model.fit(trainset)
+        self._build_scoring_index()
+        self._reset_fold_in()
+
+    def _fit_als(self, ratings_df):
+        """
+        Phân rã ma trận có bias bằng bình phương tối thiểu luân phiên (ALS) trên ma trận đánh giá thưa
+
+        Mỗi nửa bước giữ cố định một phía và giải (vector, bias) cho mọi dòng của phía còn lại. Các khối dòng
+        được giải song song trên thread pool (BLAS/LAPACK nhả GIL). Kết quả có cùng bố cục với các mảng nhân
+        tố trích từ SVD nên dùng chung đường chấm điểm vector hóa, fold_in, save/load.
+        """
+        # Mỗi cặp (khách hàng, món) chỉ giữ đánh giá mới nhất
+        rated = ratings_df[['customer_id', 'food_id', 'rating']].drop_duplicates(['customer_id', 'food_id'])
+        user_codes, user_ids = pd.factorize(rated['customer_id'])
+        item_codes, item_ids = pd.factorize(rated['food_id'])
+        values = rated['rating'].to_numpy(dtype=np.float64)
+        by_user = csr_matrix((values, (user_codes, item_codes)), shape=(len(user_ids), len(item_ids)))
+        by_item = by_user.T.tocsr()
+
+        self.global_mean = float(values.mean())
+        self.biased = True
+        rng = np.random.default_rng(0)
+        # Khởi tạo như surprise.SVD (phân phối chuẩn, độ lệch 0.1)
+        self.user_factors = rng.normal(0, 0.1, (len(user_ids), self.n_factors))
+        self.item_factors = rng.normal(0, 0.1, (len(item_ids), self.n_factors))
+        self.user_bias = np.zeros(len(user_ids))
+        self.item_bias = np.zeros(len(item_ids))
+
+        with ThreadPoolExecutor(max_workers=self.n_jobs) as executor:
+            for _ in range(self.n_epochs):
+                self.user_factors, self.user_bias = self._als_half_step(by_user, self.item_factors,
+                                                                        self.item_bias, executor)
+                self.item_factors, self.item_bias = self._als_half_step(by_item, self.user_factors,
+                                                                        self.user_bias, executor)
+
+        self.user_ids = np.asarray(user_ids)
+        self.item_ids = np.asarray(item_ids)
+        self._build_code_maps()
+
+    def _als_half_step(self, ratings, fixed_factors, fixed_bias, executor):
+        """
+        Giải (vector, bias) cho từng dòng của ratings khi nhân tố và bias của phía cột được giữ cố định
+
+        Args:
+            ratings (csr_matrix): Ma trận đánh giá, dòng là phía cần giải
+            fixed_factors (ndarray): Nhân tố của phía cột
+            fixed_bias (ndarray): Bias của phía cột
+            executor (ThreadPoolExecutor): Thread pool giải các khối dòng
+
+        Returns:
+            tuple: (nhân tố, bias) mới của phía dòng
+        """
+        n_rows, n_cols = ratings.shape
+        # Cột cuối bằng 1 ứng với bias của phía đang giải
+        design = np.hstack([fixed_factors, np.ones((n_cols, 1))])
+        dim = design.shape[1]
+        identity = np.eye(dim)
+        # Chuẩn hóa tỉ lệ với số đánh giá của dòng (ALS-WR) nên một giá trị reg hợp với mọi mật độ dữ liệu
+        counts = np.diff(ratings.indptr)
+        residuals = csr_matrix((ratings.data - self.global_mean - fixed_bias[ratings.indices],
+                                ratings.indices, ratings.indptr), shape=ratings.shape)
+        solution = np.empty((n_rows, dim))
+
+        if n_cols * dim * dim * 8 <= ALS_GRAM_BUDGET:
+            # Phía cố định nhỏ (thường là món): Σ q·qᵀ của mỗi dòng là một phép nhân thưa với bảng tích ngoài.
+            # Ma trận Gram đối xứng nên chỉ cần nửa trên
+            upper_rows, upper_cols = np.triu_indices(dim)
+            outer = design[:, upper_rows] * design[:, upper_cols]
+            # Vị trí của từng phần tử (i, j) của ma trận Gram trong nửa trên
+            symmetric = np.zeros((dim, dim), dtype=np.intp)
+            symmetric[upper_rows, upper_cols] = symmetric[upper_cols, upper_rows] = np.arange(len(upper_rows))
+            indicator = csr_matrix((np.ones_like(ratings.data), ratings.indices, ratings.indptr),
+                                   shape=ratings.shape)
+
+            def solve_block(start, end):
+                upper = indicator[start:end] @ outer
+                grams = np.take(upper, symmetric.ravel(), axis=1).reshape(end - start, dim, dim)
+                grams += self.reg * counts[start:end, None, None] * identity
+                rhs = residuals[start:end] @ design
+                solution[start:end] = np.linalg.solve(grams, rhs[:, :, None])[:, :, 0]
+        else:
+            # Phía cố định lớn (thường là khách hàng): mỗi dòng có nhiều đánh giá nên giải riêng từng dòng
+            def solve_block(start, end):
+                for row in range(start, end):
+                    begin, stop = residuals.indptr[row], residuals.indptr[row + 1]
+                    rows = design[residuals.indices[begin:stop]]
+                    solution[row] = np.linalg.solve(rows.T @ rows + self.reg * counts[row] * identity,
+                                                    rows.T @ residuals.data[begin:stop])
+
+        blocks = range(0, n_rows, self.block_size)
+        list(executor.map(lambda start: solve_block(start, min(start + self.block_size, n_rows)), blocks))
+        return solution[:, :-1], solution[:, -1]
+
+    def _fit_item_knn(self):
+        """Xây bảng top-K láng giềng món-món từ ma trận thưa khách hàng × món"""
+        ratings = self.rated_index.to_csr().astype(np.float64)
+        n_items = ratings.shape[1]
+        self.global_mean = float(ratings.data.mean()) if ratings.nnz else float(np.mean(self.rating_scale))
+
+        # Điểm trung bình của từng món, món chưa có đánh giá lấy trung bình chung
+        counts = np.bincount(ratings.indices, minlength=n_items)
+        sums = np.bincount(ratings.indices, weights=ratings.data, minlength=n_items)
+        self.item_means = np.where(counts > 0, sums / np.maximum(counts, 1), self.global_mean)
+
+        if self.similarity == 'pearson':
+            # Trừ trung bình của món để độ tương tự cosine trở thành tương quan Pearson
+            ratings.data -= self.item_means[ratings.indices]
+        self.neighbor_indices, self.neighbor_scores = self._build_item_neighbors(ratings.tocsc())
+        self._build_similarity_matrix()
+
+    def _build_item_neighbors(self, ratings):
+        """
+        Tính độ tương tự cosine giữa các món theo từng khối cột, chỉ giữ top-K láng giềng dương
+
+        Mỗi lần chỉ tạo một khối block_size × số món nên bộ nhớ tỉ lệ với số món × K,
+        không phụ thuộc số khách hàng.
+        """
+        n_items = ratings.shape[1]
+        k = min(self.top_k, max(n_items - 1, 0))
+        neighbor_indices = np.zeros((n_items, k), dtype=np.int32)
+        neighbor_scores = np.zeros((n_items, k), dtype=np.float32)
+        if k == 0:
+            return neighbor_indices, neighbor_scores
+
+        norms = np.sqrt(np.asarray(ratings.multiply(ratings).sum(axis=0)).ravel())
+        inverse_norms = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0).astype(np.float32)
+        ratings = ratings.astype(np.float32)
+        ratings_t = ratings.T.tocsr()
+
+        for start in range(0, n_items, self.block_size):
+            end = min(start + self.block_size, n_items)
+            block = (ratings_t[start:end] @ ratings).toarray()
+            block *= inverse_norms[start:end, None]
+            block *= inverse_norms[None, :]
+
+            # Loại bỏ chính món đó khỏi danh sách láng giềng
+            rows = np.arange(end - start)
+            block[rows, rows + start] = -np.inf
 
-    def recommend_for_customer(self, customer_id, top_n=10):
-        if customer_id not in self.ratings['customer_id'].unique():
+            top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(block, top, axis=1)
+            order = np.argsort(-top_scores, axis=1, kind='stable')
+
+            neighbor_indices[start:end] = np.take_along_axis(top, order, axis=1)
+            # Láng giềng không tương đồng (điểm <= 0) không được dùng khi chấm điểm
+            neighbor_scores[start:end] = np.maximum(np.take_along_axis(top_scores, order, axis=1), 0.0)
+
+        return neighbor_indices, neighbor_scores
+
+    def _build_similarity_matrix(self):
+        """Ma trận thưa món × món từ bảng láng giềng, dòng j chứa độ tương tự của j với các láng giềng"""
+        n_items = self.neighbor_indices.shape[0]
+        # Bỏ láng giềng có độ tương tự 0 (bảng có thể được memory-map chỉ đọc nên không sửa tại chỗ)
+        keep = np.asarray(self.neighbor_scores) > 0
+        indptr = np.zeros(n_items + 1, dtype=np.int64)
+        np.cumsum(keep.sum(axis=1), out=indptr[1:])
+        self.similarity_matrix = csr_matrix(
+            (np.asarray(self.neighbor_scores)[keep], np.asarray(self.neighbor_indices)[keep], indptr),
+            shape=(n_items, n_items))
+
+    def _score_item_knn(self, customer_id):
+        """
+        Dự đoán điểm mọi món bằng trung bình có trọng số độ tương tự trên các món khách hàng đã đánh giá
+
+        Điểm đánh giá và chỉ báo món đã đánh giá được xếp thành ma trận hai cột nên cả tử số và mẫu số
+        chỉ cần một phép nhân ma trận thưa.
+        """
+        positions, ratings = self.rated_index.customer_ratings(customer_id)
+        n_items = self.similarity_matrix.shape[0]
+        ratings = ratings.astype(np.float64)
+        if self.similarity == 'pearson':
+            ratings = ratings - self.item_means[positions]
+
+        profile = csr_matrix(
+            (np.concatenate([ratings, np.ones(len(positions))]),
+             (np.concatenate([positions, positions]), np.repeat([0, 1], len(positions)))),
+            shape=(n_items, 2))
+        weighted = (self.similarity_matrix @ profile).toarray()
+        numerator, denominator = weighted[:, 0], weighted[:, 1]
+
+        # Món không có láng giềng nào được đánh giá: dùng điểm trung bình (như surprise khi không dự đoán được)
+        has_neighbors = denominator > 0
+        if self.similarity == 'pearson':
+            scores = self.item_means.copy()
+            scores[has_neighbors] += numerator[has_neighbors] / denominator[has_neighbors]
+        else:
+            scores = np.full(n_items, self.global_mean)
+            scores[has_neighbors] = numerator[has_neighbors] / denominator[has_neighbors]
+
+        lower_bound, higher_bound = self.rating_scale
+        return np.clip(scores, lower_bound, higher_bound)
+
+    def _reset_fold_in(self):
+        self._folded_users = {}
+        self._folded_items = {}
+        self._new_item_ratings = {}
+        self.updates_since_fit = 0
+
+    @property
+    def supports_fold_in(self):
+        """Có thể cập nhật mô hình theo từng đánh giá mới (SVD hoặc item_knn) hay không"""
+        return self.item_factors is not None or self.neighbor_indices is not None
+
+    @property
+    def needs_retrain(self):
+        """Đã fold-in quá nhiều đánh giá, nên huấn luyện lại toàn bộ để tránh sai lệch tích lũy"""
+        return self.updates_since_fit >= self.retrain_threshold
+
+    def copy_for_fold_in(self):
+        """
+        Bản sao để fold-in rồi hoán đổi vào thay bản gốc đang phục vụ
+
+        Các mảng đã huấn luyện được dùng chung (fold_in không sửa chúng), chỉ sao chép chỉ mục món đã đánh giá
+        và các nhân tố đã fold-in.
+        """
+        clone = copy.copy(self)
+        clone.rated_index = self.rated_index.copy()
+        clone._folded_users = dict(self._folded_users)
+        clone._folded_items = dict(self._folded_items)
+        clone._new_item_ratings = dict(self._new_item_ratings)
+        return clone
+
+    def fold_in(self, customer_id, food_id, rating):
+        """
+        Cập nhật mô hình ngay khi có đánh giá mới, không cần huấn luyện lại
+
+        Giữ nguyên nhân tố của các món, giải lại vector và bias của khách hàng bằng bình phương tối thiểu
+        có chuẩn hóa trên toàn bộ đánh giá của họ. Khách hàng mới được thêm theo cùng cách; món chưa có
+        trong tập huấn luyện được giải ngược lại từ vector của những khách hàng đã đánh giá nó.
+
+        Args:
+            customer_id: Khách hàng
+            food_id: Món ăn được đánh giá
+            rating (float): Điểm đánh giá
+
+        Returns:
+            bool: True nếu nhân tố được cập nhật (False với thuật toán không có nhân tố hoặc món lạ)
+        """
+        self.rated_index.add_rating(customer_id, food_id, rating)
+        position = self.rated_index.food_codes.get(food_id)
+        if not self.supports_fold_in or position is None:
+            return False
+        if self.neighbor_indices is not None:
+            # item_knn chấm điểm trực tiếp từ các đánh giá trong rated_index nên đã được cập nhật
+            self.updates_since_fit += 1
+            return True
+
+        self._fold_in_user(customer_id)
+        if self.item_codes[position] < 0:
+            ratings = dict(self._new_item_ratings.get(position, {}))
+            ratings[customer_id] = rating
+            self._new_item_ratings[position] = ratings
+            self._fold_in_item(position)
+
+        self.updates_since_fit += 1
+        return True
+
+    def _solve(self, factors, biases, ratings):
+        """Giải bình phương tối thiểu có chuẩn hóa cho (vector, bias) khi phía còn lại được giữ cố định"""
+        if self.biased:
+            design = np.hstack([factors, np.ones((len(ratings), 1))])
+            target = ratings - self.global_mean - biases
+        else:
+            design = factors
+            target = ratings
+
+        gram = design.T @ design + self.fold_in_reg * np.eye(design.shape[1])
+        solution = np.linalg.solve(gram, design.T @ target)
+        if self.biased:
+            return solution[:-1], float(solution[-1])
+        return solution, 0.0
+
+    def _fold_in_user(self, customer_id):
+        positions, ratings = self.rated_index.customer_ratings(customer_id)
+        item_factors, item_bias, has_factors = self._item_vectors(positions)
+        vector, bias = self._solve(item_factors[has_factors], item_bias[has_factors],
+                                   ratings[has_factors].astype(np.float64))
+        # Gán tuple mới để các luồng đang gợi ý không thấy trạng thái dở dang
+        self._folded_users[customer_id] = (vector, bias)
+
+    def _fold_in_item(self, position):
+        vectors, biases, ratings = [], [], []
+        for customer_id, rating in self._new_item_ratings[position].items():
+            user = self._user_vector(customer_id)
+            if user is not None:
+                vectors.append(user[0])
+                biases.append(user[1])
+                ratings.append(rating)
+        if not ratings:
+            return
+
+        self._folded_items[position] = self._solve(np.array(vectors), np.array(biases),
+                                                   np.array(ratings, dtype=np.float64))
+
+    def _user_vector(self, customer_id):
+        """(vector, bias) hiện tại của khách hàng, None nếu chưa có"""
+        folded = self._folded_users.get(customer_id)
+        if folded is not None:
+            return folded
+        user = self.user_codes.get(customer_id)
+        if user is None:
+            return None
+        return self.user_factors[user], self.user_bias[user]
+
+    def _item_vectors(self, positions):
+        """Nhân tố và bias của các món theo vị trí, kèm mặt nạ món đã có nhân tố"""
+        codes = self.item_codes[positions]
+        has_factors = codes >= 0
+        factors = np.zeros((len(positions), self.item_factors.shape[1]))
+        biases = np.zeros(len(positions))
+        factors[has_factors] = self.item_factors[codes[has_factors]]
+        biases[has_factors] = self.item_bias[codes[has_factors]]
+
+        for i in np.flatnonzero(~has_factors):
+            folded = self._folded_items.get(int(positions[i]))
+            if folded is not None:
+                factors[i], biases[i] = folded
+                has_factors[i] = True
+        return factors, biases, has_factors
+
+    def _build_scoring_index(self):
+        """Trích xuất nhân tố đã huấn luyện ra mảng NumPy"""
+        if self.model is None:
+            return
+        from surprise import SVD
+        if not isinstance(self.model, SVD):
+            return
+
+        trainset = self.model.trainset
+        self.user_factors = np.asarray(self.model.pu, dtype=np.float64)
+        self.item_factors = np.asarray(self.model.qi, dtype=np.float64)
+        self.user_bias = np.asarray(self.model.bu, dtype=np.float64)
+        self.item_bias = np.asarray(self.model.bi, dtype=np.float64)
+        self.global_mean = trainset.global_mean
+        self.biased = self.model.biased
+
+        # Mapping raw id -> inner id; món không có trong tập huấn luyện mang mã -1
+        self.user_ids = np.array([trainset.to_raw_uid(inner) for inner in trainset.all_users()])
+        self.item_ids = np.array([trainset.to_raw_iid(inner) for inner in trainset.all_items()])
+        self._build_code_maps()
+
+    def _build_code_maps(self):
+        self.user_codes = {user_id: inner for inner, user_id in enumerate(self.user_ids.tolist())}
+        item_inner = {food_id: inner for inner, food_id in enumerate(self.item_ids.tolist())}
+        self.item_codes = np.array([item_inner.get(food_id, -1) for food_id in self.foods['food_id']],
+                                   dtype=np.int64)
+
+    def save(self, directory, metadata=None):
+        """
+        Lưu mô hình đã huấn luyện vào thư mục: các mảng nhân tố (.npy) và metadata
+
+        Thuật toán không có nhân tố (KNN) được lưu nguyên đối tượng bằng joblib.
+
+        Args:
+            directory (str): Thư mục lưu artifact
+            metadata (dict, optional): Thông tin thêm ghi vào metadata (ví dụ phiên bản dữ liệu)
+        """
+        os.makedirs(directory, exist_ok=True)
+        has_factors = self.item_factors is not None
+        has_neighbors = self.neighbor_indices is not None
+        if has_factors:
+            _save_arrays(directory, user_factors=self.user_factors, item_factors=self.item_factors,
+                         user_bias=self.user_bias, item_bias=self.item_bias,
+                         user_ids=self.user_ids, item_ids=self.item_ids)
+        elif has_neighbors:
+            _save_arrays(directory, neighbor_indices=self.neighbor_indices, neighbor_scores=self.neighbor_scores,
+                         item_means=self.item_means)
+        else:
+            import joblib
+            joblib.dump(self.model, os.path.join(directory, 'model.joblib'))
+
+        _write_metadata(directory, {
+            'model': 'collab',
+            'algorithm': self.algorithm,
+            'fold_in_reg': self.fold_in_reg,
+            'retrain_threshold': self.retrain_threshold,
+            'top_k': self.top_k,
+            'similarity': self.similarity,
+            'block_size': self.block_size,
+            'n_factors': self.n_factors,
+            'n_epochs': self.n_epochs,
+            'reg': self.reg,
+            'has_factors': has_factors,
+            'has_neighbors': has_neighbors,
+            'global_mean': float(self.global_mean) if has_factors or has_neighbors else None,
+            'biased': bool(self.biased),
+            'rating_scale': list(self.rating_scale),
+            **(metadata or {}),
+        })
+
+    @classmethod
+    def load(cls, directory, ratings_df, foods_df, rated_index=None, attribute_index=None, mmap_mode='r'):
+        """
+        Tải mô hình đã lưu bằng save(), các mảng nhân tố được memory-map thay vì đọc toàn bộ vào RAM
+
+        Args:
+            directory (str): Thư mục artifact
+            ratings_df (DataFrame): Dữ liệu đánh giá lúc huấn luyện
+            foods_df (DataFrame): Danh mục món ăn
+            rated_index (RatedItemsIndex, optional): Chỉ mục món đã đánh giá dùng chung
+            attribute_index (CatalogAttributeIndex, optional): Chỉ mục thuộc tính dùng cho bộ lọc
+            mmap_mode (str, optional): Chế độ mở file .npy, None để đọc hẳn vào bộ nhớ
+
+        Returns:
+            CollaborativeRecommender: Mô hình đã tải
+        """
+        metadata = _read_metadata(directory, 'collab')
+
+        model = cls(algorithm=metadata['algorithm'], fold_in_reg=metadata['fold_in_reg'],
+                    retrain_threshold=metadata['retrain_threshold'], top_k=metadata.get('top_k', 40),
+                    similarity=metadata.get('similarity', 'cosine'), block_size=metadata.get('block_size', 1024),
+                    n_factors=metadata.get('n_factors', 20), n_epochs=metadata.get('n_epochs', 8),
+                    reg=metadata.get('reg', 0.2))
+        model.rating_scale = tuple(metadata['rating_scale'])
+        model.ratings = ratings_df
+        model.foods = foods_df
+        model.rated_index = rated_index if rated_index is not None else RatedItemsIndex(ratings_df, foods_df)
+        model.attribute_index = attribute_index if attribute_index is not None else get_attribute_index(foods_df)
+        model.biased = metadata['biased']
+
+        if metadata['has_factors']:
+            model.user_factors = _load_array(directory, 'user_factors', mmap_mode)
+            model.item_factors = _load_array(directory, 'item_factors', mmap_mode)
+            model.user_bias = _load_array(directory, 'user_bias', mmap_mode)
+            model.item_bias = _load_array(directory, 'item_bias', mmap_mode)
+            model.user_ids = _load_array(directory, 'user_ids', mmap_mode=None)
+            model.item_ids = _load_array(directory, 'item_ids', mmap_mode=None)
+            model.global_mean = metadata['global_mean']
+            model._build_code_maps()
+        elif metadata.get('has_neighbors'):
+            model.neighbor_indices = _load_array(directory, 'neighbor_indices', mmap_mode)
+            model.neighbor_scores = _load_array(directory, 'neighbor_scores', mmap_mode)
+            model.item_means = _load_array(directory, 'item_means', mmap_mode=None)
+            model.global_mean = metadata['global_mean']
+            model._build_similarity_matrix()
+        else:
+            import joblib
+            model.model = joblib.load(os.path.join(directory, 'model.joblib'))
+        return model
+
+    def _score_all_items(self, customer_id):
+        """Dự đoán điểm cho toàn bộ món ăn của một khách hàng bằng một phép nhân ma trận-vector"""
+        if self.neighbor_indices is not None:
+            return self._score_item_knn(customer_id)
+
+        known_items = self.item_codes >= 0
+        codes = self.item_codes[known_items]
+        user = self._user_vector(customer_id)
+
+        if self.biased:
+            scores = np.full(len(self.item_codes), self.global_mean, dtype=np.float64)
+            if user is not None:
+                scores += user[1]
+            scores[known_items] += self.item_bias[codes]
+            if user is not None:
+                scores[known_items] += self.item_factors[codes] @ user[0]
+        else:
+            # Không có bias: chỉ dự đoán được khi biết cả khách hàng lẫn món ăn
+            scores = np.full(len(self.item_codes), self.global_mean, dtype=np.float64)
+            if user is not None:
+                scores[known_items] = self.item_factors[codes] @ user[0]
+
+        # Món mới đã được fold-in (thường rất ít)
+        for position, (vector, bias) in list(self._folded_items.items()):
+            if self.biased:
+                scores[position] += bias + (vector @ user[0] if user is not None else 0.0)
+            elif user is not None:
+                scores[position] = vector @ user[0]
+
+        # Giới hạn điểm trong thang đánh giá như surprise
+        lower_bound, higher_bound = self.rating_scale
+        return np.clip(scores, lower_bound, higher_bound)
+
+    def recommend_for_customer(self, customer_id, top_n=10, filters=None):
+        """
+        Args:
+            customer_id: Khách hàng cần gợi ý
+            top_n (int): Số món cần gợi ý
+            filters (dict, optional): Bộ lọc món ăn, xem CatalogAttributeIndex.filter_mask
+        """
+        if not self.rated_index.has_ratings(customer_id):
             return pd.DataFrame()
 
-        # Lấy danh sách món ăn mà khách hàng chưa đánh giá
-        rated_foods = self.ratings[self.ratings['customer_id'] == customer_id]['food_id'].unique()
-        foods_to_predict = [food_id for food_id in self.foods['food_id'] if food_id not in rated_foods]
+        mask = self.attribute_index.filter_mask(filters)
+        if self.item_factors is None and self.neighbor_indices is None:
+            return self._recommend_with_predict(customer_id, top_n, mask)
+
+        scores = self._score_all_items(customer_id)
+
+        # Loại các món khách hàng đã đánh giá
+        scores[self.rated_index.rated_positions(customer_id)] = -np.inf
+
+        # Lấy top_n trong các món thỏa bộ lọc
+        top = _select_top(scores, top_n, mask)
+
+        result = self.foods.iloc[top].copy()
+        result['predicted_rating'] = scores[top]
+        return result
+
+    def _recommend_with_predict(self, customer_id, top_n, mask=None):
+        """Dự đoán từng món qua model.predict (dùng cho các thuật toán không có nhân tố như KNN)"""
+        # Lấy danh sách món ăn mà khách hàng chưa đánh giá (và thỏa bộ lọc)
+        rated_foods = set(self.rated_index.rated_food_ids(customer_id))
+        food_ids = self.foods['food_id'] if mask is None else self.foods['food_id'][mask]
+        foods_to_predict = [food_id for food_id in food_ids if food_id not in rated_foods]
 
         # Dự đoán điểm cho các món chưa đánh giá
         predictions = []
@@ -111,37 +916,99 @@ class CollaborativeRecommender:
 
 
 class HybridRecommender:
-    def __init__(self, content_weight=0.4, collab_weight=0.6):
+    def __init__(self, content_weight=0.4, collab_weight=0.6, content_recommender=None, collab_recommender=None):
+        """
+        Args:
+            content_weight (float): Trọng số của điểm content-based
+            collab_weight (float): Trọng số của điểm collaborative
+            content_recommender (ContentBasedRecommender, optional): Mô hình content-based dùng lại,
+                không huấn luyện lại trong fit() nếu đã được huấn luyện
+            collab_recommender (CollaborativeRecommender, optional): Mô hình collaborative dùng lại,
+                không huấn luyện lại trong fit() nếu đã được huấn luyện
+        """
         self.content_weight = content_weight
         self.collab_weight = collab_weight
-        self.content_recommender = ContentBasedRecommender()
-        self.collab_recommender = CollaborativeRecommender()
+        self.content_recommender = content_recommender or ContentBasedRecommender()
+        self.collab_recommender = collab_recommender or CollaborativeRecommender()
         self.foods = None
         self.customers = None
+        self.food_positions = None
 
     def fit(self, foods_df, ratings_df, customers_df=None):
         self.foods = foods_df
         self.customers = customers_df
-        self.content_recommender.fit(foods_df)
-        self.collab_recommender.fit(ratings_df, foods_df)
+        # Mã món dày đặc (vị trí trong foods_df) để gộp điểm bằng mảng
+        self.food_positions = pd.Series(np.arange(len(foods_df)), index=foods_df['food_id'])
+        self.food_positions = self.food_positions[~self.food_positions.index.duplicated()]
+        if self.content_recommender.foods is None:
+            self.content_recommender.fit(foods_df)
+        if self.collab_recommender.foods is None:
+            self.collab_recommender.fit(ratings_df, foods_df)
+
+    def save(self, directory, metadata=None):
+        """
+        Lưu mô hình kết hợp: trọng số vào metadata, hai mô hình thành phần vào thư mục con content/ và collab/
+
+        Args:
+            directory (str): Thư mục lưu artifact
+            metadata (dict, optional): Thông tin thêm ghi vào metadata của cả ba mô hình
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.content_recommender.save(os.path.join(directory, 'content'), metadata)
+        self.collab_recommender.save(os.path.join(directory, 'collab'), metadata)
+        _write_metadata(directory, {
+            'model': 'hybrid',
+            'content_weight': self.content_weight,
+            'collab_weight': self.collab_weight,
+            **(metadata or {}),
+        })
+
+    @classmethod
+    def load(cls, directory, foods_df, ratings_df, customers_df=None, rated_index=None, attribute_index=None,
+             mmap_mode='r'):
+        """
+        Tải mô hình kết hợp đã lưu bằng save()
+
+        Returns:
+            HybridRecommender: Mô hình đã tải, các mô hình thành phần không cần huấn luyện lại
+        """
+        metadata = _read_metadata(directory, 'hybrid')
+        content_recommender = ContentBasedRecommender.load(os.path.join(directory, 'content'), foods_df,
+                                                           attribute_index=attribute_index, mmap_mode=mmap_mode)
+        collab_recommender = CollaborativeRecommender.load(os.path.join(directory, 'collab'), ratings_df, foods_df,
+                                                           rated_index=rated_index, attribute_index=attribute_index,
+                                                           mmap_mode=mmap_mode)
 
-    def recommend(self, customer_id, food_id=None, features=None, top_n=10):
+        model = cls(content_weight=metadata['content_weight'], collab_weight=metadata['collab_weight'],
+                    content_recommender=content_recommender, collab_recommender=collab_recommender)
+        model.fit(foods_df, ratings_df, customers_df)
+        return model
+
+    def recommend(self, customer_id, food_id=None, features=None, top_n=10, filters=None):
+        """
+        Args:
+            customer_id: Khách hàng cần gợi ý
+            food_id (optional): Món ăn gốc cho phần content-based
+            features (str, optional): Đặc điểm món ăn mong muốn cho phần content-based
+            top_n (int): Số món cần gợi ý
+            filters (dict, optional): Bộ lọc món ăn, áp dụng trong từng mô hình thành phần
+        """
         # Lấy gợi ý từ collaborative filtering
         collab_recs = pd.DataFrame()
         if hasattr(self, 'collab_recommender') and self.collab_recommender is not None:
             try:
-                collab_recs = self.collab_recommender.recommend_for_customer(customer_id, top_n=top_n * 2)
+                collab_recs = self.collab_recommender.recommend_for_customer(customer_id, top_n=top_n * 2,
+                                                                             filters=filters)
             except Exception as e:
                 print(f"Lỗi khi lấy gợi ý từ collaborative filtering: {e}")
                 collab_recs = pd.DataFrame()
     
         # Nếu có food_id hoặc features, lấy gợi ý từ content-based
         if food_id is not None:
-            content_recs = self.content_recommender.recommend(food_id, top_n=top_n * 2)
-            content_type = 'food'
+            content_recs = self.content_recommender.recommend(food_id, top_n=top_n * 2, filters=filters)
         elif features is not None:
-            content_recs = self.content_recommender.get_similar_by_features(features, top_n=top_n * 2)
-            content_type = 'features'
+            content_recs = self.content_recommender.get_similar_by_features(features, top_n=top_n * 2,
+                                                                            filters=filters)
         else:
             # Nếu không có thông tin và có collaborative filtering
             if not collab_recs.empty:
@@ -149,84 +1016,44 @@ class HybridRecommender:
             # Không có đủ dữ liệu, trả về DataFrame rỗng
             return pd.DataFrame()
 
-        # Chuẩn bị kết quả cho content và collab
-        content_result = pd.DataFrame()
-        collab_result = pd.DataFrame()
+        # Điểm của từng thành phần căn theo mã món (vị trí trong self.foods), NaN nghĩa là không được gợi ý
+        content_scores = np.full(len(self.foods), np.nan)
+        collab_scores = np.full(len(self.foods), np.nan)
 
         if not content_recs.empty:
-            if content_type == 'food':
-                content_result = content_recs[['food_id', 'similarity_score']].copy()
-                # Chuẩn hóa điểm tương tự
-                if not content_result.empty:
-                    max_sim = content_result['similarity_score'].max()
-                    if max_sim > 0:
-                        content_result['normalized_score'] = content_result['similarity_score'] / max_sim * 5
-                    else:
-                        content_result['normalized_score'] = content_result['similarity_score']
-            else:  # features
-                content_result = content_recs[['food_id', 'similarity_score']].copy()
-                # Chuẩn hóa điểm tương tự
-                if not content_result.empty:
-                    max_sim = content_result['similarity_score'].max()
-                    if max_sim > 0:
-                        content_result['normalized_score'] = content_result['similarity_score'] / max_sim * 5
-                    else:
-                        content_result['normalized_score'] = content_result['similarity_score']
+            # Chuẩn hóa điểm tương tự về thang 5
+            similarity = content_recs['similarity_score'].to_numpy(dtype=float)
+            max_sim = similarity.max()
+            normalized = similarity / max_sim * 5 if max_sim > 0 else similarity
+            self._assign_scores(content_scores, content_recs['food_id'], normalized)
 
         if not collab_recs.empty:
-            collab_result = collab_recs[['food_id', 'predicted_rating']].copy()
-            collab_result.rename(columns={'predicted_rating': 'normalized_score'}, inplace=True)
-
-        # Kết hợp kết quả
-        if not content_result.empty and not collab_result.empty:
-            # Kết hợp với trọng số
-            content_result['weighted_score'] = content_result['normalized_score'] * self.content_weight
-            content_set = set(content_result['food_id'])
-
-            collab_result['weighted_score'] = collab_result['normalized_score'] * self.collab_weight
-            collab_set = set(collab_result['food_id'])
-
-            # Món ăn xuất hiện ở cả hai
-            common_items = content_set.intersection(collab_set)
-
-            # Gộp điểm
-            combined_scores = {}
-
-            # Trường hợp món ăn xuất hiện ở cả hai hệ thống
-            for food_id in common_items:
-                content_score = content_result[content_result['food_id'] == food_id]['weighted_score'].values[0]
-                collab_score = collab_result[collab_result['food_id'] == food_id]['weighted_score'].values[0]
-                combined_scores[food_id] = content_score + collab_score
-
-            # Trường hợp món ăn chỉ xuất hiện ở content-based
-            for food_id in content_set - common_items:
-                score = content_result[content_result['food_id'] == food_id]['weighted_score'].values[0]
-                combined_scores[food_id] = score
-
-            # Trường hợp món ăn chỉ xuất hiện ở collaborative filtering
-            for food_id in collab_set - common_items:
-                score = collab_result[collab_result['food_id'] == food_id]['weighted_score'].values[0]
-                combined_scores[food_id] = score
-
-            # Sắp xếp và lấy top_n
-            sorted_items = sorted(combined_scores.items(), key=lambda x: x[1], reverse=True)[:top_n]
-            recommended_food_ids = [item[0] for item in sorted_items]
-
-            # Tạo DataFrame kết quả
-            result = self.foods[self.foods['food_id'].isin(recommended_food_ids)].copy()
-            score_dict = {item[0]: item[1] for item in sorted_items}
-            result['hybrid_score'] = result['food_id'].map(score_dict)
-
-            return result.sort_values('hybrid_score', ascending=False)
-        elif not content_result.empty:
-            top_items = content_result.sort_values('normalized_score', ascending=False).head(top_n)
-            result = self.foods[self.foods['food_id'].isin(top_items['food_id'])].copy()
-            score_dict = dict(zip(top_items['food_id'], top_items['normalized_score']))
-            result['hybrid_score'] = result['food_id'].map(score_dict)
-            return result.sort_values('hybrid_score', ascending=False)
+            predicted = collab_recs['predicted_rating'].to_numpy(dtype=float)
+            self._assign_scores(collab_scores, collab_recs['food_id'], predicted)
+
+        has_content = ~np.isnan(content_scores)
+        has_collab = ~np.isnan(collab_scores)
+
+        # Khi cả hai thành phần đều có gợi ý, mọi món được nhân trọng số; nếu chỉ một thành phần có gợi ý
+        # thì dùng nguyên điểm của thành phần đó (trọng số 1)
+        if has_content.any() and has_collab.any():
+            content_weight, collab_weight = self.content_weight, self.collab_weight
         else:
-            top_items = collab_result.sort_values('normalized_score', ascending=False).head(top_n)
-            result = self.foods[self.foods['food_id'].isin(top_items['food_id'])].copy()
-            score_dict = dict(zip(top_items['food_id'], top_items['normalized_score']))
-            result['hybrid_score'] = result['food_id'].map(score_dict)
-            return result.sort_values('hybrid_score', ascending=False)
+            content_weight, collab_weight = 1.0, 1.0
+
+        # Món chỉ xuất hiện ở một thành phần nhận điểm đã nhân trọng số của thành phần đó, không được nâng lên 1
+        combined = (np.where(has_content, content_scores * content_weight, 0.0)
+                    + np.where(has_collab, collab_scores * collab_weight, 0.0))
+
+        # Chọn top_n bằng argpartition (các thành phần đã áp dụng bộ lọc)
+        top = _select_top(combined, top_n, has_content | has_collab)
+
+        result = self.foods.iloc[top].copy()
+        result['hybrid_score'] = combined[top]
+        return result
+
+    def _assign_scores(self, scores, food_ids, values):
+        """Ghi điểm của một thành phần vào mảng theo mã món"""
+        positions = food_ids.map(self.food_positions).to_numpy()
+        known = ~pd.isna(positions)
+        scores[positions[known].astype(np.int64)] = values[known]
@@ -0,0 +1,152 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+# Số kết quả tối đa và thời gian sống (giây) của bộ nhớ đệm gợi ý
+RESULT_CACHE_SIZE = int(os.getenv('RESULT_CACHE_SIZE', '1024'))
+RESULT_CACHE_TTL = float(os.getenv('RESULT_CACHE_TTL', '600'))
+
+
+def _normalize_features(features):
+    """Chuẩn hóa chuỗi đặc điểm để "Cay  Ngọt" và "cay ngọt" dùng chung một kết quả"""
+    if features is None:
+        return None
+    return ' '.join(str(features).lower().split())
+
+
+def _normalize_filters(filters):
+    """Bộ lọc dạng tuple có thứ tự, bỏ các điều kiện rỗng (giống cách filter_mask bỏ qua chúng)"""
+    if not filters:
+        return ()
+    normalized = []
+    for key, value in filters.items():
+        if value is None or (hasattr(value, '__len__') and len(value) == 0):
+            continue
+        if key == 'price_range':
+            value = tuple(float(bound) for bound in value)
+        elif isinstance(value, (list, tuple, set)):
+            value = tuple(sorted(value))
+        normalized.append((key, value))
+    return tuple(sorted(normalized))
+
+
+class RecommendationCache:
+    """
+    Bộ nhớ đệm LRU có thời gian sống cho kết quả gợi ý, dùng chung giữa các phiên trong tiến trình
+
+    Khóa gồm thuật toán, khách hàng, món gốc hoặc đặc điểm đã chuẩn hóa, top_n, bộ lọc và phiên bản mô hình,
+    nên mô hình được huấn luyện lại thì kết quả cũ tự hết hiệu lực. Đánh giá mới chỉ xóa kết quả của
+    khách hàng đó (xem on_rating).
+
+    Args:
+        max_entries (int): Số kết quả tối đa, kết quả dùng lâu nhất bị loại trước
+        ttl (float, optional): Số giây một kết quả còn hiệu lực, None để không giới hạn
+    """
+
+    def __init__(self, max_entries=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # khóa -> (thời điểm tạo, kết quả), thứ tự từ dùng lâu nhất tới mới nhất
+        self._entries = OrderedDict()
+        # customer_id -> các khóa của khách hàng đó, để xóa theo khách hàng
+        self._customer_keys = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(algorithm, customer_id=None, food_id=None, features=None, top_n=10, filters=None,
+                 model_version=None):
+        """Tạo khóa cho một lần gợi ý"""
+        return (algorithm, customer_id, food_id, _normalize_features(features), top_n,
+                _normalize_filters(filters), model_version)
+
+    def get(self, key):
+        """
+        Lấy kết quả đã lưu
+
+        Returns:
+            tuple: (có trong bộ nhớ đệm hay không, kết quả)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[0] > self.ttl:
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[1]
+
+    def put(self, key, value):
+        """Lưu kết quả, loại kết quả dùng lâu nhất nếu vượt max_entries"""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            customer_id = key[1]
+            if customer_id is not None:
+                self._customer_keys.setdefault(customer_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """
+        Trả về kết quả đã lưu hoặc gọi compute() rồi lưu lại
+
+        Phía gọi nhận bản sao nông của DataFrame nên thêm/sửa cột không làm hỏng kết quả đã lưu.
+        """
+        found, value = self.get(key)
+        if not found:
+            value = compute()
+            self.put(key, value)
+        return value.copy(deep=False) if isinstance(value, pd.DataFrame) else value
+
+    def _remove(self, key):
+        self._entries.pop(key, None)
+        customer_keys = self._customer_keys.get(key[1])
+        if customer_keys is not None:
+            customer_keys.discard(key)
+            if not customer_keys:
+                del self._customer_keys[key[1]]
+
+    def invalidate_customer(self, customer_id):
+        """Xóa mọi kết quả của một khách hàng"""
+        with self._lock:
+            for key in list(self._customer_keys.get(customer_id, ())):
+                self._remove(key)
+
+    def on_rating(self, customer_id, food_id, rating, previous_rating=None):
+        """Listener cho data_loader.register_rating_listener: đánh giá mới chỉ làm mới gợi ý của khách hàng đó"""
+        self.invalidate_customer(customer_id)
+
+    def clear(self):
+        """Xóa toàn bộ kết quả và bộ đếm"""
+        with self._lock:
+            self._entries = OrderedDict()
+            self._customer_keys = {}
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """
+        Thống kê để chọn kích thước bộ nhớ đệm
+
+        Returns:
+            dict: {'hits', 'misses', 'hit_rate', 'evictions', 'size', 'max_entries'}
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+            }
@@ -0,0 +1,258 @@
+import bisect
+import math
+import re
+import threading
+import unicodedata
+from functools import lru_cache
+
+import pandas as pd
+
+# Cột được đánh chỉ mục -> trọng số khi xếp hạng (khớp ở tên món quan trọng hơn khớp ở mô tả)
+SEARCH_FIELDS = {
+    'name': 3.0,
+    'flavors': 2.0,
+    'ingredients': 2.0,
+    'features': 1.0,
+}
+
+# Hệ số cho từ khớp theo tiền tố (gõ dở) so với khớp nguyên từ
+PREFIX_WEIGHT = 0.5
+# Hệ số cho món khớp đúng cả dấu khi người dùng gõ có dấu ("nấm" xếp trên "Nam")
+ACCENT_WEIGHT = 2.0
+
+_TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+_WORD_PATTERN = re.compile(r'[^\W_]+')
+
+
+def normalize_text(text):
+    """Chuyển về chữ thường và bỏ dấu tiếng Việt ("Phở Bò" -> "pho bo", "đậu" -> "dau")"""
+    if not isinstance(text, str):
+        return ''
+    text = text.lower().replace('đ', 'd')
+    # Tách dấu khỏi chữ cái (NFD) rồi bỏ các dấu không phải ASCII
+    return unicodedata.normalize('NFD', text).encode('ascii', 'ignore').decode('ascii')
+
+
+@lru_cache(maxsize=65536)
+def _tokenize_cached(text):
+    return tuple(_TOKEN_PATTERN.findall(normalize_text(text)))
+
+
+def tokenize(text):
+    """Tách chuỗi đã chuẩn hóa thành các từ (hương vị, nguyên liệu lặp lại nhiều nên được nhớ đệm)"""
+    if not isinstance(text, str):
+        return ()
+    return _tokenize_cached(text)
+
+
+@lru_cache(maxsize=65536)
+def _accented_words(text):
+    """Các từ có dấu (giữ nguyên dấu, chữ thường) kèm dạng không dấu: (("nấm", "nam"), ...)"""
+    words = []
+    for word in _WORD_PATTERN.findall(text.lower()):
+        normalized = tokenize(word)
+        if len(normalized) == 1 and normalized[0] != word:
+            words.append((word, normalized[0]))
+    return tuple(words)
+
+
+class FoodSearchIndex:
+    """
+    Chỉ mục ngược từ -> danh sách món cho trang tìm kiếm
+
+    Mỗi từ (đã bỏ dấu) trỏ tới các món chứa nó cùng trọng số của trường có điểm cao nhất.
+    Truy vấn chỉ duyệt danh sách món của các từ trong câu tìm kiếm thay vì quét chuỗi toàn bộ
+    danh mục. Chỉ mục được cập nhật theo từng món khi danh mục thay đổi (xem sync).
+
+    Args:
+        foods_df (DataFrame, optional): Danh mục món ăn ban đầu
+    """
+
+    def __init__(self, foods_df=None):
+        self._lock = threading.RLock()
+        # từ -> {food_id: trọng số}
+        self._postings = {}
+        # từ có dấu -> tập food_id, dùng để ưu tiên món khớp đúng dấu
+        self._accented = {}
+        # food_id -> (các từ, các từ có dấu) của món, dùng khi xóa hoặc cập nhật món
+        self._food_tokens = {}
+        # food_id -> giá trị băm của dòng, dùng để phát hiện món thay đổi
+        self._row_hashes = {}
+        self._catalog_key = None
+        # Danh sách từ đã sắp xếp cho truy vấn tiền tố, xây lại khi từ điển thay đổi
+        self._vocabulary = []
+        self._vocabulary_dirty = False
+
+        if foods_df is not None:
+            self.sync(foods_df)
+
+    @property
+    def size(self):
+        """Số món trong chỉ mục"""
+        return len(self._food_tokens)
+
+    def _token_weights(self, food):
+        weights = {}
+        accented = set()
+        for field, field_weight in SEARCH_FIELDS.items():
+            text = food.get(field)
+            if not isinstance(text, str):
+                continue
+            for token in tokenize(text):
+                if weights.get(token, 0.0) < field_weight:
+                    weights[token] = field_weight
+            accented.update(word for word, _ in _accented_words(text))
+        return weights, accented
+
+    def add_food(self, food):
+        """
+        Thêm hoặc cập nhật một món
+
+        Args:
+            food (dict | Series): Thông tin món ăn, cần có food_id và các cột trong SEARCH_FIELDS
+        """
+        food_id = food['food_id']
+        weights, accented = self._token_weights(food)
+
+        with self._lock:
+            self._remove(food_id)
+            for token, weight in weights.items():
+                posting = self._postings.get(token)
+                if posting is None:
+                    posting = self._postings[token] = {}
+                    self._vocabulary_dirty = True
+                posting[food_id] = weight
+            for word in accented:
+                self._accented.setdefault(word, set()).add(food_id)
+            self._food_tokens[food_id] = (tuple(weights), tuple(accented))
+            self._catalog_key = None
+
+    def remove_food(self, food_id):
+        """Xóa một món khỏi chỉ mục"""
+        with self._lock:
+            self._remove(food_id)
+            self._row_hashes.pop(food_id, None)
+            self._catalog_key = None
+
+    def _remove(self, food_id):
+        tokens, accented = self._food_tokens.pop(food_id, ((), ()))
+        for token in tokens:
+            posting = self._postings[token]
+            posting.pop(food_id, None)
+            if not posting:
+                del self._postings[token]
+                self._vocabulary_dirty = True
+        for word in accented:
+            foods = self._accented[word]
+            foods.discard(food_id)
+            if not foods:
+                del self._accented[word]
+
+    def sync(self, foods_df):
+        """
+        Đồng bộ chỉ mục với danh mục món ăn, chỉ đánh chỉ mục lại các món được thêm, sửa hoặc xóa
+
+        Returns:
+            tuple: (số món được thêm hoặc cập nhật, số món bị xóa)
+        """
+        columns = ['food_id'] + [field for field in SEARCH_FIELDS if field in foods_df.columns]
+        catalog = foods_df[columns].drop_duplicates('food_id')
+        row_hashes = pd.util.hash_pandas_object(catalog, index=False).to_numpy()
+        catalog_key = (len(catalog), int(row_hashes.sum()))
+
+        with self._lock:
+            if catalog_key == self._catalog_key:
+                return 0, 0
+
+            new_hashes = dict(zip(catalog['food_id'].tolist(), row_hashes.tolist()))
+            removed = [food_id for food_id in self._row_hashes if food_id not in new_hashes]
+            changed = [position for position, (food_id, row_hash) in enumerate(new_hashes.items())
+                       if self._row_hashes.get(food_id) != row_hash]
+
+            for food_id in removed:
+                self.remove_food(food_id)
+            for food in catalog.iloc[changed].to_dict('records'):
+                self.add_food(food)
+
+            self._row_hashes = new_hashes
+            self._catalog_key = catalog_key
+            return len(changed), len(removed)
+
+    def _expand(self, token, prefix):
+        """Các từ trong từ điển khớp với token (nguyên từ, hoặc mọi từ bắt đầu bằng token)"""
+        if not prefix:
+            return [token] if token in self._postings else []
+
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_dirty = False
+        start = bisect.bisect_left(self._vocabulary, token)
+        end = bisect.bisect_left(self._vocabulary, token + '\uffff')
+        return self._vocabulary[start:end]
+
+    def search(self, query, limit=None, prefix=True):
+        """
+        Tìm món theo từ khóa, mọi từ trong câu tìm kiếm đều phải khớp
+
+        Args:
+            query (str): Câu tìm kiếm, có dấu hoặc không dấu
+            limit (int, optional): Số kết quả tối đa
+            prefix (bool): Cho phép khớp tiền tố ("ph" khớp "phở") để gợi ý khi đang gõ
+
+        Returns:
+            list: Các cặp (food_id, điểm) sắp xếp theo điểm giảm dần
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+        # Từ người dùng gõ có dấu: dạng không dấu -> dạng có dấu
+        accented_query = {normalized: word for word, normalized in _accented_words(query)}
+
+        with self._lock:
+            total = max(self.size, 1)
+            scores = None
+            for token in tokens:
+                # Điểm tốt nhất của mỗi món cho từ này: trọng số trường × idf, khớp tiền tố bị giảm điểm
+                token_scores = {}
+                for term in self._expand(token, prefix):
+                    posting = self._postings[term]
+                    idf = math.log(1 + total / len(posting))
+                    term_weight = idf if term == token else idf * PREFIX_WEIGHT
+                    for food_id, weight in posting.items():
+                        score = weight * term_weight
+                        if score > token_scores.get(food_id, 0.0):
+                            token_scores[food_id] = score
+
+                if token in accented_query:
+                    for food_id in self._accented.get(accented_query[token], ()):
+                        if food_id in token_scores:
+                            token_scores[food_id] *= ACCENT_WEIGHT
+
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {food_id: score + token_scores[food_id]
+                              for food_id, score in scores.items() if food_id in token_scores}
+                if not scores:
+                    return []
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit] if limit is not None else ranked
+
+
+# Chỉ mục dùng chung của tiến trình, đồng bộ theo danh mục món mới nhất
+_search_index = FoodSearchIndex()
+
+
+def get_search_index(foods_df):
+    """
+    Lấy chỉ mục tìm kiếm đã đồng bộ với danh mục món ăn (chỉ các món thay đổi được đánh chỉ mục lại)
+
+    Args:
+        foods_df (DataFrame): Danh mục món ăn
+
+    Returns:
+        FoodSearchIndex: Chỉ mục tìm kiếm
+    """
+    _search_index.sync(foods_df)
+    return _search_index
@@ -0,0 +1,76 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_generator import generate_food_items, generate_customers, generate_ratings  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def dataset():
+    """Bộ dữ liệu nhỏ sinh ngẫu nhiên: (foods_df, customers_df, ratings_df) với id/timestamp như bảng ratings"""
+    rng = np.random.default_rng(7)
+    foods_df = generate_food_items(150, rng)
+    customers_df = generate_customers(400, rng)
+    ratings_df = generate_ratings(customers_df, foods_df, rng, sparsity=0.06)
+    ratings_df = ratings_df.assign(
+        id=np.arange(1, len(ratings_df) + 1),
+        timestamp=pd.Timestamp('2025-01-01') - pd.to_timedelta(ratings_df['days_ago'], unit='D'),
+    )
+    # Dữ liệu từ data_loader được sắp mới nhất trước
+    ratings_df = ratings_df.sort_values(['timestamp', 'id'], ascending=False, ignore_index=True)
+    return foods_df, customers_df, ratings_df
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE foods (
+    food_id VARCHAR(50) PRIMARY KEY, name VARCHAR(255) NOT NULL, category VARCHAR(100), cuisine VARCHAR(100),
+    price DECIMAL(10, 2), ingredients TEXT, flavors TEXT, features TEXT
+);
+CREATE TABLE customers (
+    customer_id VARCHAR(50) PRIMARY KEY, name VARCHAR(255), age INT, gender VARCHAR(20),
+    price_sensitivity DECIMAL(3, 2)
+);
+CREATE TABLE ratings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, customer_id VARCHAR(50), food_id VARCHAR(50), rating INT NOT NULL,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+
+@pytest.fixture
+def sqlite_db(tmp_path, monkeypatch, dataset):
+    """File SQLite chứa dataset, pool dùng chung của db_utils trỏ tới file này trong suốt test"""
+    import sqlite3
+
+    import data_loader
+    import db_utils
+
+    foods_df, customers_df, ratings_df = dataset
+    path = str(tmp_path / 'food_recommendation.db')
+    connection = sqlite3.connect(path)
+    connection.executescript(SQLITE_SCHEMA)
+    foods = foods_df[['food_id', 'name', 'category', 'cuisine', 'price', 'ingredients', 'flavors', 'features']]
+    connection.executemany("INSERT INTO foods VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                           foods.astype(object).itertuples(index=False))
+    connection.executemany("INSERT INTO customers (customer_id, age, gender) VALUES (?, ?, ?)",
+                           customers_df[['customer_id', 'age', 'gender']].astype(object).itertuples(index=False))
+    ratings = ratings_df.assign(timestamp=ratings_df['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S'))
+    connection.executemany("INSERT INTO ratings (id, customer_id, food_id, rating, timestamp) VALUES (?, ?, ?, ?, ?)",
+                           ratings[['id', 'customer_id', 'food_id', 'rating', 'timestamp']]
+                           .astype(object).itertuples(index=False))
+    connection.commit()
+    connection.close()
+
+    monkeypatch.setattr(db_utils, 'DB_BACKEND', 'sqlite')
+    monkeypatch.setattr(db_utils, 'DB_SQLITE_PATH', path)
+    monkeypatch.setattr(db_utils, '_pool', None)
+    data_loader.reset_ratings_cache()
+    yield path
+    if db_utils._pool is not None:
+        db_utils._pool.close()
+    data_loader.reset_ratings_cache()
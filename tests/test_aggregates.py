@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+
+import aggregates
+from aggregates import RatingAggregates, get_rating_aggregates
+
+
+def _add_row(ratings_df, customer_id, food_id, rating):
+    row = pd.DataFrame({
+        'customer_id': [customer_id], 'food_id': [food_id], 'rating': [rating], 'days_ago': [0],
+        'id': [ratings_df['id'].max() + 1], 'timestamp': [ratings_df['timestamp'].max() + pd.Timedelta(seconds=1)],
+    })
+    return pd.concat([row, ratings_df], ignore_index=True)
+
+
+def test_ratings_added_in_app_reuse_aggregates(dataset):
+    foods_df, _, ratings_df = dataset
+    ratings_df = ratings_df.copy()
+    built = get_rating_aggregates(ratings_df, foods_df)
+
+    customer_id, food_id = ratings_df['customer_id'].iloc[0], foods_df['food_id'].iloc[0]
+    aggregates.apply_rating(customer_id, food_id, 5.0)
+    updated = _add_row(ratings_df, customer_id, food_id, 5.0)
+
+    assert get_rating_aggregates(updated, foods_df) is built
+
+
+def test_external_update_with_same_count_rebuilds(dataset):
+    foods_df, _, ratings_df = dataset
+    ratings_df = ratings_df.copy()
+    built = get_rating_aggregates(ratings_df, foods_df)
+
+    updated = ratings_df.copy()
+    updated.loc[len(updated) - 1, ['rating', 'timestamp']] = [1.0, updated['timestamp'].max() + pd.Timedelta(days=1)]
+    rebuilt = get_rating_aggregates(updated, foods_df)
+
+    assert rebuilt is not built
+    expected = updated.groupby('food_id')['rating'].sum()
+    positions = expected.index.map(rebuilt.food_codes).to_numpy()
+    assert np.allclose(rebuilt.food_sum[positions], expected.to_numpy())
+
+
+def test_external_delete_and_insert_rebuilds(dataset):
+    foods_df, _, ratings_df = dataset
+    ratings_df = ratings_df.copy()
+    built = get_rating_aggregates(ratings_df, foods_df)
+
+    replaced = _add_row(ratings_df.iloc[1:], ratings_df['customer_id'].iloc[0], foods_df['food_id'].iloc[1], 2.0)
+
+    assert len(replaced) == built.n_ratings
+    assert get_rating_aggregates(replaced, foods_df) is not built
+
+
+def test_frame_without_watermark_columns_rebuilds_on_change(dataset):
+    foods_df, _, ratings_df = dataset
+    plain = ratings_df[['customer_id', 'food_id', 'rating']].copy()
+    built = RatingAggregates(plain, foods_df)
+    assert built.matches(plain)
+
+    plain.loc[0, 'rating'] = 1.0 if plain.loc[0, 'rating'] != 1.0 else 2.0
+    assert not built.matches(plain)
+
+
+def test_flavor_table_follows_catalog_order(dataset):
+    foods_df, _, _ = dataset
+    table = aggregates.build_food_flavor_table(foods_df)
+    reordered = aggregates.build_food_flavor_table(foods_df.iloc[::-1])
+
+    assert reordered is not table
+    assert reordered['food_id'].iloc[0] == foods_df['food_id'].iloc[-1]
+
+
+def test_reordered_catalog_rebuilds_aggregates(dataset):
+    foods_df, _, ratings_df = dataset
+    built = get_rating_aggregates(ratings_df, foods_df)
+    rebuilt = get_rating_aggregates(ratings_df, foods_df.iloc[::-1].reset_index(drop=True))
+
+    assert rebuilt is not built
+    assert rebuilt.food_ids[0] == foods_df['food_id'].iloc[-1]
+
+
+def test_incremental_updates_match_full_rebuild(dataset):
+    foods_df, _, ratings_df = dataset
+    ratings_df = ratings_df.drop_duplicates(['customer_id', 'food_id']).reset_index(drop=True)
+    added, initial = ratings_df.iloc[:30], ratings_df.iloc[30:].reset_index(drop=True)
+    incremental = RatingAggregates(initial, foods_df)
+
+    # 30 đánh giá mới và 20 đánh giá được sửa, đều mang thời điểm hiện tại như add_rating
+    now = pd.Timestamp.now()
+    final = initial.copy()
+    for row in added.itertuples(index=False):
+        incremental.apply_rating(row.customer_id, row.food_id, row.rating)
+    for i in range(0, 40, 2):
+        row = final.iloc[i]
+        new_rating = 5.0 if row['rating'] < 3 else 1.0
+        incremental.apply_rating(row['customer_id'], row['food_id'], new_rating, previous_rating=row['rating'])
+        final.loc[i, ['rating', 'timestamp']] = [new_rating, now]
+    final = pd.concat([added.assign(timestamp=now), final], ignore_index=True)
+
+    rebuilt = RatingAggregates(final, foods_df)
+    assert incremental.n_ratings == rebuilt.n_ratings
+    np.testing.assert_allclose(incremental.food_sum, rebuilt.food_sum)
+    np.testing.assert_array_equal(incremental.food_count, rebuilt.food_count)
+    for attribute in ('cuisine', 'category', 'flavor'):
+        pd.testing.assert_frame_equal(incremental.group_stats(attribute), rebuilt.group_stats(attribute))
+    pd.testing.assert_frame_equal(incremental.cuisine_category_stats(), rebuilt.cuisine_category_stats())
+    pd.testing.assert_frame_equal(incremental.monthly_stats(), rebuilt.monthly_stats())
+    pd.testing.assert_series_equal(incremental.rating_distribution(), rebuilt.rating_distribution())
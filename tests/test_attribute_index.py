@@ -0,0 +1,15 @@
+from attribute_index import get_attribute_index
+
+
+def test_reordered_catalog_rebuilds_index(dataset):
+    foods_df, _, _ = dataset
+    index = get_attribute_index(foods_df)
+    assert get_attribute_index(foods_df.copy()) is index
+
+    reordered = foods_df.iloc[::-1].reset_index(drop=True)
+    rebuilt = get_attribute_index(reordered)
+
+    assert rebuilt is not index
+    cuisine = reordered['cuisine'].iloc[0]
+    mask = rebuilt.mask('cuisine', [cuisine])
+    assert (mask == (reordered['cuisine'] == cuisine).to_numpy()).all()
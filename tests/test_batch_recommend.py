@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from batch_recommend import BYTES_PER_SCORE, _block_size, batch_recommend
+from recommenders import CollaborativeRecommender
+
+
+@pytest.mark.parametrize('algorithm', ['svd', 'item_knn'])
+def test_batch_matches_recommend_for_customer(dataset, algorithm):
+    foods_df, customers_df, ratings_df = dataset
+    model = CollaborativeRecommender(algorithm=algorithm)
+    model.fit(ratings_df, foods_df)
+
+    batch = batch_recommend(model, customers_df, top_n=10, workers=2, block_size=64)
+
+    customers = [customer_id for customer_id in customers_df['customer_id'] if model.rated_index.has_ratings(customer_id)]
+    assert batch['customer_id'].nunique() == len(customers)
+    for customer_id in customers[:50]:
+        expected = model.recommend_for_customer(customer_id, top_n=10)
+        rows = batch[batch['customer_id'] == customer_id].sort_values('position')
+        assert rows['position'].tolist() == list(range(1, len(expected) + 1))
+        np.testing.assert_allclose(rows['score'].to_numpy(), expected['predicted_rating'].to_numpy(), rtol=1e-5)
+        # Món bằng điểm ở cuối danh sách (ví dụ cùng bị giới hạn ở 5) có thể được chọn khác nhau
+        cutoff = expected['predicted_rating'].min()
+        above = expected['predicted_rating'].to_numpy() > cutoff + 1e-5
+        assert set(expected['food_id'][above]) <= set(rows['food_id'])
+
+
+def test_batch_skips_customers_without_ratings(dataset):
+    foods_df, customers_df, ratings_df = dataset
+    model = CollaborativeRecommender(algorithm='svd')
+    model.fit(ratings_df[ratings_df['customer_id'] != customers_df['customer_id'].iloc[0]], foods_df)
+
+    batch = batch_recommend(model, customers_df, top_n=5, workers=1)
+
+    assert customers_df['customer_id'].iloc[0] not in set(batch['customer_id'])
+
+
+def test_block_size_follows_memory_budget(dataset):
+    foods_df, customers_df, ratings_df = dataset
+    model = CollaborativeRecommender(algorithm='svd')
+    model.fit(ratings_df, foods_df)
+
+    # Khối điểm của mỗi tác vụ tối đa 10 khách hàng × 150 món
+    budget = 10 * len(foods_df) * BYTES_PER_SCORE
+    assert _block_size(len(foods_df), budget) == 10
+    assert _block_size(len(foods_df), 1) == 1
+
+    small = batch_recommend(model, customers_df, top_n=10, workers=2, memory_budget=budget)
+    single = batch_recommend(model, customers_df, top_n=10, workers=1, block_size=len(customers_df))
+    pd.testing.assert_frame_equal(small, single)
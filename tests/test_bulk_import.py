@@ -0,0 +1,129 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bulk_import import bulk_insert, import_csv
+from conftest import SQLITE_SCHEMA
+from db_utils import create_sqlite_connection
+
+
+@pytest.fixture
+def connection(tmp_path):
+    path = str(tmp_path / 'bulk.db')
+    raw = sqlite3.connect(path)
+    raw.executescript(SQLITE_SCHEMA)
+    raw.close()
+    connection = create_sqlite_connection(path)
+    yield connection
+    connection.close()
+
+
+def _ratings():
+    return pd.DataFrame({
+        'customer_id': ['C1', 'C2', None, 'C4', 'C5'],
+        'food_id': ['F1', 'F2', 'F3', None, 'F5'],
+        'rating': [5, 4, 3, 2, 1],
+        'timestamp': pd.to_datetime(['2025-01-02 03:04:05', '2025-01-02 03:04:06', None,
+                                     '2025-12-31 23:59:59', '2025-06-01 00:00:00']),
+    })
+
+
+def _rows(connection, query):
+    # Đọc giá trị gốc đã lưu, không qua bộ chuyển kiểu của adapter
+    return sqlite3.connect(connection.path).execute(query).fetchall()
+
+
+def test_bulk_insert_writes_nulls_and_formatted_datetimes(connection):
+    stats = bulk_insert(connection, 'ratings', _ratings(), chunk_size=2, verbose=False)
+
+    assert stats['rows'] == 5
+    rows = _rows(connection, "SELECT customer_id, food_id, rating, timestamp FROM ratings ORDER BY id")
+    assert rows == [
+        ('C1', 'F1', 5, '2025-01-02 03:04:05'),
+        ('C2', 'F2', 4, '2025-01-02 03:04:06'),
+        (None, 'F3', 3, None),
+        ('C4', None, 2, '2025-12-31 23:59:59'),
+        ('C5', 'F5', 1, '2025-06-01 00:00:00'),
+    ]
+
+
+def test_bulk_insert_selected_columns_and_float_nan(connection):
+    foods = pd.DataFrame({'food_id': ['F1', 'F2'], 'name': ['Phở', 'Bún'], 'price': [35000.0, np.nan],
+                          'popularity': [4.5, 3.0]})
+
+    stats = bulk_insert(connection, 'foods', foods, columns=['food_id', 'name', 'price'], verbose=False)
+
+    assert stats['rows'] == 2
+    assert _rows(connection, "SELECT food_id, name, price FROM foods ORDER BY food_id") == [
+        ('F1', 'Phở', 35000), ('F2', 'Bún', None)]
+
+
+def test_import_csv_in_chunks_with_truncate(connection, tmp_path):
+    path = tmp_path / 'ratings.csv'
+    _ratings().to_csv(path, index=False)
+
+    assert import_csv(str(path), 'ratings', conn=connection, chunk_size=2)['rows'] == 5
+    stats = import_csv(str(path), 'ratings', conn=connection, chunk_size=2, truncate=True)
+
+    assert stats['rows'] == 5
+    assert _rows(connection, "SELECT COUNT(*) FROM ratings") == [(5,)]
+    assert _rows(connection, "SELECT COUNT(*) FROM ratings WHERE customer_id IS NULL") == [(1,)]
+    assert _rows(connection, "SELECT timestamp FROM ratings WHERE customer_id = 'C4'") == [('2025-12-31 23:59:59',)]
+
+
+def test_import_csv_uses_pool_connection(sqlite_db, tmp_path):
+    path = tmp_path / 'ratings.csv'
+    _ratings().to_csv(path, index=False)
+    before = sqlite3.connect(sqlite_db).execute("SELECT COUNT(*) FROM ratings").fetchone()[0]
+
+    assert import_csv(str(path), 'ratings')['rows'] == 5
+    assert sqlite3.connect(sqlite_db).execute("SELECT COUNT(*) FROM ratings").fetchone()[0] == before + 5
+
+
+class _MySQLCursor:
+    def __init__(self, engine, statements):
+        self.engine = engine
+        self.statements = statements
+
+    def execute(self, query, params=None):
+        self.statements.append(query)
+
+    def executemany(self, query, rows):
+        self.statements.append(query)
+
+    def fetchone(self):
+        return (self.engine,)
+
+    def close(self):
+        pass
+
+
+class _MySQLConnection:
+    dialect = 'mysql'
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def cursor(self):
+        return _MySQLCursor(self.engine, self.statements)
+
+    def commit(self):
+        pass
+
+
+@pytest.mark.parametrize('engine, alters', [
+    ('InnoDB', []),
+    ('MyISAM', ["ALTER TABLE ratings DISABLE KEYS", "ALTER TABLE ratings ENABLE KEYS"]),
+])
+def test_disable_keys_alters_only_myisam_tables(engine, alters):
+    connection = _MySQLConnection(engine)
+
+    bulk_insert(connection, 'ratings', _ratings(), disable_keys=True, verbose=False)
+
+    assert [query for query in connection.statements if query.startswith('ALTER')] == alters
+    for flag in (0, 1):
+        assert connection.statements.count(f"SET unique_checks = {flag}") == 1
+        assert connection.statements.count(f"SET foreign_key_checks = {flag}") == 1
@@ -0,0 +1,56 @@
+import pytest
+
+from chart_data import ChartDataProvider
+
+
+@pytest.fixture
+def loaded(sqlite_db):
+    import data_loader
+
+    return data_loader.load_foods_from_db(), data_loader.load_ratings_from_db()
+
+
+def _total(frame):
+    return int(frame['count'].sum())
+
+
+def test_auto_source_queries_database_for_loaded_frames(loaded):
+    foods_df, ratings_df = loaded
+    subset = ratings_df.iloc[:100]
+
+    # Frame được đánh dấu nạp từ database: số liệu lấy bằng GROUP BY trên toàn bảng
+    assert _total(ChartDataProvider(subset, foods_df, source='auto', from_database=True).rating_counts()) \
+        == len(ratings_df)
+    assert _total(ChartDataProvider(source='auto').rating_counts()) == len(ratings_df)
+
+
+def test_auto_source_keeps_caller_frames_in_memory(loaded):
+    foods_df, ratings_df = loaded
+    subset = ratings_df.iloc[:100]
+
+    assert _total(ChartDataProvider(subset, foods_df, source='auto').rating_counts()) == 100
+    assert _total(ChartDataProvider(subset, foods_df, source='auto').group_ratings('cuisine')) == 100
+
+
+def test_auto_source_without_database_uses_memory(dataset, monkeypatch):
+    import chart_data
+
+    foods_df, _, ratings_df = dataset
+    monkeypatch.setattr(chart_data, 'database_configured', lambda: False)
+
+    provider = ChartDataProvider(ratings_df.iloc[:50], foods_df, source='auto', from_database=True)
+    assert _total(provider.rating_counts()) == 50
+
+
+def test_database_and_memory_sources_agree(loaded):
+    foods_df, ratings_df = loaded
+    database = ChartDataProvider(source='database')
+    memory = ChartDataProvider(ratings_df, foods_df, source='memory')
+
+    for column in ('cuisine', 'category'):
+        db_frame = database.group_ratings(column).set_index(column)
+        memory_frame = memory.group_ratings(column).set_index(column)
+        assert db_frame['count'].astype(int).to_dict() == memory_frame['count'].astype(int).to_dict()
+        assert db_frame['avg_rating'].to_dict() == pytest.approx(memory_frame['avg_rating'].to_dict())
+    assert (database.cuisine_prices().set_index('cuisine')['price'].to_dict()
+            == pytest.approx(memory.cuisine_prices().set_index('cuisine')['price'].to_dict()))
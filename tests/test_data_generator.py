@@ -0,0 +1,34 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from data_generator import (COOKING_METHODS, CUISINES, DRINK_NAMES, INGREDIENTS, generate_customers,
+                            generate_food_items, generate_ratings)
+
+
+def test_food_names_follow_create_food_items_scheme():
+    foods_df = generate_food_items(500, np.random.default_rng(0))
+    drink = re.compile(rf"^({'|'.join(DRINK_NAMES)}) .+ #\d+$")
+    by_cuisine = re.compile(rf"^(|Món |Đặc sản )Món ({'|'.join(CUISINES)}).* #\d+$")
+    by_ingredient = re.compile(rf"^(|Món |Đặc sản )({'|'.join(INGREDIENTS)}) ({'|'.join(COOKING_METHODS)}).* #\d+$")
+
+    for row in foods_df.itertuples(index=False):
+        assert row.name.endswith(f' #{row.food_id}')
+        if row.category == 'Đồ uống':
+            assert drink.match(row.name)
+        else:
+            assert by_cuisine.match(row.name) or by_ingredient.match(row.name)
+    assert foods_df['name'].str.contains('Món ').any() and foods_df['name'].str.contains(' nướng').any()
+
+
+def test_same_seed_gives_same_dataset():
+    frames = []
+    for _ in range(2):
+        rng = np.random.default_rng(42)
+        foods_df = generate_food_items(100, rng)
+        customers_df = generate_customers(200, rng)
+        frames.append((foods_df, customers_df, generate_ratings(customers_df, foods_df, rng, sparsity=0.05)))
+
+    for first, second in zip(*frames):
+        pd.testing.assert_frame_equal(first, second)
@@ -0,0 +1,109 @@
+import sqlite3
+
+import data_loader
+
+
+def test_reload_without_changes_keeps_data_version(sqlite_db):
+    # Cột INT của SQLite giữ điểm lẻ dạng REAL: frame đầy đủ là float, các dòng ở watermark đọc lại là int
+    connection = sqlite3.connect(sqlite_db)
+    connection.execute("UPDATE ratings SET rating = 4 WHERE timestamp = (SELECT MAX(timestamp) FROM ratings)")
+    connection.commit()
+    connection.close()
+
+    ratings_df = data_loader.load_ratings_from_db()
+    version = data_loader.get_data_version()
+
+    # Dòng ở đúng giây watermark được lấy lại nhưng không đổi nội dung
+    reloaded = data_loader.load_ratings_from_db()
+
+    assert data_loader.get_data_version() == version
+    assert len(reloaded) == len(ratings_df)
+
+
+def test_reload_picks_up_inserted_and_updated_ratings(sqlite_db):
+    ratings_df = data_loader.load_ratings_from_db()
+    version = data_loader.get_data_version()
+    oldest = ratings_df.iloc[-1]
+
+    connection = sqlite3.connect(sqlite_db)
+    connection.execute("INSERT INTO ratings (customer_id, food_id, rating, timestamp) "
+                       "VALUES (?, ?, 5, '2030-01-01 00:00:00')", (int(oldest['customer_id']), 1))
+    connection.execute("UPDATE ratings SET rating = 1, timestamp = '2030-01-01 00:00:00' WHERE id = ?",
+                       (int(oldest['id']),))
+    connection.commit()
+    connection.close()
+
+    reloaded = data_loader.load_ratings_from_db()
+
+    assert data_loader.get_data_version() == version + 1
+    assert len(reloaded) == len(ratings_df) + 1
+    assert reloaded.loc[reloaded['id'] == oldest['id'], 'rating'].item() == 1
+    assert reloaded['timestamp'].is_monotonic_decreasing
+
+
+def test_reload_foods_keeps_data_version(sqlite_db):
+    foods_df = data_loader.load_foods_from_db()
+    version = data_loader.get_data_version()
+
+    assert data_loader.load_foods_from_db().equals(foods_df)
+    assert data_loader.get_data_version() == version
+
+    connection = sqlite3.connect(sqlite_db)
+    connection.execute("UPDATE foods SET price = price + 1 WHERE food_id = ?", (foods_df['food_id'].iloc[0],))
+    connection.commit()
+    connection.close()
+
+    data_loader.load_foods_from_db()
+    assert data_loader.get_data_version() == version + 1
+
+
+def test_reload_picks_up_deleted_ratings(sqlite_db):
+    ratings_df = data_loader.load_ratings_from_db()
+    version = data_loader.get_data_version()
+    deleted = ratings_df['id'].iloc[len(ratings_df) // 2]
+
+    connection = sqlite3.connect(sqlite_db)
+    connection.execute("DELETE FROM ratings WHERE id = ?", (int(deleted),))
+    connection.commit()
+    connection.close()
+
+    reloaded = data_loader.load_ratings_from_db()
+
+    assert data_loader.get_data_version() == version + 1
+    assert len(reloaded) == len(ratings_df) - 1
+    assert deleted not in set(reloaded['id'])
+
+
+def test_reload_picks_up_replaced_rating(sqlite_db):
+    ratings_df = data_loader.load_ratings_from_db()
+    replaced = ratings_df.iloc[len(ratings_df) // 2]
+
+    # Xóa một đánh giá cũ và thêm lại với id mới: số dòng không đổi, dòng cũ không còn trong database
+    connection = sqlite3.connect(sqlite_db)
+    connection.execute("DELETE FROM ratings WHERE id = ?", (int(replaced['id']),))
+    connection.execute("INSERT INTO ratings (customer_id, food_id, rating, timestamp) VALUES (?, ?, ?, ?)",
+                       (replaced['customer_id'], replaced['food_id'], 1, replaced['timestamp'].strftime('%Y-%m-%d %H:%M:%S')))
+    connection.commit()
+    connection.close()
+
+    reloaded = data_loader.load_ratings_from_db()
+
+    assert len(reloaded) == len(ratings_df)
+    assert replaced['id'] not in set(reloaded['id'])
+    assert reloaded['id'].max() == ratings_df['id'].max() + 1
+
+
+def test_state_lock_released_during_queries(sqlite_db, monkeypatch):
+    query = data_loader.get_dataframe_from_query
+    locked = []
+
+    def tracking_query(*args, **kwargs):
+        locked.append(data_loader._state_lock.locked())
+        return query(*args, **kwargs)
+
+    monkeypatch.setattr(data_loader, 'get_dataframe_from_query', tracking_query)
+    data_loader.load_ratings_from_db()
+    data_loader.load_ratings_from_db()
+
+    assert len(locked) == 2
+    assert not any(locked)
@@ -0,0 +1,72 @@
+import threading
+
+import pytest
+
+import db_utils
+from db_utils import ConnectionPool, create_sqlite_connection, get_dataframe_from_query
+
+
+@pytest.fixture
+def pool(tmp_path):
+    path = str(tmp_path / 'pool.db')
+    pool = ConnectionPool(lambda: create_sqlite_connection(path), pool_size=2, timeout=0.2)
+    yield pool
+    pool.close()
+
+
+def test_acquire_reuses_released_connection(pool):
+    connection = pool.acquire()
+    pool.release(connection)
+
+    assert pool.acquire() is connection
+
+
+def test_acquire_waits_until_connection_is_released(pool):
+    first, second = pool.acquire(), pool.acquire()
+    assert pool.acquire() is None
+
+    threading.Timer(0.05, pool.release, args=(first,)).start()
+    pool.timeout = 2
+    assert pool.acquire() is first
+    pool.release(second)
+
+
+def test_dead_connection_is_replaced(pool):
+    connection = pool.acquire()
+    pool.release(connection)
+    connection.close()
+
+    replacement = pool.acquire()
+    assert replacement is not connection
+    assert replacement.is_connected()
+
+
+def test_acquire_after_close_raises(pool):
+    pool.release(pool.acquire())
+    pool.close()
+
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+
+
+def test_close_connection_starts_new_pool(sqlite_db):
+    pool = db_utils.get_pool()
+    db_utils.close_connection()
+
+    assert db_utils.get_pool() is not pool
+    with db_utils.pooled_connection() as connection:
+        assert connection.is_connected()
+
+
+def test_dataframe_from_sqlite_adapter_without_warning(pool, recwarn):
+    connection = pool.acquire()
+    cursor = connection.cursor()
+    cursor.execute("CREATE TABLE items (id INTEGER, name TEXT)")
+    cursor.executemany("INSERT INTO items VALUES (%s, %s)", [(1, 'phở'), (2, 'bún chả')])
+    connection.commit()
+
+    frame = get_dataframe_from_query(connection, "SELECT * FROM items WHERE id > %s", params=(1,))
+    pool.release(connection)
+
+    assert frame['name'].tolist() == ['bún chả']
+    assert not [warning for warning in recwarn if issubclass(warning.category, UserWarning)]
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+from model_registry import ModelRegistry, compute_data_version, compute_data_fingerprint
+
+
+def _new_rating(ratings_df, customer_id, food_id, rating):
+    row = pd.DataFrame({
+        'customer_id': [customer_id], 'food_id': [food_id], 'rating': [rating], 'days_ago': [0],
+        'id': [ratings_df['id'].max() + 1], 'timestamp': [ratings_df['timestamp'].max() + pd.Timedelta(seconds=1)],
+    })
+    return pd.concat([row, ratings_df], ignore_index=True)
+
+
+def _unrated_food(foods_df, ratings_df, customer_id):
+    rated = set(ratings_df.loc[ratings_df['customer_id'] == customer_id, 'food_id'])
+    return next(food_id for food_id in foods_df['food_id'] if food_id not in rated)
+
+
+def test_version_bump_without_new_ratings_does_not_fold_in(dataset):
+    foods_df, customers_df, ratings_df = dataset
+    registry = ModelRegistry()
+    models = registry.get_models(('v', 1), foods_df, ratings_df, customers_df)
+
+    assert registry.get_models(('v', 2), foods_df, ratings_df, customers_df) is models
+    assert models['collab'].updates_since_fit == 0
+    assert registry.status()['source'] == 'fold_in'
+
+
+def test_one_new_rating_folds_in_once(dataset):
+    foods_df, customers_df, ratings_df = dataset
+    registry = ModelRegistry()
+    models = registry.get_models(compute_data_version(foods_df, ratings_df), foods_df, ratings_df, customers_df)
+
+    generation = registry.status()['generation']
+    customer_id = ratings_df['customer_id'].iloc[0]
+    before = models['collab']._score_all_items(customer_id)
+    food_id = _unrated_food(foods_df, ratings_df, customer_id)
+    updated = _new_rating(ratings_df, customer_id, food_id, 4.5)
+    folded = registry.get_models(compute_data_version(foods_df, updated), foods_df, updated, customers_df)
+
+    assert folded['collab'].updates_since_fit == 1
+    assert folded['collab'].rated_index.get_rating(customer_id, food_id) == 4.5
+    assert folded['hybrid'].collab_recommender is folded['collab']
+    assert folded['rated_index'] is folded['collab'].rated_index
+    # Kết quả gợi ý đã lưu theo thế hệ cũ hết hiệu lực
+    assert registry.status()['generation'] == generation + 1
+
+    # Bộ mô hình cũ mà các phiên đang đọc không bị sửa
+    assert models['collab'].updates_since_fit == 0
+    assert models['collab'].rated_index.get_rating(customer_id, food_id) is None
+    np.testing.assert_array_equal(models['collab']._score_all_items(customer_id), before)
+
+
+def test_listener_rating_is_not_folded_in_again(dataset):
+    foods_df, customers_df, ratings_df = dataset
+    registry = ModelRegistry()
+    models = registry.get_models(compute_data_version(foods_df, ratings_df), foods_df, ratings_df, customers_df)
+
+    customer_id = ratings_df['customer_id'].iloc[0]
+    food_id = _unrated_food(foods_df, ratings_df, customer_id)
+    # add_rating gọi listener trước, lần tải lại sau đó thấy cùng đánh giá trong ratings_df
+    registry.apply_rating(customer_id, food_id, 3.5)
+    applied = registry.current()[1]
+    assert applied['collab'].updates_since_fit == 1
+    assert models['collab'].updates_since_fit == 0
+
+    updated = _new_rating(ratings_df, customer_id, food_id, 3.5)
+    reloaded = registry.get_models(compute_data_version(foods_df, updated), foods_df, updated, customers_df)
+
+    assert reloaded['collab'].updates_since_fit == 1
+
+
+def test_mark_status_updates_fields(dataset):
+    foods_df, customers_df, ratings_df = dataset
+    registry = ModelRegistry()
+    registry.get_models(('v', 1), foods_df, ratings_df, customers_df)
+    generation = registry.status()['generation']
+
+    registry.mark_status(source='train', duration=12.5)
+
+    status = registry.status()
+    assert (status['source'], status['duration'], status['generation']) == ('train', 12.5, generation)
+
+
+def test_fingerprint_depends_on_catalog_order(dataset):
+    foods_df, _, ratings_df = dataset
+    reordered = foods_df.iloc[::-1].reset_index(drop=True)
+
+    assert compute_data_fingerprint(foods_df, ratings_df) == compute_data_fingerprint(foods_df.copy(), ratings_df)
+    assert compute_data_fingerprint(foods_df, ratings_df) != compute_data_fingerprint(reordered, ratings_df)
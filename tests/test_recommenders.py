@@ -0,0 +1,236 @@
+import numpy as np
+import pytest
+
+from recommenders import ContentBasedRecommender, CollaborativeRecommender, HybridRecommender
+
+
+def _split(ratings_df, frac=0.1):
+    test = ratings_df.sample(frac=frac, random_state=0)
+    return ratings_df.drop(test.index), test
+
+
+def _rmse(model, test_df):
+    """RMSE trên các đánh giá kiểm tra của khách hàng đã có trong mô hình"""
+    errors = []
+    for customer_id, group in test_df.groupby('customer_id'):
+        if not model.rated_index.has_ratings(customer_id):
+            continue
+        scores = model._score_all_items(customer_id)
+        positions = group['food_id'].map(model.rated_index.food_codes).to_numpy()
+        errors.append(scores[positions] - group['rating'].to_numpy())
+    return float(np.sqrt(np.mean(np.concatenate(errors) ** 2)))
+
+
+@pytest.fixture(scope='module')
+def svd_model(dataset):
+    foods_df, _, ratings_df = dataset
+    model = CollaborativeRecommender(algorithm='svd')
+    model.fit(ratings_df, foods_df)
+    return model
+
+
+@pytest.fixture(scope='module')
+def holdout_rmse(dataset):
+    """RMSE trên tập kiểm tra của từng thuật toán, huấn luyện trên cùng tập huấn luyện"""
+    foods_df, _, ratings_df = dataset
+    train, test = _split(ratings_df)
+    results = {'global_mean': float(np.sqrt(np.mean((test['rating'] - train['rating'].mean()) ** 2)))}
+    for name, kwargs in [('svd', {'algorithm': 'svd'}), ('als', {'algorithm': 'als', 'n_jobs': 1}),
+                         ('item_knn', {'algorithm': 'item_knn', 'similarity': 'pearson'})]:
+        model = CollaborativeRecommender(**kwargs)
+        model.fit(train, foods_df)
+        results[name] = _rmse(model, test)
+    return results
+
+
+def test_vectorized_scores_match_model_predict(svd_model):
+    known = np.flatnonzero(svd_model.item_codes >= 0)
+    food_ids = svd_model.foods['food_id'].to_numpy()[known]
+    for customer_id in svd_model.user_ids[:20]:
+        scores = svd_model._score_all_items(customer_id)[known]
+        expected = [svd_model.model.predict(customer_id, food_id).est for food_id in food_ids]
+        np.testing.assert_allclose(scores, expected, rtol=1e-9)
+
+
+def test_recommend_for_customer_matches_predict_loop(svd_model):
+    for customer_id in svd_model.user_ids[:10]:
+        fast = svd_model.recommend_for_customer(customer_id, top_n=10)
+        slow = svd_model._recommend_with_predict(customer_id, top_n=10)
+        np.testing.assert_allclose(fast['predicted_rating'].to_numpy(), slow['predicted_rating'].to_numpy())
+        rated = set(svd_model.rated_index.rated_food_ids(customer_id))
+        assert not rated & set(fast['food_id'])
+
+
+def test_als_rmse_close_to_svd(holdout_rmse):
+    assert holdout_rmse['als'] < holdout_rmse['global_mean']
+    assert holdout_rmse['als'] <= holdout_rmse['svd'] * 1.1
+
+
+def test_item_knn_rmse_close_to_svd(holdout_rmse):
+    assert holdout_rmse['item_knn'] < holdout_rmse['global_mean']
+    assert holdout_rmse['item_knn'] <= holdout_rmse['svd'] * 1.3
+
+
+@pytest.mark.parametrize('block_size', [37, 1024])
+def test_neighbor_table_matches_dense_cosine(dataset, block_size):
+    foods_df, _, _ = dataset
+    dense = ContentBasedRecommender()
+    dense.fit(foods_df)
+    # 37 không chia hết 150 món: khối cuối chỉ còn 2 dòng
+    sparse = ContentBasedRecommender(top_k=10, block_size=block_size)
+    sparse.fit(foods_df)
+
+    cosine = np.array(dense.cosine_sim)
+    np.fill_diagonal(cosine, -np.inf)
+    expected = -np.sort(-cosine, axis=1)[:, :10]
+    np.testing.assert_allclose(sparse.neighbor_scores, expected, rtol=1e-5, atol=1e-6)
+    np.testing.assert_allclose(np.take_along_axis(cosine, sparse.neighbor_indices.astype(np.int64), axis=1),
+                               sparse.neighbor_scores, rtol=1e-5, atol=1e-6)
+    assert not (sparse.neighbor_indices == np.arange(len(foods_df))[:, None]).any()
+
+    for food_id in foods_df['food_id'].iloc[::15]:
+        result = sparse.recommend(food_id, top_n=10)
+        assert food_id not in set(result['food_id'])
+        np.testing.assert_allclose(result['similarity_score'].to_numpy(),
+                                   dense.recommend(food_id, top_n=10)['similarity_score'].to_numpy(),
+                                   rtol=1e-5, atol=1e-6)
+
+        # Có bộ lọc: chấm điểm cả dòng TF-IDF, món gốc vẫn bị loại dù thỏa bộ lọc
+        cuisine = foods_df.loc[foods_df['food_id'] == food_id, 'cuisine'].iloc[0]
+        filters = {'cuisines': [cuisine]}
+        filtered = sparse.recommend(food_id, top_n=20, filters=filters)
+        expected = dense.recommend(food_id, top_n=len(foods_df))
+        expected = expected[expected['cuisine'] == cuisine].head(20)
+        assert food_id not in set(filtered['food_id'])
+        assert (filtered['cuisine'] == cuisine).all()
+        np.testing.assert_allclose(filtered['similarity_score'].to_numpy(), expected['similarity_score'].to_numpy(),
+                                   rtol=1e-5, atol=1e-6)
+
+
+@pytest.mark.parametrize('algorithm', ['svd', 'als', 'item_knn'])
+def test_fold_in_updates_existing_customer(dataset, algorithm):
+    foods_df, _, ratings_df = dataset
+    model = CollaborativeRecommender(algorithm=algorithm)
+    model.fit(ratings_df, foods_df)
+
+    customer_id = ratings_df['customer_id'].iloc[0]
+    before = model._score_all_items(customer_id)
+    food_id = model.recommend_for_customer(customer_id, top_n=1)['food_id'].iloc[0]
+
+    assert model.fold_in(customer_id, food_id, 1.0)
+    assert model.updates_since_fit == 1
+    assert food_id not in set(model.recommend_for_customer(customer_id, top_n=20)['food_id'])
+    assert not np.allclose(model._score_all_items(customer_id), before)
+
+
+def test_fold_in_new_customers_beats_global_mean(dataset):
+    foods_df, _, ratings_df = dataset
+    held_out = ratings_df['customer_id'].drop_duplicates().iloc[:40]
+    known = ratings_df[~ratings_df['customer_id'].isin(held_out)]
+    new = ratings_df[ratings_df['customer_id'].isin(held_out)]
+    new_train, new_test = _split(new, frac=0.3)
+
+    model = CollaborativeRecommender(algorithm='als', n_jobs=1)
+    model.fit(known, foods_df)
+    for row in new_train.itertuples(index=False):
+        model.fold_in(row.customer_id, row.food_id, row.rating)
+
+    assert model.updates_since_fit == len(new_train)
+    baseline = float(np.sqrt(np.mean((new_test['rating'] - known['rating'].mean()) ** 2)))
+    assert _rmse(model, new_test) < baseline
+
+
+def test_needs_retrain_after_threshold(dataset):
+    foods_df, _, ratings_df = dataset
+    model = CollaborativeRecommender(algorithm='als', n_jobs=1, retrain_threshold=3)
+    model.fit(ratings_df, foods_df)
+    customer_id = ratings_df['customer_id'].iloc[0]
+    for food_id in foods_df['food_id'].iloc[:3]:
+        model.fold_in(customer_id, food_id, 4.0)
+
+    assert model.needs_retrain
+
+
+def _legacy_fusion(hybrid, content_recs, collab_recs, top_n):
+    """Cách gộp điểm theo vòng lặp trước khi vector hóa: {food_id: điểm} của top_n món"""
+    content = {}
+    if not content_recs.empty:
+        max_sim = content_recs['similarity_score'].max()
+        for food_id, score in zip(content_recs['food_id'], content_recs['similarity_score']):
+            content[food_id] = score / max_sim * 5 if max_sim > 0 else score
+    collab = dict(zip(collab_recs['food_id'], collab_recs['predicted_rating'])) if not collab_recs.empty else {}
+
+    if content and collab:
+        combined = {food_id: score * hybrid.content_weight for food_id, score in content.items()}
+        for food_id, score in collab.items():
+            combined[food_id] = combined.get(food_id, 0.0) + score * hybrid.collab_weight
+    else:
+        combined = content or collab
+    return dict(sorted(combined.items(), key=lambda item: item[1], reverse=True)[:top_n])
+
+
+@pytest.mark.parametrize('with_collab', [True, False])
+def test_hybrid_fusion_matches_legacy_loop(dataset, svd_model, with_collab):
+    foods_df, _, ratings_df = dataset
+    content = ContentBasedRecommender()
+    content.fit(foods_df)
+    hybrid = HybridRecommender(content_recommender=content, collab_recommender=svd_model)
+    hybrid.fit(foods_df, ratings_df)
+
+    # Khách hàng không có đánh giá: chỉ có phần content-based
+    customer_id = ratings_df['customer_id'].iloc[0] if with_collab else -1
+    for food_id in foods_df['food_id'].iloc[:5]:
+        result = hybrid.recommend(customer_id, food_id=food_id, top_n=10)
+        expected = _legacy_fusion(hybrid, content.recommend(food_id, top_n=20),
+                                  svd_model.recommend_for_customer(customer_id, top_n=20), 10)
+
+        np.testing.assert_allclose(result['hybrid_score'].to_numpy(), list(expected.values()))
+        for food, score in zip(result['food_id'], result['hybrid_score']):
+            if food in expected:
+                assert score == pytest.approx(expected[food])
+
+
+def test_hybrid_features_query(dataset, svd_model):
+    foods_df, _, ratings_df = dataset
+    content = ContentBasedRecommender()
+    content.fit(foods_df)
+    hybrid = HybridRecommender(content_recommender=content, collab_recommender=svd_model)
+    hybrid.fit(foods_df, ratings_df)
+
+    customer_id = ratings_df['customer_id'].iloc[0]
+    features = foods_df['features'].iloc[0]
+    result = hybrid.recommend(customer_id, features=features, top_n=10)
+    expected = _legacy_fusion(hybrid, content.get_similar_by_features(features, top_n=20),
+                              svd_model.recommend_for_customer(customer_id, top_n=20), 10)
+
+    np.testing.assert_allclose(result['hybrid_score'].to_numpy(), list(expected.values()))
+
+
+def test_filters_applied_before_top_n(dataset, svd_model):
+    foods_df, _, _ = dataset
+    cuisine = foods_df['cuisine'].iloc[0]
+    max_price = foods_df['price'].median()
+    filters = {'cuisines': [cuisine], 'price_range': (0, max_price)}
+    matching = (foods_df['cuisine'] == cuisine) & (foods_df['price'] <= max_price)
+    matching_ids = set(foods_df.loc[matching, 'food_id'])
+
+    dense = ContentBasedRecommender()
+    dense.fit(foods_df)
+    sparse = ContentBasedRecommender(top_k=5)
+    sparse.fit(foods_df)
+    food_id = foods_df['food_id'].iloc[1]
+    expected = dense.recommend(food_id, top_n=len(foods_df))
+    expected = expected[expected['food_id'].isin(matching_ids)].head(10)
+    for model in (dense, sparse):
+        # Bảng top-K chỉ giữ 5 láng giềng nhưng vẫn trả đủ 10 món thỏa bộ lọc
+        result = model.recommend(food_id, top_n=10, filters=filters)
+        assert set(result['food_id']) <= matching_ids
+        np.testing.assert_allclose(result['similarity_score'].to_numpy(), expected['similarity_score'].to_numpy(),
+                                   rtol=1e-5)
+
+    customer_id = svd_model.user_ids[0]
+    result = svd_model.recommend_for_customer(customer_id, top_n=10, filters=filters)
+    ranking = svd_model.recommend_for_customer(customer_id, top_n=len(foods_df))
+    expected = ranking[ranking['food_id'].isin(matching_ids)].head(10)
+    assert set(result['food_id']) <= matching_ids
+    np.testing.assert_allclose(result['predicted_rating'].to_numpy(), expected['predicted_rating'].to_numpy())
@@ -0,0 +1,96 @@
+import pandas as pd
+
+import result_cache
+from result_cache import RecommendationCache
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _compute(calls, value):
+    def compute():
+        calls.append(value)
+        return pd.DataFrame({'food_id': [value]})
+    return compute
+
+
+def test_lru_evicts_least_recently_used():
+    cache = RecommendationCache(max_entries=2, ttl=None)
+    keys = [cache.make_key('collab', customer_id=customer_id) for customer_id in ('C1', 'C2', 'C3')]
+    cache.put(keys[0], 'a')
+    cache.put(keys[1], 'b')
+    # Dùng lại C1 nên C2 thành kết quả dùng lâu nhất
+    assert cache.get(keys[0]) == (True, 'a')
+    cache.put(keys[2], 'c')
+
+    assert cache.get(keys[1]) == (False, None)
+    assert cache.get(keys[0]) == (True, 'a')
+    assert cache.get(keys[2]) == (True, 'c')
+    assert cache.stats()['evictions'] == 1
+    assert cache.stats()['size'] == 2
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(result_cache.time, 'monotonic', clock)
+    cache = RecommendationCache(max_entries=10, ttl=60)
+    key = cache.make_key('content', food_id='F1')
+    calls = []
+
+    cache.get_or_compute(key, _compute(calls, 'F2'))
+    clock.now += 59
+    cache.get_or_compute(key, _compute(calls, 'F3'))
+    assert calls == ['F2']
+
+    clock.now += 2
+    result = cache.get_or_compute(key, _compute(calls, 'F3'))
+    assert calls == ['F2', 'F3']
+    assert result['food_id'].tolist() == ['F3']
+    assert cache.stats()['size'] == 1
+
+
+def test_model_version_change_misses():
+    cache = RecommendationCache(max_entries=10, ttl=None)
+    calls = []
+    filters = {'cuisines': ['Việt', 'Thái'], 'flavors': []}
+    old = cache.make_key('hybrid', customer_id='C1', food_id='F1', filters=filters, model_version=('database', 1))
+    same = cache.make_key('hybrid', customer_id='C1', food_id='F1', filters={'cuisines': ['Thái', 'Việt']},
+                          model_version=('database', 1))
+    new = cache.make_key('hybrid', customer_id='C1', food_id='F1', filters=filters, model_version=('database', 2))
+    other_source = cache.make_key('hybrid', customer_id='C1', food_id='F1', filters=filters,
+                                  model_version=('generated', 1))
+
+    cache.get_or_compute(old, _compute(calls, 'F2'))
+    cache.get_or_compute(same, _compute(calls, 'F3'))
+    assert calls == ['F2']
+
+    cache.get_or_compute(new, _compute(calls, 'F4'))
+    cache.get_or_compute(other_source, _compute(calls, 'F5'))
+    assert calls == ['F2', 'F4', 'F5']
+
+
+def test_rating_invalidates_only_that_customer():
+    cache = RecommendationCache(max_entries=10, ttl=None)
+    first = cache.make_key('collab', customer_id='C1', model_version=('database', 1))
+    second = cache.make_key('collab', customer_id='C2', model_version=('database', 1))
+    cache.put(first, 'a')
+    cache.put(second, 'b')
+
+    cache.on_rating('C1', 'F1', 5)
+
+    assert cache.get(first) == (False, None)
+    assert cache.get(second) == (True, 'b')
+
+
+def test_cached_frame_is_not_modified_by_caller():
+    cache = RecommendationCache(max_entries=10, ttl=None)
+    key = cache.make_key('content', food_id='F1')
+    result = cache.get_or_compute(key, _compute([], 'F2'))
+    result['score'] = 1.0
+
+    assert 'score' not in cache.get_or_compute(key, _compute([], 'F3')).columns
@@ -0,0 +1,61 @@
+import pandas as pd
+
+from search_index import FoodSearchIndex, normalize_text
+
+
+def _catalog():
+    return pd.DataFrame({
+        'food_id': ['F1', 'F2', 'F3', 'F4'],
+        'name': ['Phở bò', 'Bún chả', 'Cơm gà', 'Nộm đu đủ'],
+        'flavors': ['mặn, ngọt', 'ngọt, chua', 'mặn', 'chua, cay'],
+        'ingredients': ['bánh phở, thịt bò', 'bún, thịt lợn', 'cơm, thịt gà', 'đu đủ, lạc'],
+        'features': ['nước dùng', 'nướng', 'luộc', 'trộn'],
+    })
+
+
+def _ids(results):
+    return [food_id for food_id, _ in results]
+
+
+def test_normalize_text_removes_diacritics():
+    assert normalize_text('Phở Bò') == 'pho bo'
+    assert normalize_text('đậu phụ') == 'dau phu'
+
+
+def test_search_ignores_diacritics():
+    index = FoodSearchIndex(_catalog())
+
+    assert _ids(index.search('pho bo')) == ['F1']
+    assert _ids(index.search('PHỞ')) == ['F1']
+    assert _ids(index.search('du du', prefix=False)) == ['F4']
+
+
+def test_prefix_matching_while_typing():
+    index = FoodSearchIndex(_catalog())
+
+    assert _ids(index.search('th')) == sorted(['F1', 'F2', 'F3'])
+    assert index.search('th', prefix=False) == []
+    # Khớp nguyên từ xếp trên khớp tiền tố
+    assert _ids(index.search('chua'))[:2] == ['F2', 'F4']
+
+
+def test_accented_query_prefers_exact_accents():
+    catalog = pd.DataFrame({'food_id': ['A', 'B'], 'name': ['Nấm xào', 'Nam bộ xào'],
+                            'flavors': [None, None], 'ingredients': [None, None], 'features': [None, None]})
+    index = FoodSearchIndex(catalog)
+
+    assert _ids(index.search('nam')) == ['A', 'B']
+    assert _ids(index.search('nấm'))[0] == 'A'
+
+
+def test_sync_reindexes_only_changed_foods():
+    catalog = _catalog()
+    index = FoodSearchIndex(catalog)
+    assert index.sync(catalog) == (0, 0)
+
+    updated = catalog.iloc[1:].copy()
+    updated.loc[updated['food_id'] == 'F2', 'name'] = 'Bún riêu'
+
+    assert index.sync(updated) == (1, 1)
+    assert index.search('pho') == []
+    assert _ids(index.search('rieu')) == ['F2']
@@ -110,8 +110,16 @@ def setup_page_config():
         initial_sidebar_state="expanded"
     )
 
-def create_sidebar(ratings_df, foods_df):
+def create_sidebar(ratings_df, foods_df, attribute_index=None):
     """Create and configure the sidebar"""
+    # Danh sách giá trị cho bộ lọc lấy từ chỉ mục thuộc tính thay vì tách lại chuỗi mỗi lần chạy lại
+    if attribute_index is not None:
+        cuisine_options = attribute_index.values('cuisine')
+        flavor_options = attribute_index.values('flavors')
+    else:
+        cuisine_options = sorted(foods_df['cuisine'].unique())
+        flavor_options = sorted(set([flavor.strip() for flavors in foods_df['flavors'] for flavor in flavors.split(',')]))
+
     with st.sidebar:
         st.image(
             "https://img.freepik.com/free-vector/organic-flat-people-asking-questions-illustration_23-2148906283.jpg?w=900",
@@ -141,7 +149,7 @@ def create_sidebar(ratings_df, foods_df):
         st.markdown("### ⚙️ Bộ lọc nâng cao")
         cuisine_filter = st.multiselect(
             "🌏 Ẩm thực:",
-            sorted(foods_df['cuisine'].unique())
+            cuisine_options
         )
 
         price_range = st.slider(
@@ -151,7 +159,7 @@ def create_sidebar(ratings_df, foods_df):
 
         flavors_filter = st.multiselect(
             "🌶️ Hương vị:",
-            sorted(set([flavor.strip() for flavors in foods_df['flavors'] for flavor in flavors.split(',')]))
+            flavor_options
         )
         
     return {
@@ -1,7 +1,9 @@
 import pandas as pd
-import plotly.express as px
 import random
 
+from aggregates import get_rating_aggregates
+from chart_data import ChartDataProvider
+
 def format_price(price):
     """Format giá tiền sang định dạng VND"""
     return f"{price:,.0f} VND"
@@ -32,16 +34,16 @@ def generate_food_card(food, score_type=None, score=None):
     return html
 
 
-def get_popular_foods(ratings_df, foods_df, top_n=10):
-    """Lấy các món phổ biến nhất dựa trên số lượng đánh giá và điểm trung bình"""
-    # Tính số lượng đánh giá và điểm trung bình cho mỗi món
-    food_stats = ratings_df.groupby('food_id').agg(
-        count=('rating', 'count'),
-        avg_rating=('rating', 'mean')
-    ).reset_index()
+def get_popular_foods(ratings_df, foods_df, top_n=10, mask=None):
+    """
+    Lấy các món phổ biến nhất dựa trên số lượng đánh giá và điểm trung bình
 
-    # Món ăn phải có ít nhất 5 đánh giá
-    popular_foods = food_stats[food_stats['count'] >= 5].sort_values('avg_rating', ascending=False).head(top_n)
+    Args:
+        mask (ndarray, optional): Mảng bool theo vị trí trong foods_df, chỉ xét các món được chọn
+    """
+    # Số lượng đánh giá và điểm trung bình của mỗi món (ít nhất 5 đánh giá) lấy từ số liệu tổng hợp
+    food_stats = get_rating_aggregates(ratings_df, foods_df).food_stats(min_count=5, mask=mask)
+    popular_foods = food_stats.sort_values('avg_rating', ascending=False).head(top_n)
 
     # Merge với thông tin chi tiết
     result = pd.merge(popular_foods, foods_df, on='food_id', how='left')
@@ -61,60 +63,29 @@ def get_customer_history(customer_id, ratings_df, foods_df):
 
 def get_cuisine_popularity(ratings_df, foods_df):
     """Phân tích mức độ phổ biến của các loại ẩm thực"""
-    cuisine_ratings = pd.merge(ratings_df, foods_df[['food_id', 'cuisine']], on='food_id')
-    cuisine_avg = cuisine_ratings.groupby('cuisine').agg(
-        avg_rating=('rating', 'mean'),
-        count=('rating', 'count')
-    ).reset_index()
-
     # Lọc các loại có ít nhất 10 đánh giá
-    cuisine_avg = cuisine_avg[cuisine_avg['count'] >= 10].sort_values('avg_rating', ascending=False)
-    return cuisine_avg
+    cuisine_avg = get_rating_aggregates(ratings_df, foods_df).group_stats('cuisine', min_count=10)
+    return cuisine_avg.sort_values('avg_rating', ascending=False)
 
 
 def get_flavor_popularity(ratings_df, foods_df):
     """Phân tích mức độ phổ biến của các hương vị"""
-    # Tách cột flavors thành các hương vị riêng lẻ
-    all_flavors = []
-
-    for _, row in ratings_df.iterrows():
-        food_id = row['food_id']
-        rating = row['rating']
-
-        # Lấy hương vị của món ăn
-        food_row = foods_df[foods_df['food_id'] == food_id]
-        if not food_row.empty:
-            flavors_str = food_row['flavors'].values[0]
-            flavors = [f.strip() for f in flavors_str.split(',')]
-
-            for flavor in flavors:
-                all_flavors.append({
-                    'flavor': flavor,
-                    'rating': rating
-                })
-
-    flavor_df = pd.DataFrame(all_flavors)
-
-    # Tính điểm trung bình và số lượng đánh giá cho mỗi hương vị
-    flavor_stats = flavor_df.groupby('flavor').agg(
-        avg_rating=('rating', 'mean'),
-        count=('rating', 'count')
-    ).reset_index()
-
-    # Lọc các hương vị có ít nhất 20 đánh giá
-    flavor_stats = flavor_stats[flavor_stats['count'] >= 20].sort_values('avg_rating', ascending=False)
-
-    return flavor_stats
+    # Điểm trung bình và số lượng đánh giá của mỗi hương vị, lọc các hương vị có ít nhất 20 đánh giá
+    flavor_stats = get_rating_aggregates(ratings_df, foods_df).group_stats('flavor', min_count=20)
+    return flavor_stats.sort_values('avg_rating', ascending=False)
 
 
 def plot_ratings_distribution(ratings_df):
     """Tạo biểu đồ phân phối điểm đánh giá"""
-    fig = px.histogram(
-        ratings_df,
-        x='rating',
-        nbins=9,
+    import plotly.express as px
+    # Đếm sẵn theo khoảng điểm, biểu đồ chỉ nhận số lượng của từng khoảng
+    histogram = ChartDataProvider(ratings_df).rating_histogram()
+    fig = px.bar(
+        histogram,
+        x='center',
+        y='count',
         title='Phân phối điểm đánh giá',
-        labels={'rating': 'Điểm đánh giá', 'count': 'Số lượng'},
+        labels={'center': 'Điểm đánh giá', 'count': 'Số lượng'},
         color_discrete_sequence=['#FF7043']
     )
 
@@ -131,6 +102,7 @@ def plot_ratings_distribution(ratings_df):
 
 def plot_cuisine_popularity(cuisine_data):
     """Tạo biểu đồ đánh giá theo loại ẩm thực"""
+    import plotly.express as px
     fig = px.bar(
         cuisine_data,
         x='cuisine',